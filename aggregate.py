@@ -0,0 +1,214 @@
+"""Summarize the close approaches that match a query, in one pass.
+
+An aggregation counts the matching close approaches and computes metrics of
+their attributes - the minimum, maximum, mean or sum of the approach distance,
+the relative velocity or the diameter of the NEO - either over all of them or
+per group: per year or month of approach, or per NEO. Metrics are written as
+`count` or `FUNCTION:ATTRIBUTE`, such as `mean:velocity` (see `parse_metric`).
+Unknown diameters are left out of the metrics of diameters.
+
+`aggregate` summarizes a stream of `CloseApproach`es, keeping only one
+accumulator per group. `aggregate_columns` computes the same table with NumPy,
+from the arrays of a `columns.ColumnarApproaches` and a mask of the matching
+close approaches, without touching any `CloseApproach`. Either way, the result
+is a `Table` of one row per group, sorted by group.
+"""
+import collections
+import math
+
+from columns import np
+
+
+GROUPS = ('year', 'month', 'neo')
+FUNCTIONS = ('count', 'min', 'max', 'mean', 'sum')
+METRIC_ATTRIBUTES = ('distance', 'velocity', 'diameter')
+
+# The name of the column holding the group of each row.
+GROUP_COLUMNS = {'year': 'year', 'month': 'month', 'neo': 'designation'}
+
+Table = collections.namedtuple('Table', ['columns', 'rows'])
+
+
+class Metric(collections.namedtuple('Metric', ['function', 'attribute'])):
+    """A metric of an aggregation: a function, and the attribute it applies
+    to (None for `count`)."""
+    __slots__ = ()
+
+    @property
+    def name(self):
+        """Return the name of the metric's column, such as `mean_velocity`."""
+        return self.function if self.attribute is None else f'{self.function}_{self.attribute}'
+
+
+COUNT = Metric('count', None)
+
+
+def parse_metric(text):
+    """Parse a metric written as `count` or `FUNCTION:ATTRIBUTE`.
+
+    :param text: The metric, such as `max:distance`.
+    :return: A `Metric`.
+    :raises ValueError: If the metric isn't valid.
+    """
+    function, _, attribute = text.strip().lower().partition(':')
+    if function == 'count' and not attribute:
+        return COUNT
+    if function not in FUNCTIONS or function == 'count' or attribute not in METRIC_ATTRIBUTES:
+        raise ValueError(f"{text!r} is not a valid metric. Use `count` or FUNCTION:ATTRIBUTE, "
+                         f"with a FUNCTION among {', '.join(FUNCTIONS[1:])} and an "
+                         f"ATTRIBUTE among {', '.join(METRIC_ATTRIBUTES)}.")
+    return Metric(function, attribute)
+
+
+def _columns(group_by, metrics):
+    """Return the names of the columns of an aggregation."""
+    names = [metric.name for metric in metrics]
+    return ([GROUP_COLUMNS[group_by]] if group_by else []) + names
+
+
+def _month(approach):
+    time = approach.time
+    return f'{time.year:04d}-{time.month:02d}'
+
+
+def _diameter(approach):
+    return approach.neo.diameter if approach.neo is not None else math.nan
+
+
+_GROUP_KEYS = {
+    None: lambda approach: None,
+    'year': lambda approach: approach.time.year,
+    'month': _month,
+    'neo': lambda approach: approach._designation,
+}
+
+_VALUES = {
+    'distance': lambda approach: approach.distance,
+    'velocity': lambda approach: approach.velocity,
+    'diameter': _diameter,
+}
+
+
+def _finish(function, known, total, lowest, highest):
+    """Compute the value of a metric from its accumulated state."""
+    if not known:
+        return 0.0 if function == 'sum' else None
+    if function == 'min':
+        return lowest
+    if function == 'max':
+        return highest
+    if function == 'mean':
+        return total / known
+    return total
+
+
+def aggregate(approaches, group_by=None, metrics=(COUNT,)):
+    """Aggregate a stream of close approaches.
+
+    :param approaches: An iterable of `CloseApproach`es.
+    :param group_by: One of `GROUPS`, or None to aggregate all of them.
+    :param metrics: A collection of `Metric`s.
+    :return: A `Table`.
+    """
+    key = _GROUP_KEYS[group_by]
+    attributes = list(dict.fromkeys(m.attribute for m in metrics if m.attribute))
+    getters = [_VALUES[attribute] for attribute in attributes]
+
+    # Each group keeps its count, and the number of known values, their sum,
+    # their minimum and their maximum for each attribute.
+    groups = {}
+    for approach in approaches:
+        group = key(approach)
+        state = groups.get(group)
+        if state is None:
+            state = groups[group] = [0] + [[0, 0.0, math.inf, -math.inf] for _ in getters]
+        state[0] += 1
+        for j, get in enumerate(getters, 1):
+            value = get(approach)
+            if value == value:
+                accumulator = state[j]
+                accumulator[0] += 1
+                accumulator[1] += value
+                if value < accumulator[2]:
+                    accumulator[2] = value
+                if value > accumulator[3]:
+                    accumulator[3] = value
+    if group_by is None and not groups:
+        groups[None] = [0] + [[0, 0.0, math.inf, -math.inf] for _ in getters]
+
+    rows = []
+    for group in sorted(groups):
+        state = groups[group]
+        row = [] if group_by is None else [group]
+        for metric in metrics:
+            if metric.attribute is None:
+                row.append(state[0])
+            else:
+                row.append(_finish(metric.function,
+                                   *state[attributes.index(metric.attribute) + 1]))
+        rows.append(tuple(row))
+    return Table(_columns(group_by, metrics), rows)
+
+
+def aggregate_columns(columns, mask, group_by=None, metrics=(COUNT,)):
+    """Aggregate the matching close approaches of a columnar engine.
+
+    Grouping per NEO isn't supported, since the columnar engine doesn't keep
+    the designations of the NEOs.
+
+    :param columns: A `columns.ColumnarApproaches`.
+    :param mask: A boolean array, true at the positions of the matching close
+    approaches.
+    :param group_by: 'year', 'month', or None to aggregate all of them.
+    :param metrics: A collection of `Metric`s.
+    :return: A `Table`, equal to that of `aggregate` over the same close
+    approaches.
+    """
+    if group_by == 'neo':
+        raise ValueError("The columnar engine can't group close approaches per NEO.")
+
+    if group_by is None:
+        codes = np.zeros(np.count_nonzero(mask), dtype=np.intp)
+        groups = [None]
+    else:
+        # The time column holds minutes since the Unix epoch, as NumPy does.
+        times = columns.time[mask].astype('datetime64[m]')
+        units = times.astype('datetime64[Y]' if group_by == 'year' else 'datetime64[M]')
+        labels, codes = np.unique(units, return_inverse=True)
+        if group_by == 'year':
+            groups = [int(str(label)) for label in labels]
+        else:
+            groups = [str(label) for label in labels]
+    size = len(groups)
+
+    counts = np.bincount(codes, minlength=size)
+    if codes.size:
+        order = np.argsort(codes, kind='stable')
+        starts = np.searchsorted(codes[order], np.arange(size))
+    values = {}
+    for metric in metrics:
+        if metric.attribute is None:
+            values[metric] = counts.tolist()
+            continue
+        column = getattr(columns, metric.attribute)[mask]
+        known = ~np.isnan(column)
+        number = np.bincount(codes, weights=known, minlength=size)
+        if metric.function in ('sum', 'mean'):
+            total = np.bincount(codes, weights=np.where(known, column, 0.0), minlength=size)
+            result = total if metric.function == 'sum' else total / np.maximum(number, 1)
+        elif codes.size:
+            reduce = np.fmin if metric.function == 'min' else np.fmax
+            result = reduce.reduceat(column[order], starts)
+        else:
+            result = np.zeros(size)
+        result = result.tolist()
+        if metric.function != 'sum':
+            result = [value if n else None for value, n in zip(result, number.tolist())]
+        values[metric] = result
+
+    rows = []
+    for i, group in enumerate(groups):
+        row = [] if group_by is None else [group]
+        row.extend(values[metric][i] for metric in metrics)
+        rows.append(tuple(row))
+    return Table(_columns(group_by, metrics), rows)
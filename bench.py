@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Time the loading, querying and writing of data sets of several sizes.
+
+The data sets are synthetic (see `synthetic.py`), generated once for each size
+and seed and kept in `--data-dir`. For each size, the benchmarks are:
+
+- `load_neos` and `load_approaches`, which parse the data files;
+- `database`, which builds an `NEODatabase` from freshly parsed data;
+- `startup:parse` and `startup:snapshot`, which build an `NEODatabase` as
+  every command does when it starts: by parsing the data files and building
+  its object graph and indexes, or from a fresh snapshot (see `snapshot.py`),
+  which holds the indexes and links and builds close approaches on demand;
+- `query:<mix>`, which consumes every match of a query - one per entry of
+  `QUERIES`, from a narrow window of dates to a full scan - with the result
+  cache disabled, so each query is evaluated again;
+- `write_to_csv` and `write_to_json`, which save every close approach to a
+  temporary file.
+
+Each benchmark is run `--repeat` times. The results are printed, or saved with
+`--output`, as a JSON document: the Python version and host of the run, and
+for each size and benchmark, the seconds taken by each run, the best and
+median of them, and the number of rows handled.
+
+Given the results of an earlier run with `--compare`, the best times are
+compared with those of the same sizes and benchmarks, and the script exits
+with status 1 if any of them is slower by more than `--threshold`:
+
+    $ python3 bench.py --sizes 10k 100k --output baseline.json
+    $ python3 bench.py --sizes 10k 100k --compare baseline.json --threshold 0.2
+
+Timings are only comparable between runs on the same host.
+
+With `--memory`, the memory used is measured with `tracemalloc` instead: the
+bytes taken by each `NearEarthObject` and `CloseApproach` (given values shared
+by all of them, so only the objects themselves are counted), and for each size,
+the bytes held by an `NEODatabase` of the loaded and linked data set, and the
+peak reached while building it:
+
+    $ python3 bench.py --memory --sizes 470k
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from models import NearEarthObject, CloseApproach
+from snapshot import load_database
+from synthetic import generate
+from write import write_to_csv, write_to_json
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
+DATA_ROOT = PROJECT_ROOT / '.cache' / 'synthetic'
+
+# The version of the layout of the results.
+RESULTS_VERSION = 1
+
+# The filter mixes of the `query` benchmarks, as arguments of `create_filters`.
+QUERIES = {
+    'date': {'date': datetime.date(2020, 1, 1)},
+    'window': {'start_date': datetime.date(2020, 1, 1), 'end_date': datetime.date(2029, 12, 31),
+               'distance_max': 0.1},
+    'velocity': {'velocity_min': 25},
+    'hazardous-diameter': {'hazardous': True, 'diameter_min': 0.1},
+    'scan': {'hazardous': False, 'distance_min': 0.1, 'velocity_max': 20},
+}
+
+# The smallest slowdown, in seconds, that `compare` reports.
+MIN_SECONDS = 0.001
+
+_SUFFIXES = {'k': 10 ** 3, 'm': 10 ** 6}
+
+
+def parse_size(text):
+    """Parse a number of close approaches, such as `50000`, `10k` or `1M`."""
+    multiplier = _SUFFIXES.get(text[-1:].lower(), 1)
+    try:
+        size = int(text[:-1] if multiplier > 1 else text) * multiplier
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a number of close approaches.")
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a number of close approaches.")
+    return size
+
+
+def time_runs(run, repeat, setup=None):
+    """Time several runs of a function.
+
+    The garbage collector is run before, and disabled during, each run.
+
+    :param run: A function, called with the result of `setup`, that returns
+    the number of rows it handled.
+    :param repeat: The number of runs.
+    :param setup: A function of no arguments, called (untimed) before each run.
+    :return: A dictionary of the seconds of each run, the best and median of
+    them, and the number of rows of the last run.
+    """
+    seconds = []
+    for _ in range(repeat):
+        arguments = () if setup is None else (setup(),)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            rows = run(*arguments)
+            seconds.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return {'seconds': seconds, 'best': min(seconds), 'median': statistics.median(seconds),
+            'rows': rows}
+
+
+def bench_size(neo_path, cad_path, repeat):
+    """Run the benchmarks on one data set.
+
+    :param neo_path: The path of the data set's `neos.csv`.
+    :param cad_path: The path of the data set's `cad.json`.
+    :param repeat: The number of runs of each benchmark.
+    :return: A stream of tuples of the name and results of each benchmark.
+    """
+    yield 'load_neos', time_runs(lambda: len(load_neos(neo_path)), repeat)
+    yield 'load_approaches', time_runs(lambda: len(load_approaches(cad_path)), repeat)
+
+    # The database links the NEOs and close approaches it's given, so each run
+    # needs freshly loaded ones.
+    def build(data):
+        return len(NEODatabase(*data, cache_entries=0)._approaches)
+
+    yield 'database', time_runs(build, repeat,
+                                setup=lambda: (load_neos(neo_path), load_approaches(cad_path)))
+
+    def start(load):
+        return len(NEODatabase(*load(), cache_entries=0)._approaches)
+
+    yield 'startup:parse', time_runs(
+        lambda: start(lambda: (load_neos(neo_path), load_approaches(cad_path))), repeat)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load_database(neo_path, cad_path, cache_dir)
+        yield 'startup:snapshot', time_runs(
+            lambda: len(load_database(neo_path, cad_path, cache_dir,
+                                      cache_entries=0)._approaches), repeat)
+
+    database = NEODatabase(load_neos(neo_path), load_approaches(cad_path), cache_entries=0)
+    for name, criteria in QUERIES.items():
+        filters = create_filters(**criteria)
+        yield f'query:{name}', time_runs(lambda: sum(1 for _ in database.query(filters)), repeat)
+
+    approaches = list(database.query())
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, write, suffix in (('write_to_csv', write_to_csv, '.csv'),
+                                    ('write_to_json', write_to_json, '.json')):
+            path = pathlib.Path(tmp) / f'results{suffix}'
+
+            def run():
+                write(approaches, path)
+                return len(approaches)
+
+            yield name, time_runs(run, repeat)
+
+
+def object_sizes(count=10000):
+    """Measure the bytes taken by each `NearEarthObject` and `CloseApproach`.
+
+    Every object is given the same values, so only the objects themselves (and
+    an NEO's list of close approaches) are counted.
+
+    :param count: The number of objects of each class to measure.
+    :return: A dictionary of the bytes per object of each class.
+    """
+    time = datetime.datetime(2020, 1, 1)
+    makers = {
+        'NearEarthObject': lambda: NearEarthObject('433', 'Eros', 16.84, False),
+        'CloseApproach': lambda: CloseApproach('433', time, 0.1, 10.0),
+    }
+    sizes = {}
+    for name, make in makers.items():
+        objects = [None] * count
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for i in range(count):
+                objects[i] = make()
+            sizes[name] = tracemalloc.get_traced_memory()[0] / count
+        finally:
+            tracemalloc.stop()
+    return sizes
+
+
+def database_size(neo_path, cad_path):
+    """Measure the memory held by an `NEODatabase` of a data set.
+
+    :param neo_path: The path of the data set's `neos.csv`.
+    :param cad_path: The path of the data set's `cad.json`.
+    :return: A dictionary of the bytes held once the data is loaded and linked,
+    the peak bytes while loading and linking it, and the number of rows.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        database = NEODatabase(load_neos(neo_path), load_approaches(cad_path), cache_entries=0)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'bytes': current, 'peak': peak, 'rows': len(database._approaches)}
+
+
+def measure_memory(sizes, data_dir=DATA_ROOT, seed=0, log=None):
+    """Generate the data sets of some sizes, if needed, and measure their memory.
+
+    :param sizes: The numbers of close approaches of the data sets.
+    :param data_dir: The directory in which to keep the generated data sets.
+    :param seed: The seed of the generated data.
+    :param log: A file to which to report progress, or None.
+    :return: A dictionary of the results, ready to be saved as JSON.
+    """
+    objects = object_sizes()
+    if log is not None:
+        for name, size in objects.items():
+            print(f"{name:<28} {size:10.0f} B per object", file=log)
+    results = []
+    for size in sizes:
+        neo_path, cad_path = generate(data_dir, size, seed)
+        result = database_size(neo_path, cad_path)
+        results.append({'size': size, 'benchmark': 'database', **result})
+        if log is not None:
+            print(f"{size:>10} {'database':<17} {result['bytes'] / 1e6:10.1f} MB  "
+                  f"(peak {result['peak'] / 1e6:.1f} MB)", file=log)
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'objects': objects,
+        'results': results,
+    }
+
+
+def run_benchmarks(sizes, repeat=3, data_dir=DATA_ROOT, seed=0, log=None):
+    """Generate the data sets of some sizes, if needed, and benchmark them.
+
+    :param sizes: The numbers of close approaches of the data sets.
+    :param repeat: The number of runs of each benchmark.
+    :param data_dir: The directory in which to keep the generated data sets.
+    :param seed: The seed of the generated data.
+    :param log: A file to which to report progress, or None.
+    :return: A dictionary of the results, ready to be saved as JSON.
+    """
+    results = []
+    for size in sizes:
+        neo_path, cad_path = generate(data_dir, size, seed)
+        for name, timing in bench_size(neo_path, cad_path, repeat):
+            results.append({'size': size, 'benchmark': name, **timing})
+            if log is not None:
+                print(f"{size:>10} {name:<28} {timing['best']:10.4f} s  "
+                      f"({timing['rows']} rows)", file=log)
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold, min_seconds=MIN_SECONDS):
+    """Find the benchmarks that have become slower than in a baseline.
+
+    :param results: The results of a run, as returned by `run_benchmarks`.
+    :param baseline: The results of an earlier run.
+    :param threshold: The largest tolerated slowdown, as a fraction of the
+    baseline's best time.
+    :param min_seconds: The largest tolerated slowdown in seconds, whatever
+    the fraction, so the noise of the quickest benchmarks isn't reported.
+    :return: A list of tuples of the size, name, baseline best time and best
+    time of each benchmark slower than that.
+    """
+    before = {(result['size'], result['benchmark']): result['best']
+              for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        best = before.get((result['size'], result['benchmark']))
+        if best is not None and result['best'] - best > max(best * threshold, min_seconds):
+            regressions.append((result['size'], result['benchmark'], best, result['best']))
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmarks given at the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading, querying and writing synthetic data sets.")
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[10000, 100000],
+                        metavar='N',
+                        help="The numbers of close approaches of the data sets, such as 10k "
+                             "or 1M (default 10k 100k).")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="The number of runs of each benchmark (default 3).")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the generated data.")
+    parser.add_argument('--data-dir', type=pathlib.Path, default=DATA_ROOT,
+                        help="Directory in which to keep the generated data sets.")
+    parser.add_argument('-o', '--output', default='-',
+                        help="File in which to save the results as JSON, or `-` (the default) "
+                             "for standard output.")
+    parser.add_argument('--compare', type=pathlib.Path, metavar='BASELINE',
+                        help="The results of an earlier run, to which to compare this one.")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="With --compare, the largest tolerated slowdown of a best time, "
+                             "as a fraction (default 0.1).")
+    parser.add_argument('--memory', action='store_true',
+                        help="Measure the memory of the models and of a loaded database with "
+                             "tracemalloc, instead of timing the benchmarks.")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1.")
+    if args.memory and args.compare is not None:
+        parser.error("--compare only compares timings, not --memory.")
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    if args.memory:
+        results = measure_memory(args.sizes, args.data_dir, args.seed, log=sys.stderr)
+    else:
+        results = run_benchmarks(args.sizes, args.repeat, args.data_dir, args.seed,
+                                 log=sys.stderr)
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for size, name, before, after in regressions:
+            print(f"Regression: {name} on {size} close approaches took {after:.4f} s, "
+                  f"{after / before - 1:.0%} slower than {before:.4f} s.", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
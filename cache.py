@@ -0,0 +1,111 @@
+"""Remember the results of recent queries on an `NEODatabase`.
+
+The `ResultCache` maps the normalized criteria of a query (see
+`CompiledFilters.key`) to the positions of its matching close approaches in
+the database, stored compactly as an array of integers. A query whose stream
+of results was abandoned early - by a limit, say - leaves only the prefix it
+consumed, marked incomplete, which answers later queries that need no more
+matches than that. When the cache holds more than its maximum number of
+entries or bytes, the least recently used entries are evicted.
+
+The cache counts its hits, misses and evictions, which `info` reports, in the
+spirit of `functools.lru_cache`. It may be used by several threads at once.
+"""
+import array
+import collections
+import sys
+import threading
+
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'evictions', 'entries', 'bytes', 'max_entries', 'max_bytes'])
+
+# A cached result: an array of positions, and whether they are all of the
+# matches or only the first of them.
+CacheEntry = collections.namedtuple('CacheEntry', ['positions', 'complete'])
+
+
+class ResultCache:
+    """A bounded, least-recently-used cache of query results."""
+
+    def __init__(self, max_entries=128, max_bytes=None):
+        """Create a new, empty `ResultCache`.
+
+        :param max_entries: The maximum number of results to keep, or None for
+        no limit.
+        :param max_bytes: The maximum total size of the kept results, in
+        bytes, or None for no limit.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        """Return the number of cached results."""
+        return len(self._entries)
+
+    def get(self, key):
+        """Look up the result of a query, counting a hit or a miss.
+
+        :param key: The normalized criteria of the query.
+        :return: A `CacheEntry`, or None if the result isn't cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, positions, complete=True):
+        """Remember the result of a query, evicting old results if needed.
+
+        A result larger than `max_bytes` on its own isn't kept, and an
+        incomplete result doesn't replace a complete or a longer one.
+
+        :param key: The normalized criteria of the query.
+        :param positions: An iterable of the positions of the matching close
+        approaches, in the order in which they were generated.
+        :param complete: Whether `positions` holds all of the matches, rather
+        than only the first of them.
+        """
+        if not isinstance(positions, array.array):
+            positions = array.array('i', positions)
+        size = sys.getsizeof(positions)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                if not complete and (old.complete or len(old.positions) >= len(positions)):
+                    return
+                del self._entries[key]
+                self._bytes -= sys.getsizeof(old.positions)
+            self._entries[key] = CacheEntry(positions, complete)
+            self._bytes += size
+            while self._entries and (
+                    (self.max_entries is not None and len(self._entries) > self.max_entries)
+                    or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sys.getsizeof(evicted.positions)
+                self.evictions += 1
+
+    def clear(self):
+        """Forget every cached result, but keep the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        """Report the counters and size of the cache.
+
+        :return: A `CacheInfo`.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._entries),
+                             self._bytes, self.max_entries, self.max_bytes)
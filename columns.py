@@ -0,0 +1,147 @@
+"""Store close approach attributes in columns and evaluate filters on them.
+
+The `ColumnarApproaches` class keeps one NumPy array per attribute used by the
+filters in `filters.py`: the approach time (as integer minutes since the Unix
+epoch), the nominal approach distance, the relative approach velocity, and the
+diameter and hazardous flag of the linked NEO. The criteria of a collection of
+filters, fused by `filters.compile_filters`, are evaluated as a single boolean
+mask over these arrays instead of calling each filter on each `CloseApproach`.
+
+NumPy is an optional dependency of this project - the `NEODatabase` only builds
+a columnar engine on request, and constructing one without NumPy installed
+raises an `ImportError`.
+"""
+
+from helpers import datetime_to_minutes, np
+
+
+# The columns of a `ColumnarApproaches`, and their NumPy dtypes.
+COLUMNS = (
+    ('time', 'int64'),
+    ('distance', 'float64'),
+    ('velocity', 'float64'),
+    ('diameter', 'float64'),
+    ('hazardous', 'bool'),
+    ('linked', 'bool'),
+)
+
+
+class ColumnarApproaches:
+    """A columnar copy of the filterable attributes of close approaches.
+
+    The arrays are aligned with the sequence of close approaches the engine
+    was built from, so a position in the arrays is a position in that
+    sequence. Close approaches without a linked NEO have an unknown (NaN)
+    diameter, are not hazardous, and never match a filter on an NEO attribute.
+
+    Each column is a view of the first `len(self)` elements of a larger
+    array, so that close approaches can be appended (with `append`) in
+    amortized time proportional to their number.
+    """
+
+    def __init__(self, approaches):
+        """Create a new `ColumnarApproaches` from linked close approaches.
+
+        :param approaches: A sequence of `CloseApproach`es, already linked to
+        their NEOs.
+        """
+        if np is None:
+            raise ImportError("The columnar engine requires NumPy.")
+        self._size = 0
+        self._arrays = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        self.append(approaches)
+
+    time = property(lambda self: self._arrays['time'][:self._size])
+    distance = property(lambda self: self._arrays['distance'][:self._size])
+    velocity = property(lambda self: self._arrays['velocity'][:self._size])
+    diameter = property(lambda self: self._arrays['diameter'][:self._size])
+    hazardous = property(lambda self: self._arrays['hazardous'][:self._size])
+    linked = property(lambda self: self._arrays['linked'][:self._size])
+
+    def __len__(self):
+        """Return the number of rows in each column."""
+        return self._size
+
+    def append(self, approaches):
+        """Append the attributes of more (linked) close approaches.
+
+        :param approaches: A sequence of `CloseApproach`es.
+        """
+        count = len(approaches)
+        start, stop = self._size, self._size + count
+        capacity = len(self._arrays['time'])
+        if stop > capacity:
+            capacity = max(stop, 2 * capacity) if capacity else stop
+            for name, array in self._arrays.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:start] = array[:start]
+                self._arrays[name] = grown
+
+        nan = float('nan')
+        columns = self._arrays
+        columns['time'][start:stop] = np.fromiter(
+            (datetime_to_minutes(a.time) for a in approaches),
+            dtype=np.int64, count=count)
+        columns['distance'][start:stop] = np.fromiter(
+            (a.distance for a in approaches), dtype=np.float64, count=count)
+        columns['velocity'][start:stop] = np.fromiter(
+            (a.velocity for a in approaches), dtype=np.float64, count=count)
+        columns['diameter'][start:stop] = np.fromiter(
+            (a.neo.diameter if a.neo is not None else nan for a in approaches),
+            dtype=np.float64, count=count)
+        columns['hazardous'][start:stop] = np.fromiter(
+            (a.neo is not None and a.neo.hazardous for a in approaches),
+            dtype=np.bool_, count=count)
+        columns['linked'][start:stop] = np.fromiter(
+            (a.neo is not None for a in approaches),
+            dtype=np.bool_, count=count)
+        self._size = stop
+
+    def set_neo(self, positions, neo):
+        """Record the (new or changed) NEO of some close approaches.
+
+        :param positions: The positions of the close approaches.
+        :param neo: Their `NearEarthObject`.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        self._arrays['diameter'][positions] = neo.diameter
+        self._arrays['hazardous'][positions] = neo.hazardous
+        self._arrays['linked'][positions] = True
+
+    def mask(self, compiled):
+        """Evaluate the fused criteria of some filters as one boolean mask.
+
+        The residual filters of `compiled` (those that couldn't be fused) are
+        not evaluated here - the caller must still apply them to each matching
+        `CloseApproach`.
+
+        :param compiled: A `CompiledFilters`.
+        :return: A boolean array, true at the positions of the close approaches
+        matching the fused criteria.
+        """
+        mask = np.full(len(self), not compiled.empty, dtype=np.bool_)
+        if compiled.empty:
+            return mask
+        for attribute, bounds in compiled.bounds.items():
+            column = getattr(self, attribute)
+            lower, upper = bounds.lower, bounds.upper
+            if attribute == 'time':
+                lower = None if lower is None else datetime_to_minutes(lower)
+                upper = None if upper is None else datetime_to_minutes(upper)
+            if lower is not None:
+                mask &= (column >= lower) if bounds.lower_inclusive else (column > lower)
+            if upper is not None:
+                mask &= (column <= upper) if bounds.upper_inclusive else (column < upper)
+        if compiled.hazardous is not None:
+            # Orphaned approaches never match an NEO criterion.
+            mask &= (self.hazardous == compiled.hazardous) & self.linked
+        return mask
+
+    def positions(self, compiled):
+        """Find the positions of the close approaches matching some criteria.
+
+        :param compiled: A `CompiledFilters`.
+        :return: An ascending array of the positions of the close approaches
+        matching the fused criteria of `compiled`.
+        """
+        return np.flatnonzero(self.mask(compiled))
@@ -4,12 +4,68 @@ approaches.
 A `NEODatabase` holds an interconnected data set of NEOs and close approaches.
 It provides methods to fetch an NEO by primary designation or by name, as well
 as a method to query the set of close approaches that match a collection of
-user-specified criteria.
+user-specified criteria. Each query is answered along the access path chosen by
+the planner in `planner.py`, which `explain` reports. NEOs and close approaches
+can be added to a database after it's built, with `add_neos` and
+`add_approaches`.
+
+A database can also be given its links, indexes and histograms ready-made (see
+`Prebuilt`), as a snapshot saves them, along with a sequence that builds each
+`CloseApproach` only when it's first needed; then it doesn't examine the close
+approaches at all until a query does.
 
 Under normal circumstances, the main module creates one NEODatabase from the
 data on NEOs and close approaches extracted by `extract.load_neos` and
 `extract.load_approaches`.
 """
+import array
+import collections
+import heapq
+import itertools
+import math
+import operator
+import threading
+
+from aggregate import COUNT, GROUPS, aggregate, aggregate_columns, parse_metric
+from cache import ResultCache
+from columns import ColumnarApproaches
+from filters import ATTRIBUTES, NEO_ATTRIBUTES, Bounds, compile_filters
+from parallel import scan, worker_count
+from planner import Histogram, SortedIndex, plan_query, prefer_index_walk
+
+
+# The histograms are rebuilt once more than 1 in `STALE_FRACTION` close
+# approaches have been added or changed since they were built.
+STALE_FRACTION = 10
+
+# The attributes by which query results can be sorted.
+SORT_ATTRIBUTES = ('time', 'distance', 'velocity', 'diameter')
+
+# The structures an `NEODatabase` otherwise builds from its close approaches:
+# the positions of each NEO's close approaches (aligned with the NEOs), a
+# dictionary of the positions of the close approaches of each unknown NEO by
+# designation, the `SortedIndex`es by attribute, and the histograms (as
+# returned by `build_histograms`).
+Prebuilt = collections.namedtuple('Prebuilt', ['neo_positions', 'orphans', 'indexes',
+                                               'histograms'])
+
+
+def build_histograms(indexes, linked, total):
+    """Build the histograms of each column that queries can filter on.
+
+    :param indexes: A dictionary mapping attributes to `SortedIndex`es.
+    :param linked: An iterable of the NEO of each close approach whose NEO is
+    known.
+    :param total: The number of close approaches.
+    :return: A dictionary mapping attributes to `Histogram`s, and
+    'hazardous' to the fraction of close approaches of hazardous NEOs.
+    """
+    histograms = {attribute: index.histogram() for attribute, index in indexes.items()}
+    linked = list(linked)
+    diameters = sorted(neo.diameter for neo in linked if not math.isnan(neo.diameter))
+    histograms['diameter'] = Histogram(diameters, total=total)
+    histograms['hazardous'] = sum(neo.hazardous for neo in linked) / total if total else 0.0
+    return histograms
 
 
 class NEODatabase:
@@ -22,7 +78,8 @@ class NEODatabase:
     close approaches that match certain criteria.
     """
 
-    def __init__(self, neos, approaches):
+    def __init__(self, neos, approaches, columnar=False, cache_entries=128, cache_bytes=None,
+                 prebuilt=None):
         """Create a new `NEODatabase`.
 
         This constructor assumes that the collections of NEOs and close
@@ -36,22 +93,244 @@ class NEODatabase:
         corresponding NEO. This constructor modifies the supplied NEOs and
         close approaches to link them together.
 
+        If `columnar` is true, the database additionally keeps the filterable
+        attributes of the close approaches in NumPy arrays (see `columns.py`)
+        and evaluates queries as vectorized masks over them.
+
+        The results of recent queries are kept, as the positions of their
+        matching close approaches, in a `ResultCache` of at most
+        `cache_entries` results and `cache_bytes` bytes.
+
+        With `prebuilt` structures, the close approaches are instead taken to
+        be linked already - each as it's built, if `approaches` is a lazy
+        sequence - and aren't examined. The `.approaches` of each NEO are
+        then only filled in when it's fetched by designation or by name.
+
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
+        :param columnar: Whether to build the (NumPy-backed) columnar engine.
+        :param cache_entries: The maximum number of cached query results (0 to
+        disable the cache, None for no limit).
+        :param cache_bytes: The maximum total size of the cached query results,
+        in bytes, or None for no limit.
+        :param prebuilt: A `Prebuilt` of the structures to use instead of
+        building them, or None.
         """
-        self._neos = neos
-        self._approaches = approaches
+        self._neos = list(neos)
+        self._approaches = list(approaches) if prebuilt is None else approaches
 
         # Auxiliary data structures
-        self._designation_dict = {neo.designation: neo for neo in neos}
-        self._name_dict = {neo.name: neo for neo in neos if neo.name}
-
-        # Link NEOs and their close approaches
-        for approach in approaches:
-            neo = self._designation_dict.get(approach._designation)
-            if neo:
-                approach.neo = neo
+        self._designation_dict = {neo.designation: neo for neo in self._neos}
+        self._name_dict = {neo.name: neo for neo in self._neos if neo.name}
+
+        # Link NEOs and their close approaches. Each linked approach also
+        # shares its NEO's designation string instead of keeping its own copy.
+        # Each NEO's close approaches are also kept by position, so that a
+        # query on the NEOs' attributes visits only the approaches of the NEOs
+        # that match. The positions of close approaches without a known NEO
+        # are kept by designation, in case the NEO is added later.
+        self._neo_positions = {}
+        self._orphans = {}
+        self._neos_by_diameter = None
+        # The designations of the NEOs whose `.approaches` are yet to be
+        # filled in by `_fill`.
+        self._unfilled = set()
+        self._fill_lock = threading.Lock()
+        if prebuilt is None:
+            for i, approach in enumerate(self._approaches):
+                self._link(i, approach)
+        else:
+            self._neo_positions = {neo.designation: (neo, positions)
+                                   for neo, positions in zip(self._neos, prebuilt.neo_positions)
+                                   if positions}
+            self._orphans = prebuilt.orphans
+            self._unfilled = set(self._neo_positions)
+
+        self._columns = (ColumnarApproaches(self._approaches) if columnar
+                         else None)
+
+        # Sorted indexes of the close approaches, for bisecting ranges of
+        # values, and histograms of each column, for planning queries. The
+        # histograms are rebuilt once enough close approaches have changed
+        # since they were built.
+        if prebuilt is None:
+            self._indexes = {
+                attribute: SortedIndex(self._approaches, attribute)
+                for attribute in ('time', 'distance', 'velocity')
+            }
+            self._histograms = self._build_histograms()
+        else:
+            self._indexes = prebuilt.indexes
+            self._histograms = prebuilt.histograms
+        self._stale = 0
+        self._cache = (ResultCache(cache_entries, cache_bytes) if cache_entries != 0
+                       else None)
+
+    def _link(self, i, approach):
+        """Link the close approach at position `i` to its NEO, if it's known."""
+        neo = self._designation_dict.get(approach._designation)
+        if neo:
+            approach.neo = neo
+            approach._designation = neo.designation
+            if neo.designation not in self._unfilled:
                 neo.approaches.append(approach)
+            entry = self._neo_positions.get(neo.designation)
+            if entry is None:
+                entry = self._neo_positions[neo.designation] = (neo, [])
+                self._neos_by_diameter = None
+            entry[1].append(i)
+        else:
+            self._orphans.setdefault(approach._designation, []).append(i)
+
+    def _build_histograms(self):
+        """Build the histograms of each column that queries can filter on.
+
+        :return: A dictionary of histograms, as returned by `build_histograms`.
+        """
+        linked = (approach.neo for approach in self._approaches if approach.neo is not None)
+        return build_histograms(self._indexes, linked, len(self._approaches))
+
+    def _fill(self, neo):
+        """Fill in the `.approaches` of an NEO, if they haven't been yet.
+
+        :param neo: A `NearEarthObject` of this database, or None.
+        :return: The same `NearEarthObject`, or None.
+        """
+        if neo is not None and neo.designation in self._unfilled:
+            with self._fill_lock:
+                if neo.designation in self._unfilled:
+                    _, positions = self._neo_positions[neo.designation]
+                    neo.approaches.extend(map(self._approaches.__getitem__, positions))
+                    self._unfilled.discard(neo.designation)
+        return neo
+
+    def update(self, neos, approaches):
+        """Bring the database up to date with reloaded data files.
+
+        The changes are applied in place when they can be: if the close
+        approaches already in the database are an unchanged prefix of
+        `approaches`, and every NEO in the database is still in `neos`, then
+        NEOs whose attributes changed are updated, new NEOs are added (and
+        linked to any close approaches already waiting for them), and the new
+        close approaches are appended, linked and indexed. Otherwise, nothing
+        is changed, and the caller should build a new `NEODatabase` instead.
+
+        Either way, this takes time proportional to the size of the data set
+        to compare the data, but only time proportional to the changes (and
+        the number of changed NEOs' close approaches) to apply them. Cached
+        query results are discarded if anything changed.
+
+        :param neos: All `NearEarthObject`s, as freshly loaded, and not yet
+        linked.
+        :param approaches: All `CloseApproach`es, as freshly loaded, and not
+        yet linked.
+        :return: Whether the database now reflects `neos` and `approaches`.
+        """
+        old = self._approaches
+        if len(approaches) < len(old) or not all(map(_same_approach, old, approaches)):
+            return False
+        latest = {neo.designation: neo for neo in neos}
+        if any(designation not in latest for designation in self._designation_dict):
+            return False
+
+        changed = 0
+        added = []
+        for designation, neo in latest.items():
+            current = self._designation_dict.get(designation)
+            if current is None:
+                added.append(neo)
+            elif not _same_neo(current, neo):
+                self._update_neo(current, neo)
+                changed += 1
+        self.add_neos(added)
+        self.add_approaches(approaches[len(old):])
+        if changed and self._cache is not None:
+            self._cache.clear()
+        return True
+
+    def _update_neo(self, neo, latest):
+        """Copy the attributes of a reloaded NEO onto the linked one.
+
+        :param neo: The `NearEarthObject` in this database.
+        :param latest: A `NearEarthObject` with the same designation.
+        """
+        if neo.name != latest.name:
+            if neo.name and self._name_dict.get(neo.name) is neo:
+                del self._name_dict[neo.name]
+            if latest.name:
+                self._name_dict[latest.name] = neo
+            neo.name = latest.name
+        neo.diameter = latest.diameter
+        neo.hazardous = latest.hazardous
+        self._neos_by_diameter = None
+
+        _, positions = self._neo_positions.get(neo.designation, (neo, ()))
+        if self._columns is not None and positions:
+            self._columns.set_neo(positions, neo)
+        self._stale += len(positions)
+
+    def add_neos(self, neos):
+        """Add new NEOs to the database.
+
+        Each NEO is linked to any close approaches already in the database that
+        carry its designation but had no known NEO, and can then be fetched by
+        designation or by name. This takes time proportional to the number of
+        new NEOs and of their close approaches, not to the size of the database.
+
+        :param neos: A collection of unlinked `NearEarthObject`s.
+        :raises ValueError: If an NEO with the same primary designation is
+        already in the database (or appears twice among `neos`), in which case
+        nothing is added.
+        """
+        neos = list(neos)
+        designations = set()
+        for neo in neos:
+            if neo.designation in self._designation_dict or neo.designation in designations:
+                raise ValueError(f"An NEO with the primary designation {neo.designation!r} "
+                                 "is already in the database.")
+            designations.add(neo.designation)
+        if not neos:
+            return
+        for neo in neos:
+            self._neos.append(neo)
+            self._designation_dict[neo.designation] = neo
+            if neo.name:
+                self._name_dict[neo.name] = neo
+
+            positions = self._orphans.pop(neo.designation, ())
+            for i in positions:
+                self._link(i, self._approaches[i])
+            if self._columns is not None and positions:
+                self._columns.set_neo(positions, neo)
+            self._stale += len(positions)
+        if self._cache is not None:
+            self._cache.clear()
+
+    def add_approaches(self, approaches):
+        """Add new close approaches to the database.
+
+        The close approaches come after those already in the database, in
+        internal order. Each is linked to its NEO, if it's in the database, or
+        else linked when the NEO is added with `add_neos`. The sorted indexes
+        and the columnar engine are extended in place, so this takes time
+        roughly proportional to the number of new close approaches.
+
+        :param approaches: A collection of unlinked `CloseApproach`es.
+        """
+        approaches = list(approaches)
+        if not approaches:
+            return
+        start = len(self._approaches)
+        self._approaches.extend(approaches)
+        for i, approach in enumerate(approaches, start):
+            self._link(i, approach)
+        if self._columns is not None:
+            self._columns.append(approaches)
+        for index in self._indexes.values():
+            index.extend(approaches, start)
+        self._stale += len(approaches)
+        if self._cache is not None:
+            self._cache.clear()
 
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
@@ -64,7 +343,7 @@ class NEODatabase:
         :return: The `NearEarthObject` with the desired primary designation,
         or `None`.
         """
-        return self._designation_dict.get(designation, None)
+        return self._fill(self._designation_dict.get(designation, None))
 
     def get_neo_by_name(self, name):
         """Find and return an NEO by its name.
@@ -77,9 +356,9 @@ class NEODatabase:
         :param name: The name, as a string, of the NEO to search for.
         :return: The `NearEarthObject` with the desired name, or `None`.
         """
-        return self._name_dict.get(name, None)
+        return self._fill(self._name_dict.get(name, None))
 
-    def query(self, filters=()):
+    def query(self, filters=(), sort_by=None, descending=False, top=None, jobs=None):
         """Query close approaches to generate those that match a collection of
         filters.
 
@@ -89,10 +368,357 @@ class NEODatabase:
         order, which isn't guaranteed to be sorted meaningfully, although is
         often sorted by time.
 
+        The filters are first fused by `compile_filters` (a `CompiledFilters`
+        may also be passed directly); if they contradict each other, nothing is
+        scanned. The cheapest access path to the matching close approaches is
+        then chosen by `plan` - for example, if the filters restrict the date
+        of approach to a narrow window, only that window of the time-sorted
+        index is examined.
+
+        The positions of the matches a stream has generated are cached when
+        the stream is exhausted or abandoned (by `limit`, say), and a later
+        query with the same fused criteria is answered from the cache - only
+        carrying on along its access path, past the last cached match, if it
+        needs more matches than were cached. The first `top` sorted matches
+        are cached in the same way.
+
+        With `sort_by`, the matches are generated in ascending (or, with
+        `descending`, descending) order of an attribute instead, ties in
+        internal order, and close approaches of NEOs of unknown diameter last.
+        With `top`, only the first `top` of them are generated - found either
+        by walking the sorted index of the attribute or by keeping the best
+        matches on a heap, without sorting all of the matches.
+
+        With several `jobs`, a query planned as a full scan is evaluated on a
+        pool of workers instead (see `parallel.scan`), with the same results,
+        if there are enough close approaches to keep more than one worker
+        busy (see `parallel.worker_count`).
+
         :param filters: A collection of filters capturing user-specified
         criteria.
+        :param sort_by: One of `SORT_ATTRIBUTES`, or None.
+        :param descending: Whether to sort in descending order.
+        :param top: The maximum number of sorted matches to generate, or None.
+        :param jobs: The number of workers to scan with, or None to scan in
+        this thread.
         :return: A stream of matching `CloseApproach` objects.
+        :raises ValueError: If `sort_by` isn't a sortable attribute, or `top`
+        is given without `sort_by`.
+        """
+        compiled = compile_filters(filters)
+        if sort_by is not None:
+            return self._sorted(compiled, sort_by, descending, top, jobs)
+        if top is not None:
+            raise ValueError("Only sorted queries can ask for the top matches.")
+        return self._matches(compiled, jobs)
+
+    def _matches(self, compiled, jobs=None):
+        """Generate the close approaches matching some compiled filters, in
+        internal order, from the result cache if possible."""
+        key = compiled.key() if self._cache is not None else None
+        if key is None:
+            return self._execute(self.plan(compiled), jobs)
+        return map(self._approaches.__getitem__, self._positions(compiled, key, jobs))
+
+    def _positions(self, compiled, key=None, jobs=None):
+        """Generate the positions of the close approaches matching some
+        compiled filters, in internal order.
+
+        With a cache `key`, the cached positions are used, if any. If they are
+        only the first of the matches, the rest are found (should they be
+        needed) by following the access path past the last of them. The
+        positions generated are cached once the stream is exhausted or
+        abandoned.
         """
-        for approach in self._approaches:
-            if all(f(approach) for f in filters):
-                yield approach
+        prefix = ()
+        if key is not None:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry.complete:
+                    return iter(entry.positions)
+                prefix = entry.positions
+        return self._resume(compiled, key, prefix, jobs)
+
+    def _resume(self, compiled, key, prefix, jobs):
+        """Generate the positions in `prefix`, then those of the matches after
+        them, recording them all in the cache under `key` (unless it's None).
+        """
+        matches = array.array('i', prefix)
+        complete = False
+        try:
+            yield from prefix
+            positions, predicate = self._open(self.plan(compiled), jobs)
+            approaches = self._approaches
+            after = matches[-1] if matches else -1
+            if positions is None:
+                positions = range(after + 1, len(approaches))
+            elif matches:
+                positions = itertools.dropwhile(after.__ge__, positions)
+            for i in positions:
+                if predicate is None or predicate(approaches[i]):
+                    matches.append(i)
+                    yield i
+            complete = True
+        finally:
+            if key is not None and (complete or len(matches) > len(prefix)):
+                self._cache.put(key, matches, complete)
+
+    def _sorted(self, compiled, sort_by, descending=False, top=None, jobs=None):
+        """Find the matches of some compiled filters in sorted order.
+
+        :return: An iterator over the sorted matching `CloseApproach`es.
+        """
+        if sort_by not in SORT_ATTRIBUTES:
+            raise ValueError(f"Close approaches can't be sorted by {sort_by!r}.")
+        key = _sort_key(sort_by, descending)
+        if top is None:
+            return iter(sorted(self._matches(compiled, jobs), key=key, reverse=descending))
+        if top <= 0 or compiled.empty:
+            return iter(())
+
+        # The first sorted matches are cached apart from the matches in
+        # internal order, and answer any query for as many of them or fewer.
+        cache_key = compiled.key() if self._cache is not None else None
+        top_key = None if cache_key is None else ('top', sort_by, descending, cache_key)
+        if top_key is not None:
+            entry = self._cache.get(top_key)
+            if entry is not None and (entry.complete or len(entry.positions) >= top):
+                return map(self._approaches.__getitem__, entry.positions[:top])
+
+        positions = None
+        if prefer_index_walk(self.plan(compiled), len(self._approaches), self._histograms,
+                             sort_by, top):
+            if sort_by == 'diameter':
+                positions = self._walk_diameters(compiled, descending, top)
+            else:
+                positions = self._walk(compiled, self._indexes[sort_by], descending, top)
+        if positions is None:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            approaches = self._approaches
+            positions = select(top, self._positions(compiled, cache_key, jobs),
+                               key=lambda i: key(approaches[i]))
+        if top_key is not None:
+            self._cache.put(top_key, positions, complete=len(positions) < top)
+        return map(self._approaches.__getitem__, positions)
+
+    def _walk(self, compiled, index, descending, top):
+        """Find the first matches of some compiled filters by walking a sorted
+        index.
+
+        :return: A list of the positions of at most `top` close approaches, in
+        sorted order.
+        """
+        attribute = index.attribute
+        bounds = compiled.bounds.get(attribute) or Bounds()
+        predicate = compiled.predicate(exclude=(attribute,))
+        approaches = self._approaches
+        matches = []
+        for value, i in index.walk(bounds, descending):
+            # Keep going past the `top`th match while its value is tied, to
+            # find the ties that come first in internal order.
+            if len(matches) >= top and value != matches[top - 1][0]:
+                break
+            if predicate is None or predicate(approaches[i]):
+                matches.append((value, i))
+        matches.sort(key=operator.itemgetter(1))
+        matches.sort(key=operator.itemgetter(0), reverse=descending)
+        return [i for _, i in matches[:top]]
+
+    def _walk_diameters(self, compiled, descending, top):
+        """Find the first matches of some compiled filters by diameter, by
+        walking the NEOs of known diameter in order of diameter.
+
+        :return: A list of the positions of at most `top` close approaches, in
+        sorted order, or None if fewer than `top` close approaches of NEOs of
+        known diameter match.
+        """
+        if self._neos_by_diameter is None:
+            self._neos_by_diameter = sorted(
+                (entry for entry in self._neo_positions.values()
+                 if not math.isnan(entry[0].diameter)),
+                key=lambda entry: entry[0].diameter)
+        entries = self._neos_by_diameter
+        if descending:
+            entries = reversed(entries)
+        neo_predicate = compiled.neo_predicate()
+        predicate = compiled.predicate(exclude=NEO_ATTRIBUTES)
+        approaches = self._approaches
+        matches = []
+        # NEOs of the same diameter are visited together, so that their close
+        # approaches can be put in internal order.
+        for _, group in itertools.groupby(entries, key=lambda entry: entry[0].diameter):
+            positions = []
+            for neo, neo_positions in group:
+                if neo_predicate is None or neo_predicate(neo):
+                    positions.extend(neo_positions)
+            positions.sort()
+            matches.extend(i for i in positions
+                           if predicate is None or predicate(approaches[i]))
+            if len(matches) >= top:
+                return matches[:top]
+        return None
+
+    def aggregate(self, filters=(), group_by=None, metrics=(COUNT,)):
+        """Count and summarize the close approaches that match a collection of
+        filters, in one pass, without generating them.
+
+        With the columnar engine, the table is computed from the columns of the
+        matching close approaches (unless grouping per NEO, or some filters
+        couldn't be fused). Otherwise, it's accumulated over the stream of
+        matches from `query`.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param group_by: One of `aggregate.GROUPS` ('year', 'month' or 'neo'),
+        or None to summarize all matching close approaches.
+        :param metrics: A collection of `aggregate.Metric`s, or of strings
+        such as 'count' or 'mean:velocity'.
+        :return: An `aggregate.Table` with one row per group.
+        :raises ValueError: If a group or metric isn't valid.
+        """
+        if group_by is not None and group_by not in GROUPS:
+            raise ValueError(f"Close approaches can't be grouped by {group_by!r}.")
+        metrics = [parse_metric(metric) if isinstance(metric, str) else metric
+                   for metric in metrics]
+        compiled = compile_filters(filters)
+        if self._columns is not None and group_by != 'neo' and not compiled.residual:
+            return aggregate_columns(self._columns, self._columns.mask(compiled),
+                                     group_by, metrics)
+        return aggregate(self._matches(compiled), group_by, metrics)
+
+    def cache_info(self):
+        """Report the hits, misses, evictions and size of the result cache.
+
+        :return: A `cache.CacheInfo`, or None if the cache is disabled.
+        """
+        return self._cache.info() if self._cache is not None else None
+
+    def plan(self, filters=()):
+        """Choose the access path with which to answer a query.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria, or a `CompiledFilters`.
+        :return: A `QueryPlan`.
+        """
+        if self._stale * STALE_FRACTION > len(self._approaches):
+            self._histograms = self._build_histograms()
+            self._stale = 0
+        return plan_query(compile_filters(filters), len(self._approaches),
+                          self._histograms, self._indexes,
+                          columnar=self._columns is not None,
+                          neos=len(self._neo_positions))
+
+    def explain(self, filters=()):
+        """Plan and run a query, recording how many rows it actually examined
+        and produced.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria, or a `CompiledFilters`.
+        :return: The executed `QueryPlan`, whose string representation
+        describes the plan with its estimated and actual row counts.
+        """
+        plan = self.plan(filters)
+        positions, predicate = self._access(plan)
+        examined = 0
+        rows = 0
+        for approach in self._candidates(positions):
+            examined += 1
+            if predicate is None or predicate(approach):
+                rows += 1
+        plan.actual_candidates = examined
+        plan.actual_rows = rows
+        return plan
+
+    def _execute(self, plan, jobs=None):
+        """Generate the close approaches matching a query along its plan,
+        without the result cache."""
+        positions, predicate = self._open(plan, jobs)
+        candidates = self._candidates(positions)
+        if predicate is None:
+            yield from candidates
+        else:
+            yield from filter(predicate, candidates)
+
+    def _open(self, plan, jobs=None):
+        """Open the access path of a plan, like `_access`, but split a full
+        scan among up to `jobs` workers (see `parallel.worker_count`).
+        """
+        positions, predicate = self._access(plan)
+        if plan.access == 'scan' and predicate is not None:
+            jobs = worker_count(jobs, len(self._approaches))
+            if jobs > 1:
+                positions, predicate = scan(self._approaches, predicate, jobs), None
+        return positions, predicate
+
+    def _access(self, plan):
+        """Open the access path of a plan.
+
+        :param plan: A `QueryPlan`.
+        :return: A tuple of the positions of the candidate close approaches, in
+        internal order (or `None` for all of them), and the predicate they must
+        still satisfy (or `None`).
+        """
+        compiled = plan.compiled
+        if plan.access == 'empty':
+            return (), None
+        if plan.access == 'columnar':
+            positions = self._columns.positions(compiled).tolist()
+            predicate = compiled.predicate(exclude=ATTRIBUTES)
+        elif plan.access == 'index':
+            index = self._indexes[plan.attribute]
+            positions = index.positions(compiled.bounds[plan.attribute])
+            predicate = compiled.predicate(exclude=(plan.attribute,))
+        elif plan.access == 'neo':
+            positions = self._neo_access(compiled.neo_predicate())
+            predicate = compiled.predicate(exclude=NEO_ATTRIBUTES)
+        else:
+            return None, compiled.predicate()
+        return positions, predicate
+
+    def _candidates(self, positions):
+        """Generate the close approaches at some positions (or all of them)."""
+        if positions is None:
+            return iter(self._approaches)
+        return map(self._approaches.__getitem__, positions)
+
+    def _neo_access(self, neo_predicate):
+        """Find the positions of the close approaches of the matching NEOs.
+
+        :param neo_predicate: A predicate on a `NearEarthObject`.
+        :return: A list of positions, in internal order.
+        """
+        positions = []
+        for neo, neo_positions in self._neo_positions.values():
+            if neo_predicate(neo):
+                positions.extend(neo_positions)
+        positions.sort()
+        return positions
+
+
+def _same_approach(old, new):
+    """Return whether a reloaded close approach is the same as a loaded one."""
+    return (old._designation == new._designation and old.time == new.time
+            and old.distance == new.distance and old.velocity == new.velocity)
+
+
+def _same_neo(old, new):
+    """Return whether a reloaded NEO has the same attributes as a loaded one."""
+    return (old.name == new.name and old.hazardous == new.hazardous
+            and (old.diameter == new.diameter
+                 or math.isnan(old.diameter) and math.isnan(new.diameter)))
+
+
+def _sort_key(attribute, descending=False):
+    """Return a key function sorting close approaches by an attribute.
+
+    Close approaches of NEOs of unknown diameter (or with no known NEO) sort
+    last by diameter, in either direction.
+    """
+    if attribute != 'diameter':
+        return operator.attrgetter(attribute)
+    unknown = -math.inf if descending else math.inf
+
+    def key(approach):
+        diameter = approach.neo.diameter if approach.neo is not None else math.nan
+        return unknown if math.isnan(diameter) else diameter
+    return key
@@ -5,41 +5,323 @@ of `NearEarthObject`s. The `load_approaches` function extracts close approach
 data from a JSON file into a collection of `CloseApproach` objects. The main
 module calls these functions with the command line arguments and uses the
 resulting collections to build an `NEODatabase`.
+
+The close approach data is read incrementally by `iter_cad_rows`, one row of
+the `data` array at a time, so that the decoded JSON document is never held in
+memory at once.
+
+The `load_parallel` function produces the same collections as `load_neos` and
+`load_approaches`, but parses both files at the same time, split into byte
+ranges, on a pool of worker processes.
+
+To look at a single NEO, `find_neo` searches the CSV file for it without
+parsing the other rows, and `index_cad_rows` locates every row of the close
+approach data by byte offset, so that `load_approaches_at` can read just the
+rows of one NEO.
 """
+import array
+import concurrent.futures
 import csv
+import itertools
 import json
+import locale
+import mmap
+import operator
+import os
+import re
 
+from helpers import cd_to_minutes, minutes_to_datetime
 from models import NearEarthObject, CloseApproach
 
 
-def load_neos(neo_csv_path='data/neos.csv'):
+# The order of the fields of NASA's close approach data, used if a file doesn't
+# list its `fields`.
+CAD_FIELDS = ('des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max',
+              'v_rel', 'v_inf', 't_sigma_f', 'h')
+
+_READ_SIZE = 1 << 16
+_CHUNK_SIZE = 1 << 22
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JSONStream:
+    """Decode a JSON document from a text file a little at a time.
+
+    Only the structural characters of objects and arrays are handled here -
+    individual values are decoded by `json.JSONDecoder.raw_decode` as soon as
+    enough of the file has been read to hold them.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read another chunk of the file, discarding the consumed text."""
+        chunk = self.file.read(_READ_SIZE)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        """Consume the next (non-whitespace) character, which must be `char`."""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON document.")
+        self.pos += 1
+
+    def value(self):
+        """Decode and consume the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number running up to the end of the buffer may continue.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            self._fill()
+
+    def members(self):
+        """Generate the keys of an object, one at a time.
+
+        The caller must consume the value of each key (e.g. with `value`)
+        before advancing to the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+    def elements(self):
+        """Generate the decoded elements of an array, one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+
+
+def load_neos(neo_csv_path='data/neos.csv', extra_fields=()):
     """Read near-Earth object information from a CSV file.
 
+    The positions of the needed columns are looked up in the header once, and
+    each row is only split as far as the last of them - the file has dozens of
+    other columns, such as orbital elements, that are never parsed. A row with
+    a quoted field is handed to the `csv` module instead, since its fields may
+    hold commas or even line breaks.
+
+    Any other columns may be kept too, by naming them in `extra_fields`: each
+    NEO's `extra` attribute is then a dictionary of the raw (string) values of
+    those fields, or None where a field is empty.
+
     :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param extra_fields: The names of additional columns to keep, such as
+    `H`, `albedo` or `moid`.
     :return: A collection of `NearEarthObject`s.
+    :raises ValueError: If a needed column is missing from the file, or a row
+    is too short.
     """
+    extra_fields = tuple(extra_fields)
     neos = []
     with open(neo_csv_path, 'r') as file:
-        reader = csv.DictReader(file)
-
-        for row in reader:
-            designation = row['pdes']
-            name = row['name'].strip() if row['name'].strip() else None
-            diameter = (float(row['diameter']) if row['diameter']
-                        else float('nan'))
-            hazardous = row['pha'] == 'Y'
+        header = next(csv.reader(file), [])
+        try:
+            indices = [header.index(field)
+                       for field in ('pdes', 'name', 'diameter', 'pha') + extra_fields]
+        except ValueError as err:
+            raise ValueError(f"Missing NEO field: {err}") from None
+        fields = operator.itemgetter(*indices)
+        last = max(indices)
+        # The last column's field would keep the line break.
+        strip = last == len(header) - 1
 
+        for line in file:
+            if '"' in line:
+                # The csv module reads on from the file if the row spans lines.
+                row = next(csv.reader(itertools.chain([line], file)), [])
+            else:
+                row = (line.rstrip('\r\n') if strip else line).split(',', last + 1)
+            try:
+                values = fields(row)
+            except IndexError:
+                if not line.strip():
+                    continue
+                raise ValueError(f"Malformed NEO row: {line!r}") from None
+            designation, name, diameter, hazardous = _neo_values(*values[:4])
             neo = NearEarthObject(
                 designation=designation,
                 name=name,
                 diameter=diameter,
                 hazardous=hazardous
             )
+            if extra_fields:
+                neo.extra = {field: value or None
+                             for field, value in zip(extra_fields, values[4:])}
             neos.append(neo)
 
     return neos
 
 
+def find_neo(neo_csv_path='data/neos.csv', pdes=None, name=None):
+    """Find one NEO in a CSV file, by primary designation or by name.
+
+    Rather than parsing every row, the file is searched for the designation
+    (or name) as raw bytes, and only the lines where it occurs are parsed. As
+    in an `NEODatabase`, the last of several matching NEOs wins. If a matching
+    line holds an unbalanced quote - a quoted field spanning lines - the file
+    is read with `load_neos` instead.
+
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param pdes: The primary designation of the NEO, which is preferred if
+    both are given.
+    :param name: The name of the NEO.
+    :return: The matching `NearEarthObject`, or None.
+    """
+    if pdes:
+        position, value = 0, pdes
+    elif name:
+        position, value = 1, name
+    else:
+        return None
+    encoding = locale.getpreferredencoding(False)
+
+    with open(neo_csv_path, 'rb') as file:
+        header = next(csv.reader([file.readline().decode(encoding)]), [])
+        try:
+            fields = operator.itemgetter(*(header.index(field)
+                                           for field in ('pdes', 'name', 'diameter', 'pha')))
+        except ValueError as err:
+            raise ValueError(f"Missing NEO field: {err}") from None
+        start = file.tell()
+        if start >= os.fstat(file.fileno()).st_size:
+            return None
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            needle = value.encode(encoding)
+            found = None
+            pos = mapped.find(needle, start)
+            while pos >= 0:
+                begin = mapped.rfind(b'\n', 0, pos) + 1
+                end = mapped.find(b'\n', pos)
+                if end < 0:
+                    end = len(mapped)
+                line = mapped[begin:end]
+                if line.count(b'"') % 2:
+                    break
+                row = next(csv.reader([line.decode(encoding)]), [])
+                try:
+                    values = _neo_values(*fields(row))
+                except IndexError:
+                    values = None
+                if values and values[position] == value:
+                    found = values
+                pos = mapped.find(needle, end)
+            else:
+                return NearEarthObject(*found) if found else None
+
+    matches = [neo for neo in load_neos(neo_csv_path)
+               if (neo.designation, neo.name)[position] == value]
+    return matches[-1] if matches else None
+
+
+def _neo_values(pdes, name, diameter, pha):
+    """Convert the raw CSV fields of an NEO into the values of its attributes.
+
+    :return: A tuple of the designation, name (or `None`), diameter (NaN if
+    unknown) and hazardous flag of the NEO.
+    """
+    name = name.strip() if name.strip() else None
+    diameter = float(diameter) if diameter else float('nan')
+    return pdes, name, diameter, pha == 'Y'
+
+
+def iter_cad_rows(cad_json_path='data/cad.json', columns=('des', 'cd', 'dist', 'v_rel')):
+    """Generate the rows of a close approach data file, one at a time.
+
+    The positions of the requested columns are looked up in the file's
+    `fields` list. If the `fields` come after the `data` in the file, the file
+    is read twice - once to find the fields, and once to extract the data -
+    rather than holding the rows in memory.
+
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param columns: The names of the fields to extract from each row.
+    :return: A stream of tuples of the requested fields of each row.
+    """
+    fields = None
+    with open(cad_json_path, 'r') as file:
+        stream = _JSONStream(file)
+        for key in stream.members():
+            if key == 'fields':
+                fields = stream.value()
+            elif key == 'data' and fields is not None:
+                yield from _project(stream.elements(), fields, columns)
+                return
+            elif key == 'data':
+                # Skip the rows for now, without keeping them.
+                for _ in stream.elements():
+                    pass
+            else:
+                stream.value()
+
+    with open(cad_json_path, 'r') as file:
+        stream = _JSONStream(file)
+        for key in stream.members():
+            if key == 'data':
+                yield from _project(stream.elements(), fields or CAD_FIELDS, columns)
+                return
+            stream.value()
+
+
+def _project(rows, fields, columns):
+    """Select the values of some named columns from each row.
+
+    :param rows: An iterable of rows, as lists of values.
+    :param fields: The names of the values in each row.
+    :param columns: The names of the values to select.
+    :return: A stream of tuples of the selected values.
+    """
+    try:
+        indices = [fields.index(column) for column in columns]
+    except ValueError as err:
+        raise ValueError(f"Missing close approach field: {err}") from None
+    if len(indices) == 1:
+        for row in rows:
+            yield (row[indices[0]],)
+    else:
+        yield from map(operator.itemgetter(*indices), rows)
+
+
 def load_approaches(cad_json_path='data/cad.json'):
     """Read close approach data from a JSON file.
 
@@ -47,18 +329,264 @@ def load_approaches(cad_json_path='data/cad.json'):
     :return: A collection of `CloseApproach`es.
     """
     approaches = []
-    with open(cad_json_path, 'r') as file:
-        data = json.load(file)
+    for des, cd, dist, v_rel in iter_cad_rows(cad_json_path):
+        approach = CloseApproach(
+            designation=des.strip(),
+            time=cd,
+            distance=float(dist),
+            velocity=float(v_rel)
+        )
+        approaches.append(approach)
+
+    return approaches
+
 
-        for approach_data in data['data']:
-            des, _, _, cd, dist, _, _, v_rel, _, _, _ = approach_data
+def load_parallel(neo_csv_path='data/neos.csv', cad_json_path='data/cad.json',
+                  jobs=None, chunk_size=_CHUNK_SIZE):
+    """Read NEOs and close approaches on a pool of worker processes.
 
-            approach = CloseApproach(
+    Both files are split into chunks of about `chunk_size` bytes - the CSV
+    file at line breaks, and the `data` array of the JSON file between rows -
+    and all of the chunks are parsed concurrently. Each worker sends back its
+    chunk as a few flat arrays and newline-joined strings rather than as
+    pickled objects, and the `NearEarthObject`s and `CloseApproach`es are
+    assembled in the main process, in file order.
+
+    The result is identical to that of `load_neos` and `load_approaches`,
+    provided that no CSV field spans lines and that no string in the close
+    approach data contains the characters `],[`, which holds for NASA's data.
+
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param jobs: The number of worker processes (by default, one per CPU).
+    :param chunk_size: The approximate number of bytes in each chunk.
+    :return: A tuple of a collection of `NearEarthObject`s and a collection of
+    `CloseApproach`es.
+    """
+    encoding = locale.getpreferredencoding(False)
+    neo_tasks = [(_load_neo_chunk, neo_csv_path, encoding, header, start, end)
+                 for header, start, end in _csv_chunks(neo_csv_path, encoding, chunk_size)]
+    cad_tasks = [(_load_cad_chunk, cad_json_path, encoding, indices, start, end)
+                 for indices, start, end in _cad_chunks(cad_json_path, encoding, chunk_size)]
+
+    with concurrent.futures.ProcessPoolExecutor(jobs or os.cpu_count()) as pool:
+        neo_futures = [pool.submit(*task) for task in neo_tasks]
+        cad_futures = [pool.submit(*task) for task in cad_tasks]
+
+        neos = []
+        for future in neo_futures:
+            designations, names, diameters, hazardous = future.result()
+            neos.extend(
+                NearEarthObject(designation=designation, name=name or None,
+                                diameter=diameter, hazardous=flag)
+                for designation, name, diameter, flag in zip(
+                    _split_lines(designations, len(diameters)),
+                    _split_lines(names, len(diameters)), diameters, hazardous))
+
+        approaches = []
+        for future in cad_futures:
+            designations, times, distances, velocities = future.result()
+            approaches.extend(
+                CloseApproach(designation=designation,
+                              time=minutes_to_datetime(minutes),
+                              distance=distance, velocity=velocity)
+                for designation, minutes, distance, velocity in zip(
+                    _split_lines(designations, len(times)), times,
+                    distances, velocities))
+
+    return neos, approaches
+
+
+def index_cad_rows(cad_json_path='data/cad.json', chunk_size=_CHUNK_SIZE):
+    """Locate every row of a close approach data file, by byte offset.
+
+    The rows are found as `load_parallel` splits them, so the same assumption
+    holds: no string in the data contains the characters `],[`.
+
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param chunk_size: The approximate number of bytes to read at once.
+    :return: A tuple of the positions of the `des`, `cd`, `dist` and `v_rel`
+    fields in each row, a list of the (stripped) designation of each row, and
+    arrays of the start and end offsets of each row, in file order.
+    """
+    encoding = locale.getpreferredencoding(False)
+    designations, starts, ends = [], array.array('q'), array.array('q')
+    indices = None
+    decoder = json.JSONDecoder()
+    with open(cad_json_path, 'rb') as file:
+        for indices, start, end in _cad_chunks(cad_json_path, encoding, chunk_size):
+            file.seek(start)
+            # Decode one byte per character, so that positions are offsets.
+            text = file.read(-1 if end is None else end - start).decode('latin-1')
+            pos = _WHITESPACE.match(text).end()
+            while text.startswith('[', pos):
+                row, stop = decoder.raw_decode(text, pos)
+                designation = row[indices[0]]
+                if not designation.isascii():
+                    designation = json.loads(text[pos:stop].encode('latin-1').decode(encoding))[
+                        indices[0]]
+                designations.append(designation.strip())
+                starts.append(start + pos)
+                ends.append(start + stop)
+                pos = _WHITESPACE.match(text, stop).end()
+                if text.startswith(',', pos):
+                    pos = _WHITESPACE.match(text, pos + 1).end()
+    return indices, designations, starts, ends
+
+
+def load_approaches_at(cad_json_path, indices, spans):
+    """Read the close approaches of some rows of a close approach data file.
+
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param indices: The positions of the `des`, `cd`, `dist` and `v_rel`
+    fields in each row, as returned by `index_cad_rows`.
+    :param spans: An iterable of the start and end offsets of the rows.
+    :return: A list of `CloseApproach`es, in the order of `spans`.
+    """
+    encoding = locale.getpreferredencoding(False)
+    fields = operator.itemgetter(*indices)
+    approaches = []
+    with open(cad_json_path, 'rb') as file:
+        for start, end in spans:
+            file.seek(start)
+            des, cd, dist, v_rel = fields(json.loads(file.read(end - start).decode(encoding)))
+            approaches.append(CloseApproach(
                 designation=des.strip(),
                 time=cd,
                 distance=float(dist),
                 velocity=float(v_rel)
-            )
-            approaches.append(approach)
-
+            ))
     return approaches
+
+
+def _split_lines(text, count):
+    """Split `count` strings from a newline-joined string."""
+    return text.split('\n') if count else ()
+
+
+def _csv_chunks(neo_csv_path, encoding, chunk_size):
+    """Split the rows of a CSV file into byte ranges that end at line breaks.
+
+    :return: A list of tuples of the header row and the start and end offsets
+    of each chunk.
+    """
+    with open(neo_csv_path, 'rb') as file:
+        header_line = file.readline()
+        header = next(csv.reader([header_line.decode(encoding)]), [])
+        size = os.fstat(file.fileno()).st_size
+        boundaries = [len(header_line)]
+        while boundaries[-1] + chunk_size < size:
+            file.seek(boundaries[-1] + chunk_size)
+            file.readline()
+            if file.tell() >= size:
+                break
+            boundaries.append(file.tell())
+    boundaries.append(size)
+    return [(header, start, end) for start, end in zip(boundaries, boundaries[1:])]
+
+
+def _load_neo_chunk(neo_csv_path, encoding, header, start, end):
+    """Parse a byte range of a CSV file of NEOs into compact columns.
+
+    :return: A tuple of newline-joined designations, newline-joined names
+    (empty if unnamed), an array of diameters and bytes of hazardous flags.
+    """
+    with open(neo_csv_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+
+    columns = [header.index(field) for field in ('pdes', 'name', 'diameter', 'pha')]
+    fields = operator.itemgetter(*columns)
+    designations, names = [], []
+    diameters, hazardous = array.array('d'), bytearray()
+    for row in csv.reader(text.splitlines()):
+        if not row:
+            continue
+        designation, name, diameter, flag = _neo_values(*fields(row))
+        designations.append(designation)
+        names.append(name or '')
+        diameters.append(diameter)
+        hazardous.append(flag)
+    return '\n'.join(designations), '\n'.join(names), diameters, bytes(hazardous)
+
+
+_CAD_KEY = re.compile(rb'"(fields|data)"\s*:\s*\[')
+_CAD_ROW_BOUNDARY = re.compile(rb'\]\s*,\s*\[')
+
+
+def _cad_chunks(cad_json_path, encoding, chunk_size):
+    """Split the rows of a close approach data file into byte ranges.
+
+    :return: A list of tuples of the positions of the `des`, `cd`, `dist` and
+    `v_rel` fields in each row, and the start and end offsets of each chunk.
+    The end of the last chunk is `None`, meaning the end of the file.
+    """
+    with open(cad_json_path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            raise ValueError(f"{cad_json_path} is empty.")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            keys = {}
+            for match in _CAD_KEY.finditer(mapped):
+                keys.setdefault(match.group(1), match.end() - 1)
+            if b'data' not in keys:
+                raise ValueError(f"{cad_json_path} has no close approach data.")
+
+            fields = CAD_FIELDS
+            if b'fields' in keys:
+                fields = _decode_array_at(mapped, keys[b'fields'], encoding)
+            indices = [fields.index(field) for field in ('des', 'cd', 'dist', 'v_rel')]
+
+            start = keys[b'data'] + 1
+            boundaries = [start]
+            while True:
+                match = _CAD_ROW_BOUNDARY.search(mapped, boundaries[-1] + chunk_size)
+                if match is None:
+                    break
+                boundaries.append(match.end() - 1)
+    ends = boundaries[1:] + [None]
+    return [(indices, start, end) for start, end in zip(boundaries, ends)]
+
+
+def _decode_array_at(mapped, offset, encoding):
+    """Decode the JSON array starting at a byte offset of a mapped file."""
+    decoder = json.JSONDecoder()
+    length = _READ_SIZE
+    while True:
+        text = mapped[offset:offset + length].decode(encoding, errors='ignore')
+        try:
+            return decoder.raw_decode(text)[0]
+        except json.JSONDecodeError:
+            if offset + length >= len(mapped):
+                raise
+            length *= 2
+
+
+def _load_cad_chunk(cad_json_path, encoding, indices, start, end):
+    """Parse a byte range of the rows of a close approach data file.
+
+    The range starts at the opening bracket of a row. Rows are decoded up to
+    the end of the range, or to the end of the `data` array.
+
+    :return: A tuple of newline-joined designations and arrays of the
+    approach times (in minutes since the epoch), distances and velocities.
+    """
+    with open(cad_json_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(-1 if end is None else end - start).decode(encoding)
+
+    decoder = json.JSONDecoder()
+    fields = operator.itemgetter(*indices)
+    designations = []
+    times, distances, velocities = array.array('q'), array.array('d'), array.array('d')
+    pos = _WHITESPACE.match(text).end()
+    while text.startswith('[', pos):
+        row, pos = decoder.raw_decode(text, pos)
+        des, cd, dist, v_rel = fields(row)
+        designations.append(des.strip())
+        times.append(cd_to_minutes(cd))
+        distances.append(float(dist))
+        velocities.append(float(v_rel))
+        pos = _WHITESPACE.match(text, pos).end()
+        if text.startswith(',', pos):
+            pos = _WHITESPACE.match(text, pos + 1).end()
+    return '\n'.join(designations), times, distances, velocities
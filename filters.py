@@ -11,9 +11,16 @@ from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest
 from the supplied `CloseApproach`.
 
+The `compile_filters` function fuses such a collection into a single
+`CompiledFilters` predicate: the bounds on each attribute are intersected,
+contradictory bounds are detected before any close approach is examined, and
+the remaining conditions are generated into one function that tests the
+cheaper, usually more selective conditions first.
+
 The `limit` function simply limits the maximum number of values produced by an
 iterator.
 """
+import datetime
 import operator
 import itertools
 
@@ -35,8 +42,10 @@ class AttributeFilter:
     infix notation).
 
     Subclasses can override the `get` classmethod to provide custom
-    behavior to fetch a desired attribute from the given `CloseApproach`.
+    behavior to fetch a desired attribute from the given `CloseApproach`, and
+    name that attribute in `attribute` to let `compile_filters` fuse them.
     """
+    attribute = None
 
     def __init__(self, op, value):
         """Construct a new `AttributeFilter` from an binary predicate and a
@@ -79,6 +88,8 @@ class AttributeFilter:
 
 class DateFilter(AttributeFilter):
     """Filter close approaches based on the date of approach."""
+    attribute = 'time'
+
     @classmethod
     def get(cls, approach):
         return approach.time.date()
@@ -86,6 +97,8 @@ class DateFilter(AttributeFilter):
 
 class DistanceFilter(AttributeFilter):
     """Filter close approaches based on the distance of approach."""
+    attribute = 'distance'
+
     @classmethod
     def get(cls, approach):
         return approach.distance
@@ -93,22 +106,38 @@ class DistanceFilter(AttributeFilter):
 
 class VelocityFilter(AttributeFilter):
     """Filter close approaches based on the velocity of approach."""
+    attribute = 'velocity'
+
     @classmethod
     def get(cls, approach):
         return approach.velocity
 
 
 class DiameterFilter(AttributeFilter):
-    """Filter close approaches based on the NEO's diameter."""
+    """Filter close approaches based on the NEO's diameter.
+
+    A close approach without a linked NEO has an unknown (NaN) diameter.
+    """
+    attribute = 'diameter'
+
     @classmethod
     def get(cls, approach):
+        if approach.neo is None:
+            return float('nan')
         return approach.neo.diameter
 
 
 class HazardousFilter(AttributeFilter):
-    """Filter close approaches based on whether the NEO is hazardous."""
+    """Filter close approaches based on whether the NEO is hazardous.
+
+    A close approach without a linked NEO is neither hazardous nor not.
+    """
+    attribute = 'hazardous'
+
     @classmethod
     def get(cls, approach):
+        if approach.neo is None:
+            return None
         return approach.neo.hazardous
 
 
@@ -183,6 +212,318 @@ def create_filters(
     return filters
 
 
+# The attributes that `compile_filters` can fuse, in the order in which their
+# conditions are tested: the hazardous flag is a single comparison that rules
+# out most approaches, and most NEOs have an unknown diameter.
+ATTRIBUTES = ('hazardous', 'diameter', 'distance', 'velocity', 'time')
+
+# The attributes that belong to the NEO, rather than to the close approach.
+NEO_ATTRIBUTES = ('hazardous', 'diameter')
+
+_ACCESSORS = {
+    'hazardous': 'a.neo.hazardous',
+    'diameter': 'a.neo.diameter',
+    'distance': 'a.distance',
+    'velocity': 'a.velocity',
+    'time': 'a.time',
+}
+
+
+class Bounds:
+    """An interval of values, each end of which may be open, closed or absent."""
+
+    def __init__(self):
+        """Create a new, unbounded `Bounds`."""
+        self.lower, self.lower_inclusive = None, True
+        self.upper, self.upper_inclusive = None, True
+
+    def restrict_lower(self, value, inclusive=True):
+        """Raise the lower end of the interval to `value`, if that's tighter."""
+        if (self.lower is None or value > self.lower
+                or (value == self.lower and not inclusive)):
+            self.lower, self.lower_inclusive = value, inclusive
+
+    def restrict_upper(self, value, inclusive=True):
+        """Lower the upper end of the interval to `value`, if that's tighter."""
+        if (self.upper is None or value < self.upper
+                or (value == self.upper and not inclusive)):
+            self.upper, self.upper_inclusive = value, inclusive
+
+    @property
+    def empty(self):
+        """Return whether no value can lie within the interval."""
+        if self.lower is None or self.upper is None:
+            return False
+        return (self.lower > self.upper
+                or (self.lower == self.upper
+                    and not (self.lower_inclusive and self.upper_inclusive)))
+
+    def __contains__(self, value):
+        """Return whether `value` lies within the interval."""
+        if self.lower is not None and not (
+                self.lower <= value if self.lower_inclusive else self.lower < value):
+            return False
+        if self.upper is not None and not (
+                value <= self.upper if self.upper_inclusive else value < self.upper):
+            return False
+        return True
+
+    def key(self):
+        """Return a hashable description of the interval."""
+        return (self.lower, self.lower_inclusive, self.upper, self.upper_inclusive)
+
+    def expression(self, accessor, name, namespace):
+        """Write the interval as a (chained) Python comparison.
+
+        :param accessor: The expression whose value is compared.
+        :param name: A prefix for the names to which the ends are bound.
+        :param namespace: A dictionary in which to bind the ends.
+        :return: The source of the comparison, or `None` if unbounded.
+        """
+        expression = accessor
+        if self.lower is not None:
+            namespace[f'_{name}_lower'] = self.lower
+            op = '<=' if self.lower_inclusive else '<'
+            expression = f'_{name}_lower {op} {expression}'
+        if self.upper is not None:
+            namespace[f'_{name}_upper'] = self.upper
+            op = '<=' if self.upper_inclusive else '<'
+            expression = f'{expression} {op} _{name}_upper'
+        return expression if expression != accessor else None
+
+    def __repr__(self):
+        """Return a string representation of the interval."""
+        lower = '(-inf' if self.lower is None else (
+            f"{'[' if self.lower_inclusive else '('}{self.lower}")
+        upper = 'inf)' if self.upper is None else (
+            f"{self.upper}{']' if self.upper_inclusive else ')'}")
+        return f'{lower}, {upper}'
+
+
+class CompiledFilters:
+    """A collection of filters fused into one predicate.
+
+    The criteria of the built-in filters are merged into a `Bounds` per
+    attribute (in `bounds`) and a required `hazardous` flag. Date criteria
+    become bounds on the approach `time` as a datetime. Filters that can't be
+    merged - other comparators or custom filter classes - are kept in
+    `residual` and called as they are.
+
+    If the merged criteria contradict each other, `empty` is true and no close
+    approach can match.
+    """
+
+    def __init__(self, filters=()):
+        """Fuse a collection of filters.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        """
+        self.filters = tuple(filters)
+        self.bounds = {}
+        self.hazardous = None
+        self.residual = []
+        self.empty = False
+        self._predicates = {}
+
+        for f in self.filters:
+            if not self._merge(f):
+                self.residual.append(f)
+        if any(bounds.empty for bounds in self.bounds.values()):
+            self.empty = True
+
+    def _merge(self, f):
+        """Merge one filter into the fused criteria, if possible.
+
+        :param f: A filter.
+        :return: Whether the filter was merged.
+        """
+        attribute = getattr(f, 'attribute', None)
+        if attribute not in ATTRIBUTES or not isinstance(f, AttributeFilter):
+            return False
+
+        if attribute == 'hazardous':
+            if f.op is not operator.eq:
+                return False
+            if self.hazardous is not None and self.hazardous != f.value:
+                self.empty = True
+            self.hazardous = f.value
+            return True
+
+        if attribute == 'time':
+            return self._merge_date(f.op, f.value)
+
+        if f.op not in (operator.eq, operator.ge, operator.gt, operator.le, operator.lt):
+            return False
+        if f.value != f.value:
+            # Nothing compares to NaN.
+            self.empty = True
+            return True
+        bounds = self.bounds.setdefault(attribute, Bounds())
+        if f.op in (operator.eq, operator.ge, operator.gt):
+            bounds.restrict_lower(f.value, f.op is not operator.gt)
+        if f.op in (operator.eq, operator.le, operator.lt):
+            bounds.restrict_upper(f.value, f.op is not operator.lt)
+        return True
+
+    def _merge_date(self, op, date):
+        """Merge a criterion on the date of approach as bounds on its time.
+
+        :param op: The comparator of a `DateFilter`.
+        :param date: The reference `date` of a `DateFilter`.
+        :return: Whether the criterion was merged.
+        """
+        if isinstance(date, datetime.datetime) or not isinstance(date, datetime.date):
+            return False
+        if op not in (operator.eq, operator.ge, operator.gt, operator.le, operator.lt):
+            return False
+
+        day = datetime.datetime.combine(date, datetime.time())
+        try:
+            next_day = day + datetime.timedelta(days=1)
+        except OverflowError:
+            next_day = None
+
+        bounds = self.bounds.setdefault('time', Bounds())
+        if op in (operator.eq, operator.ge):
+            bounds.restrict_lower(day)
+        if op is operator.gt:
+            if next_day is None:
+                # Nothing comes after the last representable day.
+                self.empty = True
+            else:
+                bounds.restrict_lower(next_day)
+        if op in (operator.eq, operator.le) and next_day is not None:
+            bounds.restrict_upper(next_day, inclusive=False)
+        if op is operator.lt:
+            bounds.restrict_upper(day, inclusive=False)
+        return True
+
+    def predicate(self, exclude=()):
+        """Generate a single function testing all of the fused criteria.
+
+        The generated function tests the conditions in the order given by
+        `ATTRIBUTES`, followed by the residual filters.
+
+        :param exclude: Attributes whose conditions have already been ensured
+        by the caller (for instance, by an index) and can be left out.
+        :return: A 1-argument predicate on a `CloseApproach`, or `None` if no
+        condition remains to be tested.
+        """
+        exclude = frozenset(exclude)
+        if exclude not in self._predicates:
+            self._predicates[exclude] = self._generate(exclude)
+        return self._predicates[exclude]
+
+    def key(self):
+        """Return a hashable, normalized description of the fused criteria.
+
+        Collections of filters with the same fused criteria have equal keys,
+        whatever the order or redundancy of the filters.
+
+        :return: A hashable key, or None if there are residual filters, whose
+        meaning can't be normalized.
+        """
+        if self.residual:
+            return None
+        if self.empty:
+            return ('empty',)
+        return (self.hazardous,
+                tuple(sorted((attribute, bounds.key())
+                             for attribute, bounds in self.bounds.items())))
+
+    @property
+    def on_neos(self):
+        """Return whether any fused criterion is on an attribute of the NEO."""
+        return self.hazardous is not None or 'diameter' in self.bounds
+
+    def neo_predicate(self):
+        """Generate a single function testing the fused criteria on the NEO.
+
+        The criteria on the close approach itself and the residual filters are
+        left out, so the function can be called on each `NearEarthObject` once
+        instead of on each of its close approaches.
+
+        :return: A 1-argument predicate on a `NearEarthObject`, or `None` if
+        there are no such criteria.
+        """
+        if 'neo' not in self._predicates:
+            self._predicates['neo'] = self._generate(
+                frozenset(ATTRIBUTES) - frozenset(NEO_ATTRIBUTES), neo=True)
+        return self._predicates['neo']
+
+    def _generate(self, exclude, neo=False):
+        """Generate the source of a predicate, and compile it."""
+        if self.empty:
+            return _never
+        namespace = {}
+        terms = []
+        for attribute in ATTRIBUTES:
+            if attribute in exclude:
+                continue
+            accessor = _ACCESSORS[attribute]
+            if neo:
+                accessor = accessor.replace('a.neo.', 'n.')
+            term = None
+            if attribute == 'hazardous':
+                if self.hazardous is not None:
+                    namespace['_hazardous'] = self.hazardous
+                    term = f"{accessor} == _hazardous"
+            elif attribute in self.bounds:
+                term = self.bounds[attribute].expression(
+                    accessor, attribute, namespace)
+            if term:
+                if not (neo or terms) and attribute in NEO_ATTRIBUTES:
+                    # Orphaned approaches never match an NEO criterion.
+                    terms.append('a.neo is not None')
+                terms.append(term)
+        if not neo:
+            for i, f in enumerate(self.residual):
+                namespace[f'_residual{i}'] = f
+                terms.append(f'_residual{i}(a)')
+        if not terms:
+            return None
+
+        source = (f"def predicate({'n' if neo else 'a'}):\n"
+                  f"    return {' and '.join(terms)}\n")
+        exec(compile(source, '<compiled filters>', 'exec'), namespace)
+        return namespace['predicate']
+
+    def __call__(self, approach):
+        """Invoke `self(approach)`."""
+        predicate = self.predicate()
+        return predicate is None or bool(predicate(approach))
+
+    def __repr__(self):
+        """Return a string representation of the fused criteria."""
+        if self.empty:
+            return 'CompiledFilters(<empty>)'
+        conditions = []
+        if self.hazardous is not None:
+            conditions.append(f'hazardous == {self.hazardous!r}')
+        conditions.extend(f'{attribute} in {bounds!r}'
+                          for attribute, bounds in self.bounds.items())
+        conditions.extend(repr(f) for f in self.residual)
+        return f"CompiledFilters({', '.join(conditions)})"
+
+
+def _never(approach):
+    """Match no close approach."""
+    return False
+
+
+def compile_filters(filters=()):
+    """Fuse a collection of filters into a `CompiledFilters`.
+
+    :param filters: A collection of filters, as produced by `create_filters`,
+    or an already compiled `CompiledFilters`.
+    :return: A `CompiledFilters` matching the same close approaches.
+    """
+    if isinstance(filters, CompiledFilters):
+        return filters
+    return CompiledFilters(filters)
+
+
 def limit(iterator, n=None):
     """Produce a limited stream of values from an iterator.
 
@@ -3,14 +3,113 @@
 NASA's dataset provides timestamps as naive datetimes (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`. The `cd_to_datetime64`
+function converts a whole sequence of such strings into a NumPy array of
+`datetime64` values at once (NumPy is optional, and only needed for the latter).
+
+The `cd_to_minutes` function converts such a string into a whole number of
+minutes since the Unix epoch - the compact representation of approach times
+used by the columnar engine and the binary snapshot - and `datetime_to_minutes`
+and `minutes_to_datetime` convert between those numbers and `datetime`s.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
+
+The `lazy_import` function imports an optional dependency only once it's used.
 """
 import datetime
+import functools
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Import a module, but only execute it when one of its attributes is first
+    used.
+
+    Importing NumPy or pyarrow takes a noticeable part of the startup time of
+    every command, though most commands never use them.
+
+    :param name: The name of a top-level module.
+    :return: The module.
+    :raises ImportError: If the module isn't installed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+try:
+    np = lazy_import('numpy')
+except ImportError:  # pragma: no cover - exercised only without NumPy.
+    np = None
+
+
+# English month abbreviations, as used in the `cd` field of NASA's data.
+_MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+# NASA's timestamps are naive datetimes in UTC, so are the minutes we count.
+EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+_ONE_MINUTE = datetime.timedelta(minutes=1)
+
+
+@functools.lru_cache(maxsize=1 << 17)
+def _parse_cd_date(prefix):
+    """Parse the `YYYY-Mon-DD` prefix of a calendar date in NASA's exact layout.
+
+    Close approaches cluster on the same days, so the results are memoized.
+
+    :param prefix: The first 11 characters of a calendar date.
+    :return: A tuple of the year, month, day and proleptic Gregorian ordinal
+    of the date, or `None` if the prefix isn't in exactly that layout.
+    """
+    if not (prefix.isascii() and prefix[4] == '-' and prefix[8] == '-'):
+        return None
+    year, day = prefix[:4], prefix[9:]
+    month = _MONTHS.get(prefix[5:8])
+    if month is None or not (year.isdigit() and day.isdigit()):
+        return None
+    try:
+        date = datetime.date(int(year), month, int(day))
+    except ValueError:
+        return None
+    return date.year, date.month, date.day, date.toordinal()
+
+
+def _parse_cd(calendar_date):
+    """Parse a calendar date in NASA's exact `YYYY-Mon-DD hh:mm` layout.
+
+    :param calendar_date: A calendar date.
+    :return: A tuple of the year, month, day, ordinal, hour and minute of the
+    calendar date, or `None` if it isn't in exactly that layout (in which case
+    it may still be valid, e.g. with a single-digit day).
+    """
+    if (len(calendar_date) != 17 or calendar_date[11] != ' '
+            or calendar_date[14] != ':'):
+        return None
+    date = _parse_cd_date(calendar_date[:11])
+    hour, minute = calendar_date[12:14], calendar_date[15:]
+    if (date is None or not (hour.isascii() and hour.isdigit()
+                             and minute.isascii() and minute.isdigit())):
+        return None
+    hour, minute = int(hour), int(minute)
+    if hour > 23 or minute > 59:
+        return None
+    return date + (hour, minute)
 
 
 def cd_to_datetime(calendar_date):
@@ -23,12 +122,68 @@ def cd_to_datetime(calendar_date):
 
     This will become the Python object `datetime.datetime(2020, 12, 31, 12, 0)`.
 
+    NASA's exact layout is parsed by slicing; anything else (including
+    malformed input, which raises a `ValueError`) falls back to `strptime`.
+
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
     :return: A naive `datetime` corresponding to the given calendar date and time.
     """
+    if isinstance(calendar_date, str):
+        parsed = _parse_cd(calendar_date)
+        if parsed is not None:
+            year, month, day, _, hour, minute = parsed
+            return datetime.datetime(year, month, day, hour, minute)
     return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
 
 
+def cd_to_minutes(calendar_date):
+    """Convert a NASA-formatted calendar date/time into minutes since the epoch.
+
+    The calendar date is interpreted exactly as by `cd_to_datetime`.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: The whole number of minutes from `EPOCH` to that date and time.
+    """
+    parsed = _parse_cd(calendar_date) if isinstance(calendar_date, str) else None
+    if parsed is None:
+        return datetime_to_minutes(cd_to_datetime(calendar_date))
+    _, _, _, ordinal, hour, minute = parsed
+    return ((ordinal - _EPOCH_ORDINAL) * 24 + hour) * 60 + minute
+
+
+def cd_to_datetime64(calendar_dates):
+    """Convert a sequence of NASA-formatted calendar dates into `datetime64`s.
+
+    Each calendar date is interpreted exactly as by `cd_to_datetime`.
+
+    :param calendar_dates: An iterable of calendar dates in YYYY-bb-DD hh:mm
+    format.
+    :return: A NumPy array of `datetime64[m]` values.
+    """
+    if np is None:
+        raise ImportError("Converting to datetime64 requires NumPy.")
+    minutes = np.fromiter(map(cd_to_minutes, calendar_dates), dtype=np.int64)
+    return minutes.view('datetime64[m]')
+
+
+def datetime_to_minutes(dt):
+    """Convert a naive datetime into a number of minutes since the epoch.
+
+    :param dt: A naive Python datetime.
+    :return: The whole number of minutes from `EPOCH` to `dt`.
+    """
+    return (dt - EPOCH) // _ONE_MINUTE
+
+
+def minutes_to_datetime(minutes):
+    """Convert a number of minutes since the epoch into a naive datetime.
+
+    :param minutes: A whole number of minutes since `EPOCH`.
+    :return: The corresponding naive Python datetime.
+    """
+    return EPOCH + datetime.timedelta(0, int(minutes) * 60)
+
+
 def datetime_to_str(dt):
     """Convert a naive Python datetime into a human-readable string.
 
@@ -41,4 +196,5 @@ def datetime_to_str(dt):
     :param dt: A naive Python datetime.
     :return: That datetime, as a human-readable string without seconds.
     """
-    return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+    # Equivalent to `dt.strftime("%Y-%m-%d %H:%M")`, but several times faster.
+    return f"{dt.year}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}"
@@ -0,0 +1,183 @@
+"""Find the close approaches of one NEO without loading the whole data set.
+
+Listing the close approaches of a single NEO (`inspect --verbose`) needs only a
+handful of the rows of `cad.json`. An `ApproachIndex` maps each designation to
+the byte offsets of its rows in the file, so that `find_approaches` can read
+just those rows.
+
+The index is kept in the cache directory next to the snapshots, in the same
+sectioned format (see `snapshot.py`), and is rebuilt whenever `cad.json`
+changes. Its sections are:
+
+    designation     the distinct designations, sorted, newline-joined
+    first           'q' - position in `row_start` of the first row of each
+                    designation, and finally the number of rows
+    row_start       'q' - byte offset of the start of each row, grouped by
+                    designation, in file order within each group
+    row_end         'q' - byte offset of the end of each row, in the same order
+
+A lookup reads the header and the designations, bisects them, and reads only
+the offsets of the matching rows.
+"""
+import array
+import bisect
+import hashlib
+import pathlib
+import struct
+import sys
+
+from extract import index_cad_rows, load_approaches_at
+from snapshot import (VERSION, StaleSnapshotError, check_sources, read_header, read_section,
+                      source_key, write_sections)
+
+
+class ApproachIndex:
+    """The byte offsets of the rows of a close approach data file, by
+    designation."""
+
+    def __init__(self, indices, designations, first, starts, ends):
+        """Create a new `ApproachIndex`.
+
+        :param indices: The positions of the `des`, `cd`, `dist` and `v_rel`
+        fields in each row.
+        :param designations: The distinct designations, sorted.
+        :param first: An array of the position in `starts` of the first row
+        of each designation, followed by the number of rows.
+        :param starts: An array of the start offsets of the rows, grouped by
+        designation.
+        :param ends: An array of the end offsets of the rows, in the same order.
+        """
+        self.indices = indices
+        self.designations = designations
+        self.first = first
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def build(cls, cad_json_path):
+        """Index the rows of a close approach data file.
+
+        :param cad_json_path: A path to a JSON file containing close approach data.
+        :return: A new `ApproachIndex`.
+        """
+        indices, designations, starts, ends = index_cad_rows(cad_json_path)
+        # A stable sort keeps the rows of each designation in file order.
+        order = sorted(range(len(designations)), key=designations.__getitem__)
+        distinct, first = [], array.array('q')
+        for position, row in enumerate(order):
+            if not distinct or designations[row] != distinct[-1]:
+                distinct.append(designations[row])
+                first.append(position)
+        first.append(len(order))
+        return cls(indices, distinct, first,
+                   array.array('q', (starts[row] for row in order)),
+                   array.array('q', (ends[row] for row in order)))
+
+    def spans(self, designation):
+        """Return the start and end offsets of the rows of a designation.
+
+        :param designation: The primary designation of an NEO.
+        :return: A list of tuples of the start and end offset of each row, in
+        file order.
+        """
+        i = bisect.bisect_left(self.designations, designation)
+        if i == len(self.designations) or self.designations[i] != designation:
+            return []
+        return list(zip(self.starts[self.first[i]:self.first[i + 1]],
+                        self.ends[self.first[i]:self.first[i + 1]]))
+
+    def write(self, path, source):
+        """Save the index to a file.
+
+        :param path: Where to write the index.
+        :param source: The `source_key` of the indexed data file.
+        """
+        write_sections(path, {
+            'version': VERSION,
+            'index': 'cad',
+            'source': source,
+            'indices': self.indices,
+            'designations': len(self.designations),
+        }, {
+            'designation': '\n'.join(self.designations).encode('utf-8'),
+            'first': self.first,
+            'row_start': self.starts,
+            'row_end': self.ends,
+        })
+
+
+def index_path(cache_dir, cad_json_path):
+    """Choose where to save the index of a close approach data file.
+
+    :param cache_dir: The directory holding snapshots and indexes.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :return: The path to the index of that data file.
+    """
+    source = str(pathlib.Path(cad_json_path).resolve())
+    name = hashlib.blake2b(source.encode('utf-8'), digest_size=8).hexdigest()
+    return pathlib.Path(cache_dir) / f'cad-{name}.idx'
+
+
+def read_spans(path, cad_json_path, designation):
+    """Look up the rows of a designation in a saved index, reading only what's
+    needed.
+
+    :param path: A path to an index file.
+    :param cad_json_path: A path to the indexed JSON file.
+    :param designation: The primary designation of an NEO.
+    :return: A tuple of the positions of the `des`, `cd`, `dist` and `v_rel`
+    fields in each row, and a list of the start and end offsets of the rows of
+    the designation.
+    :raises StaleSnapshotError: If the index is unreadable or doesn't match
+    the data file.
+    """
+    with open(path, 'rb') as file:
+        header, base = read_header(file)
+        if header.get('index') != 'cad' or not check_sources(
+                path, header, base, [(header['source'], cad_json_path)]):
+            raise StaleSnapshotError(f"{path} is out of date.")
+        designations = read_section(file, header, base, 'designation')
+        designations = designations.split('\n') if header['designations'] else []
+        i = bisect.bisect_left(designations, designation)
+        if i == len(designations) or designations[i] != designation:
+            return header['indices'], []
+        start, stop = read_section(file, header, base, 'first', i, i + 2)
+        starts = read_section(file, header, base, 'row_start', start, stop)
+        ends = read_section(file, header, base, 'row_end', start, stop)
+    return header['indices'], list(zip(starts, ends))
+
+
+def find_approaches(cad_json_path, designation, cache_dir=None):
+    """Read the close approaches of one NEO from a close approach data file.
+
+    With a `cache_dir`, the rows are located with the saved index of the data
+    file, which is built (or rebuilt, if it's stale) and saved as needed. A
+    failure to save the index is reported on stderr but is not fatal. Without
+    one, the data file is indexed anew.
+
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param designation: The primary designation of an NEO.
+    :param cache_dir: The directory holding snapshots and indexes, or None.
+    :return: A list of the (unlinked) `CloseApproach`es of the NEO, in file
+    order.
+    """
+    if cache_dir is not None:
+        path = index_path(cache_dir, cad_json_path)
+        try:
+            indices, spans = read_spans(path, cad_json_path, designation)
+        except (OSError, ValueError, KeyError, struct.error, StaleSnapshotError):
+            pass
+        else:
+            return load_approaches_at(cad_json_path, indices, spans)
+
+    # Key the source before indexing, so that a file changed while it's being
+    # read makes the new index stale rather than silently wrong.
+    source = source_key(cad_json_path) if cache_dir is not None else None
+    index = ApproachIndex.build(cad_json_path)
+    if source is not None:
+        try:
+            index.write(path, source)
+        except OSError as err:
+            print(f"Unable to save an index of the close approach data: {err}",
+                  file=sys.stderr)
+    return load_approaches_at(cad_json_path, index.indices, index.spans(designation))
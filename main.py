@@ -5,7 +5,7 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,aggregate,interactive,serve} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -29,30 +29,98 @@ or JSON format:
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
 
+JSON results are written indented, unless `--compact` is given:
+
+    $ python3 main.py query --outfile results.json --compact
+
+Results can also be saved as newline-delimited JSON, or - if `pyarrow` is
+installed - as an Arrow IPC or Parquet table:
+
+    $ python3 main.py query --outfile results.ndjson
+    $ python3 main.py query --outfile results.parquet
+
+A bare output filename is saved in `data_output/`; any other path is used as it
+is. Results can be compressed on the fly, or written to standard output with
+an explicit `--format`:
+
+    $ python3 main.py query --outfile /scratch/results.csv.gz
+    $ python3 main.py query --outfile - --format ndjson | head
+
+A query that no index narrows down much is a full scan of the close
+approaches, which `--jobs` splits among several worker processes:
+
+    $ python3 main.py query --not-hazardous --min-distance 0.1 --jobs 4 --outfile results.csv
+
+With `--explain`, the `query` subcommand instead prints the plan chosen to
+execute the query, with its estimated and actual row counts:
+
+    $ python3 main.py query --date 2020-03-14 --hazardous --explain
+
+The `aggregate` subcommand takes the same filters, and prints counts and other
+metrics of the matching close approaches, overall or per year, month or NEO:
+
+    $ python3 main.py aggregate --start-date 2020-01-01 --group-by month
+    $ python3 main.py aggregate --hazardous --metric count --metric mean:velocity
+    $ python3 main.py aggregate --group-by neo --metric min:distance --format csv
+
 The `interactive` subcommand loads the NEO database and spawns an interactive
-command shell that can repeatedly execute `inspect` and `query` commands without
-having to wait to reload the database each time. However, it doesn't hot-reload.
+command shell that can repeatedly execute `inspect`, `query` and `aggregate`
+commands without having to wait to reload the database each time. It doesn't pick up changes to
+the code, but when `--neofile` or `--cadfile` changes, the shell reloads it and
+applies the changes to the database before the next command.
+
+The `serve` subcommand also loads the NEO database once, and then answers
+`inspect`, `query` and `aggregate` commands sent by any number of clients over a Unix socket
+(or, given `HOST:PORT`, over TCP), reloading `--neofile` and `--cadfile` into a new database
+when either changes. A client is this script with `--server`:
+
+    $ python3 main.py serve &
+    $ python3 main.py --server query --date 1969-07-29
+    $ python3 main.py --server localhost:8765 inspect --name Halley
 
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. The parsed data is kept in a binary snapshot in
+`--cache-dir` and reused until the data files change (disable with
+`--no-cache`). The `inspect` subcommand doesn't load the data set at all: it
+searches `--neofile` for the one NEO, and reads its close approaches through
+an index of `--cadfile` by designation, kept alongside the snapshots. With
+`--columnar`, queries are evaluated by a vectorized engine over NumPy arrays,
+if NumPy is installed. With `--shared-store`, `query` and `aggregate` instead
+map a column store in `--cache-dir` into memory, which every process on the
+host shares, so that they start almost at once. The results of recent queries
+are kept in memory, which speeds up repeated queries in the `interactive` shell
+and the server (see `--result-cache`).
 """
 import argparse
 import cmd
+import csv
 import datetime
+import functools
+import json
+import os
 import pathlib
 import shlex
 import sys
 import time
 
-from extract import load_neos, load_approaches
-from database import NEODatabase
+from aggregate import COUNT, GROUPS, parse_metric
+from extract import find_neo, load_neos, load_approaches, load_parallel
+from database import SORT_ATTRIBUTES, NEODatabase
 from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+from lookup import find_approaches
+from server import DEFAULT_WORKERS, make_server, request
+from snapshot import load_cached, load_database as load_snapshot_database
+from store import open_store
+from watch import HotReloader, SharedDatabase
+from write import (OUTPUT_ROOT, output_suffix, write_to_csv, write_to_json, write_to_ndjson,
+                   write_to_arrow, write_to_parquet)
 
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
+CACHE_ROOT = PROJECT_ROOT / '.cache'
+SERVER_SOCKET = CACHE_ROOT / 'neo.sock'
 
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
@@ -73,40 +141,12 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
-def make_parser():
-    """Create an ArgumentParser for this script.
+def add_filter_arguments(parser):
+    """Add the options that filter close approaches to a subcommand's parser.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :param parser: The subparser of a subcommand that queries close approaches.
     """
-    parser = argparse.ArgumentParser(
-        description="Explore past and future close approaches of near-Earth objects."
-    )
-
-    # Add arguments for custom data files.
-    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
-                        type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
-    subparsers = parser.add_subparsers(dest='cmd')
-
-    # Add the `inspect` subcommand parser.
-    inspect = subparsers.add_parser('inspect',
-                                    description="Inspect an NEO by primary designation or by name.")
-    inspect.add_argument('-v', '--verbose', action='store_true',
-                         help="Additionally, print all known close approaches of this NEO.")
-    inspect_id = inspect.add_mutually_exclusive_group(required=True)
-    inspect_id.add_argument('-p', '--pdes',
-                            help="The primary designation of the NEO to inspect (e.g. '433').")
-    inspect_id.add_argument('-n', '--name',
-                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
-
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that "
-                                              "match a collection of filters.")
-    filters = query.add_argument_group('Filters',
+    filters = parser.add_argument_group('Filters',
                                        description="Filter close approaches by their attributes "
                                                    "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
@@ -144,21 +184,252 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
-    query.add_argument('-l', '--limit', type=int,
-                       help="The maximum number of matches to return. "
-                            "Defaults to 10 if no --outfile is given.")
+
+
+def make_filters(args):
+    """Create a collection of filters from the filter options of a subcommand.
+
+    :param args: The arguments of a subcommand with the options added by `add_filter_arguments`.
+    :return: A collection of filters, as created by `create_filters`.
+    """
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous
+    )
+
+
+def positive_int(text):
+    """Return the positive integer written in a string, for argparse.
+
+    :param text: An integer, such as `10`.
+    :return: The integer.
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not an integer.")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer.")
+    return value
+
+
+def metric_type(text):
+    """Return the `aggregate.Metric` written in a string, for argparse.
+
+    :param text: A metric, such as `count` or `mean:velocity`.
+    :return: The `Metric`.
+    """
+    try:
+        return parse_metric(text)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+
+def make_parser():
+    """Create an ArgumentParser for this script.
+
+    :return: A tuple of the top-level, inspect, and query parsers.
+    """
+    parser = argparse.ArgumentParser(
+        description="Explore past and future close approaches of near-Earth objects."
+    )
+
+    # Add arguments for custom data files.
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--cache-dir', default=CACHE_ROOT, type=pathlib.Path,
+                        help="Directory in which to keep binary snapshots of the parsed "
+                             "data files.")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always parse the data files, neither reading nor writing a snapshot.")
+    parser.add_argument('--load-jobs', type=int, default=1, metavar='N',
+                        help="Parse the data files with N worker processes (0 for one per CPU).")
+    parser.add_argument('--shared-store', action='store_true',
+                        help="Answer `query` and `aggregate` from a memory-mapped column store in "
+                             "--cache-dir, whose pages are shared by every process on the host, "
+                             "instead of building a database (requires NumPy).")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Evaluate queries with the vectorized columnar engine "
+                             "(requires NumPy).")
+    parser.add_argument('--result-cache', type=int, default=128, metavar='N',
+                        help="Keep the results of the N most recent queries (0 to disable), "
+                             "for `interactive` and `serve`.")
+    parser.add_argument('--result-cache-bytes', type=int, metavar='BYTES',
+                        help="Limit the total size of the kept query results.")
+    parser.add_argument('--server', nargs='?', const=SERVER_SOCKET, metavar='ADDRESS',
+                        help="Send the `inspect`, `query` or `aggregate` command to a server "
+                             f"started with `serve` (at ADDRESS, by default {SERVER_SOCKET}) "
+                             "instead of loading the data.")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    # Add the `inspect` subcommand parser.
+    inspect = subparsers.add_parser('inspect',
+                                    description="Inspect an NEO by primary designation or by name.")
+    inspect.add_argument('-v', '--verbose', action='store_true',
+                         help="Additionally, print all known close approaches of this NEO.")
+    inspect_id = inspect.add_mutually_exclusive_group(required=True)
+    inspect_id.add_argument('-p', '--pdes',
+                            help="The primary designation of the NEO to inspect (e.g. '433').")
+    inspect_id.add_argument('-n', '--name',
+                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query',
+                                  description="Query for close approaches that "
+                                              "match a collection of filters.")
+    add_filter_arguments(query)
+    query_count = query.add_mutually_exclusive_group()
+    query_count.add_argument('-l', '--limit', type=int,
+                             help="The maximum number of matches to return. "
+                                  "Defaults to 10 if no --outfile is given.")
+    query_count.add_argument('--top', type=positive_int, metavar='N',
+                             help="With --sort-by, return only the first N sorted matches. "
+                                  "Like --limit, but never sorts more matches than needed.")
+    query.add_argument('--sort-by', choices=SORT_ATTRIBUTES,
+                       help="Return matches in ascending order of the given attribute "
+                            "(close approaches of NEOs of unknown diameter come last).")
+    query.add_argument('--desc', action='store_true',
+                       help="With --sort-by, sort in descending order instead.")
+    query.add_argument('-j', '--jobs', type=int, metavar='N',
+                       help="Scan the close approaches with up to N worker processes (0 for "
+                            "one per CPU) when no index can narrow the query down. Fewer are "
+                            "used if there are too few close approaches to keep them busy.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
-                       help="File in which to save structured results. "
+                       help="File in which to save structured results, or `-` for standard "
+                            "output. A bare filename is saved in data_output/. A `.gz`, "
+                            "`.bz2`, `.xz` or `.zst` extension compresses the file. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--format', choices=('csv', 'json', 'ndjson', 'jsonl', 'arrow', 'parquet'),
+                       help="The format of the saved results. "
+                            "Defaults to the one given by the extension of --outfile.")
+    query.add_argument('--compact', action='store_true',
+                       help="Write JSON results without indentation or whitespace.")
+    query.add_argument('--explain', action='store_true',
+                       help="Instead of the results, print how the query is executed, "
+                            "with estimated and actual row counts.")
+
+    # Add the `aggregate` subcommand parser.
+    aggregate = subparsers.add_parser('aggregate',
+                                      description="Count and summarize the close approaches "
+                                                  "that match a collection of filters.")
+    add_filter_arguments(aggregate)
+    aggregate.add_argument('-g', '--group-by', choices=GROUPS,
+                           help="Summarize the close approaches of each year, month or NEO "
+                                "separately.")
+    aggregate.add_argument('-m', '--metric', dest='metrics', action='append', type=metric_type,
+                           metavar='METRIC',
+                           help="A metric to compute: `count`, or FUNCTION:ATTRIBUTE with a "
+                                "FUNCTION among min, max, mean and sum and an ATTRIBUTE among "
+                                "distance, velocity and diameter (e.g. mean:velocity). "
+                                "May be repeated. Defaults to count.")
+    aggregate.add_argument('--format', choices=('table', 'csv', 'json'), default='table',
+                           help="How to print the summary. Defaults to an aligned table.")
 
     repl = subparsers.add_parser('interactive',
-                                 description="Start an interactive command session "
-                                             "to repeatedly run `interact` and `query` commands.")
+                                 description="Start an interactive command session to "
+                                             "repeatedly run `inspect`, `query` and "
+                                             "`aggregate` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
+
+    serve = subparsers.add_parser('serve',
+                                  description="Load the data once, and answer `inspect`, "
+                                              "`query` and `aggregate` commands sent with "
+                                              "`--server`.")
+    serve.add_argument('--address', default=SERVER_SOCKET,
+                       help="The path of the Unix socket to listen on, or HOST:PORT to "
+                            "listen on TCP (on a loopback address only, and answering with "
+                            f"standard output only). Defaults to {SERVER_SOCKET}.")
+    serve.add_argument('--workers', type=int, default=DEFAULT_WORKERS, metavar='N',
+                       help="The number of commands to answer concurrently.")
     return parser, inspect, query
 
 
+def load_data(args):
+    """Load the NEOs and close approaches from the data files given at the
+    command line.
+
+    Unless `--no-cache` was given, the NEOs and close approaches are loaded from
+    a snapshot of the data files in `--cache-dir`, which is (re)built whenever
+    it's missing or stale. The data files are parsed by `--load-jobs` processes.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A tuple of a list of `NearEarthObject`s and a list of `CloseApproach`es.
+    """
+    jobs = args.load_jobs or None
+    if not args.no_cache:
+        return load_cached(args.neofile, args.cadfile, args.cache_dir, jobs)
+    if jobs == 1:
+        return load_neos(args.neofile), load_approaches(args.cadfile)
+    return load_parallel(args.neofile, args.cadfile, jobs)
+
+
+def database_options(args):
+    """Return the keyword arguments of an `NEODatabase` given at the command line.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A dictionary of keyword arguments.
+    """
+    return {'columnar': args.columnar, 'cache_entries': args.result_cache,
+            'cache_bytes': args.result_cache_bytes}
+
+
+def build_database(args, neos, approaches):
+    """Build an `NEODatabase` with the options given at the command line.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param neos: A collection of `NearEarthObject`s.
+    :param approaches: A collection of `CloseApproach`es.
+    :return: A new `NEODatabase`.
+    """
+    return NEODatabase(neos, approaches, **database_options(args))
+
+
+def load_database(args):
+    """Build the `NEODatabase` for the data files given at the command line.
+
+    Unless `--no-cache` was given, the database is built from a snapshot in
+    `--cache-dir`, with the indexes saved in it, and builds its close
+    approaches only as queries need them (see `snapshot.load_database`).
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A new `NEODatabase`.
+    """
+    if not args.no_cache:
+        return load_snapshot_database(args.neofile, args.cadfile, args.cache_dir,
+                                      args.load_jobs or None, **database_options(args))
+    return build_database(args, *load_data(args))
+
+
+def load_inspect_database(args):
+    """Build an `NEODatabase` holding only the NEO given to the `inspect`
+    subcommand.
+
+    The NEO is found in `--neofile` without loading the others. Only with
+    `--verbose` are its close approaches read from `--cadfile`, through an
+    index of the file's rows by designation that's kept in `--cache-dir`
+    (unless `--no-cache` was given).
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A new `NEODatabase`, empty if there's no such NEO.
+    """
+    neo = find_neo(args.neofile, pdes=args.pdes, name=args.name)
+    if neo is None:
+        return build_database(args, [], [])
+    approaches = []
+    if args.verbose:
+        cache_dir = None if args.no_cache else args.cache_dir
+        approaches = find_approaches(args.cadfile, neo.designation, cache_dir)
+    return build_database(args, [neo], approaches)
+
+
 def inspect(database, pdes=None, name=None, verbose=False):
     """Perform the `inspect` subcommand.
 
@@ -201,6 +472,12 @@ def query(database, args):
     Create a collection of filters with `create_filters` and supply them to the
     database's `query` method to produce a stream of matching results.
 
+    With `--explain`, print the plan chosen for the query instead of its results.
+
+    With `--sort-by`, the results are sorted; with `--top` or `--limit` (or, on
+    stdout, the default limit), only the first results in sorted order are
+    found, without sorting every match.
+
     If an output file wasn't given, print these results to stdout, limiting to
     10 entries if no limit was specified. If an output file was given, use the
     file's extension to infer whether the file should hold CSV or JSON data, and
@@ -210,28 +487,154 @@ def query(database, args):
     :param args: All arguments from the command line, as parsed by the top-level parser.
     """
     # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
+    filters = make_filters(args)
+    if args.explain:
+        print(database.explain(filters))
+        return
+    if args.top is not None and not args.sort_by:
+        print("Please choose an attribute to sort by with --sort-by to use --top.",
+              file=sys.stderr)
+        return
+
+    # Limit the results, to 10 entries on stdout if not specified.
+    count = args.top if args.top is not None else args.limit
+    if not args.outfile:
+        count = count or 10
+
     # Query the database with the collection of filters.
-    results = database.query(filters)
+    jobs = args.jobs if args.jobs != 0 else os.cpu_count()
+    if args.sort_by:
+        results = database.query(filters, sort_by=args.sort_by, descending=args.desc,
+                                 top=count or None, jobs=jobs)
+    else:
+        results = database.query(filters, jobs=jobs)
 
     if not args.outfile:
-        # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
+        # Write the results to stdout.
+        for result in limit(results, count):
             print(result)
     else:
-        # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
-        else:
-            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+        # Write the results to a file (or stream), in the format given by
+        # `--format` or by the file's extension.
+        suffix = f'.{args.format}' if args.format else output_suffix(args.outfile)
+        results = limit(results, count)
+        try:
+            if suffix == '.csv':
+                write_to_csv(results, args.outfile)
+            elif suffix == '.json':
+                write_to_json(results, args.outfile, indent=None if args.compact else 2)
+            elif suffix in ('.ndjson', '.jsonl'):
+                write_to_ndjson(results, args.outfile)
+            elif suffix == '.arrow':
+                write_to_arrow(results, args.outfile)
+            elif suffix == '.parquet':
+                write_to_parquet(results, args.outfile)
+            else:
+                print("Please use an output file that ends with `.csv`, `.json`, `.ndjson`, "
+                      "`.jsonl`, `.arrow` or `.parquet`, or choose a --format.",
+                      file=sys.stderr)
+        except ImportError as err:
+            print(err, file=sys.stderr)
+
+
+def aggregate(database, args):
+    """Perform the `aggregate` subcommand.
+
+    Summarize the close approaches that match the filters given at the command line, with
+    the database's `aggregate` method, and print the summary as a table, CSV or JSON.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    table = database.aggregate(make_filters(args), group_by=args.group_by,
+                               metrics=args.metrics or [COUNT])
+    if args.format == 'json':
+        json.dump([dict(zip(table.columns, row)) for row in table.rows], sys.stdout, indent=2)
+        print()
+    elif args.format == 'csv':
+        writer = csv.writer(sys.stdout, lineterminator='\n')
+        writer.writerow(table.columns)
+        writer.writerows(['' if value is None else value for value in row]
+                         for row in table.rows)
+    else:
+        cells = [table.columns] + [[_format_cell(value) for value in row] for row in table.rows]
+        widths = [max(len(row[i]) for row in cells) for i in range(len(table.columns))]
+        for row in cells:
+            print('  '.join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def _format_cell(value):
+    """Format a value of a summary for an aligned table."""
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.6g}'
+    return str(value)
+
+
+def run_command(shared, parser, argv, cwd=None):
+    """Run an `inspect`, `query` or `aggregate` command sent to the server.
+
+    The command-line arguments are parsed as if they had been given to this
+    script; top-level options (such as the data files) are ignored, since the
+    database is already loaded. An output file is resolved against the
+    client's working directory, as it would be if the client ran the command.
+    Without a working directory (as for TCP clients), output files other than
+    standard output are refused.
+
+    :param shared: The `watch.SharedDatabase` holding the current `NEODatabase`, which is
+    brought up to date with the data files before the command runs.
+    :param parser: The top-level parser.
+    :param argv: The command-line arguments of the command.
+    :param cwd: The working directory of the client, or None.
+    :return: The exit status of the command.
+    """
+    args = parser.parse_args(argv)
+    database = shared.current()
+    if args.cmd == 'inspect':
+        neo = inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+        return 0 if neo else 1
+    if args.cmd == 'aggregate':
+        aggregate(database, args)
+        return 0
+    if args.cmd != 'query':
+        print("The server only answers `inspect`, `query` and `aggregate` commands.",
+              file=sys.stderr)
+        return 2
+    if args.outfile and str(args.outfile) != '-':
+        if not cwd:
+            print("This server only writes results to standard output (`--outfile -`).",
+                  file=sys.stderr)
+            return 2
+        outfile = args.outfile
+        if not os.path.dirname(outfile):
+            outfile = pathlib.Path(OUTPUT_ROOT) / outfile
+        args.outfile = pathlib.Path(cwd) / outfile
+    query(database, args)
+    return 0
+
+
+def serve(shared, parser, address, workers):
+    """Perform the `serve` subcommand.
+
+    Answer commands sent with `--server` until interrupted.
+
+    :param shared: The `watch.SharedDatabase` holding the current `NEODatabase`.
+    :param parser: The top-level parser, with which to parse the commands.
+    :param address: The address on which to listen.
+    :param workers: The number of commands to answer concurrently.
+    """
+    try:
+        server = make_server(functools.partial(run_command, shared, parser), address, workers)
+    except (OSError, ValueError) as err:
+        sys.exit(f"Unable to serve on {address}: {err}")
+    print(f"Serving on {address}. Press Ctrl-C to stop.", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 class NEOShell(cmd.Cmd):
@@ -239,18 +642,19 @@ class NEOShell(cmd.Cmd):
 
     This is a `cmd.Cmd` shell - a specialized tool for command-based REPL sessions.
 
-    It wraps the `inspect` and `query` parsers to parse flags for those commands
-    as if they were supplied at the command line.
+    It wraps the `inspect`, `query` and `aggregate` parsers to parse flags for
+    those commands as if they were supplied at the command line.
 
     The primary purpose of this shell is to allow users to repeatedly perform
-    inspect and query commands, while only loading the data (which can be quite
-    slow) once.
+    inspect, query and aggregate commands, while only loading the data (which
+    can be quite slow) once.
     """
     intro = ("Explore close approaches of near-Earth objects. "
              "Type `help` or `?` to list commands and `exit` to exit.\n")
     prompt = '(neo) '
 
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
+    def __init__(self, database, inspect_parser, query_parser, aggressive=False, reloader=None,
+                 parser=None, **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use `.cmdloop()`.
@@ -259,6 +663,10 @@ class NEOShell(cmd.Cmd):
         :param inspect_parser: The subparser for the `inspect` subcommand.
         :param query_parser: The subparser for the `query` subcommand.
         :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param reloader: A `watch.HotReloader` with which to pick up changes to the data files
+        before each command, or None.
+        :param parser: The top-level parser, with which to parse `aggregate` commands. If
+        None, a new one is made with `make_parser`.
         :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
         """
         super().__init__(**kwargs)
@@ -266,6 +674,8 @@ class NEOShell(cmd.Cmd):
         self.inspect = inspect_parser
         self.query = query_parser
         self.aggressive = aggressive
+        self.reloader = reloader
+        self.parser = parser if parser is not None else make_parser()[0]
 
     @classmethod
     def parse_arg_with(cls, arg, parser):
@@ -344,14 +754,49 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+
+        The results can be sorted with `--sort-by` (and `--desc`), and `--top`
+        returns only the first few, such as the five closest approaches in March:
+
+            (neo) query --start-date 2020-03-01 --end-date 2020-03-31 --sort-by distance --top 5
+
+        To see how a query is executed, and how many rows it examines, use
+        `--explain`:
+
+            (neo) query --start-date 2020-01-01 --max-distance 0.025 --explain
         """
         args = self.parse_arg_with(arg, self.query)
         if not args:
             return
 
-        # Run the `inspect` subcommand.
+        # Run the `query` subcommand.
         query(self.db, args)
 
+    def do_a(self, arg):
+        """Shorthand for `aggregate`."""
+        self.do_aggregate(arg)
+
+    def do_aggregate(self, arg):
+        """Perform the `aggregate` subcommand within the REPL session.
+
+        This command behaves the same as the `aggregate` subcommand from the
+        command line, and takes the same filters as `query`. For example, to
+        count the close approaches of each month of 2020:
+
+            (neo) aggregate --start-date 2020-01-01 --end-date 2020-12-31 --group-by month
+
+        Other metrics can be computed with `--metric`, and the summary printed
+        as CSV or JSON with `--format`:
+
+            (neo) aggregate --hazardous --metric count --metric mean:velocity --format csv
+        """
+        args = self.parse_arg_with(f'aggregate {arg}', self.parser)
+        if not args:
+            return
+
+        # Run the `aggregate` subcommand.
+        aggregate(self.db, args)
+
     def do_EOF(self, _arg):
         """Exit the interactive session."""
         return True
@@ -361,7 +806,10 @@ class NEOShell(cmd.Cmd):
     do_quit = do_EOF
 
     def precmd(self, line):
-        """Watch for changes to the files in this project."""
+        """Watch for changes to the files in this project, and reload the data files if they
+        have changed."""
+        if self.reloader is not None:
+            self.reload_data()
         changed = [f for f in PROJECT_ROOT.glob('*.py') if f.stat().st_mtime > _START]
         if changed:
             print("The following file(s) have been modified since this interactive session began: "
@@ -375,22 +823,69 @@ class NEOShell(cmd.Cmd):
                 return 'exit'
         return line
 
+    def reload_data(self):
+        """Pick up any changes to the data files, keeping the current data if they can't be
+        loaded."""
+        try:
+            outcome = self.reloader.reload()
+        except (OSError, ValueError) as err:
+            print(f"Unable to reload the data files: {err}", file=sys.stderr)
+            return
+        if outcome is not None:
+            self.db = self.reloader.database
+            how = ("applied the changes" if outcome == 'updated'
+                   else "rebuilt the database")
+            print(f"The data files have changed; {how}.", file=sys.stderr)
+
 
 def main():
     """Run the main script."""
     parser, inspect_parser, query_parser = make_parser()
     args = parser.parse_args()
 
-    # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    # Let a running server answer the command, if asked to.
+    if args.server and args.cmd in ('inspect', 'query', 'aggregate'):
+        try:
+            sys.exit(request(args.server, sys.argv[1:]))
+        except OSError as err:
+            sys.exit(f"Unable to reach the server at {args.server}: {err}")
+
+    # Extract data from the data files into structured Python objects. To
+    # inspect an NEO, only that NEO (and its close approaches) are needed.
+    if args.cmd == 'inspect':
+        database = load_inspect_database(args)
+    elif args.shared_store and args.cmd in ('query', 'aggregate'):
+        if args.no_cache:
+            parser.error("--shared-store keeps its store in --cache-dir, so it can't be "
+                         "used with --no-cache.")
+        try:
+            database = open_store(args.neofile, args.cadfile, args.cache_dir,
+                                  args.load_jobs or None)
+        except (ImportError, OSError) as err:
+            sys.exit(f"Unable to open the column store: {err}")
+    else:
+        database = load_database(args)
 
     # Run the chosen subcommand.
     if args.cmd == 'inspect':
         inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
     elif args.cmd == 'query':
         query(database, args)
+    elif args.cmd == 'aggregate':
+        aggregate(database, args)
     elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+        reloader = HotReloader(database, (args.neofile, args.cadfile),
+                               functools.partial(load_data, args),
+                               functools.partial(build_database, args))
+        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive,
+                 reloader=reloader, parser=parser).cmdloop()
+    elif args.cmd == 'serve':
+        # Commands still running keep the old database, so changes to the data
+        # files are loaded into a new one.
+        reloader = HotReloader(database, (args.neofile, args.cadfile),
+                               functools.partial(load_data, args),
+                               functools.partial(build_database, args), in_place=False)
+        serve(SharedDatabase(database, reloader), parser, args.address, args.workers)
 
 
 if __name__ == '__main__':
@@ -16,6 +16,8 @@ data files from NASA, so these objects should be able to handle all of the
 quirks of the data set, such as missing names and unknown diameters.
 
 """
+import datetime
+
 from helpers import cd_to_datetime, datetime_to_str
 
 
@@ -30,7 +32,11 @@ class NearEarthObject:
     A `NearEarthObject` also maintains a collection of its close approaches -
     initialized to an empty collection, but eventually populated in the
     `NEODatabase` constructor.
+
+    The full data set holds hundreds of thousands of these objects, so they
+    use `__slots__` instead of a per-instance `__dict__`.
     """
+    __slots__ = ('designation', 'name', 'diameter', 'hazardous', 'approaches', 'extra')
 
     def __init__(
             self,
@@ -54,6 +60,9 @@ class NearEarthObject:
         # Create an empty initial collection of linked approaches.
         self.approaches = []
 
+        # Any additional fields requested from `extract.load_neos`.
+        self.extra = None
+
     @property
     def fullname(self):
         """Return a representation of the full name of this NEO."""
@@ -88,16 +97,25 @@ class CloseApproach:
     initially, this information (the NEO's primary designation) is saved in a
     private attribute, but the referenced NEO is eventually replaced in the
     `NEODatabase` constructor.
+
+    Like `NearEarthObject`, a `CloseApproach` uses `__slots__` to save memory.
     """
+    __slots__ = ('_designation', 'time', 'distance', 'velocity', 'neo')
 
     def __init__(self, designation, time, distance, velocity, neo=None):
         """Create a new `CloseApproach`.
 
-        :param info: A dictionary of excess keyword arguments supplied to the
-        constructor.
+        :param designation: The primary designation of the approaching NEO.
+        :param time: The time of closest approach, either as a NASA-formatted
+        calendar date string or as an already-parsed naive `datetime`.
+        :param distance: The nominal approach distance, in astronomical units.
+        :param velocity: The relative approach velocity, in kilometers per
+        second.
+        :param neo: The approaching `NearEarthObject`, if already known.
         """
         self._designation = designation
-        self.time = cd_to_datetime(time)
+        self.time = (time if isinstance(time, datetime.datetime)
+                     else cd_to_datetime(time))
         self.distance = float(distance)
         self.velocity = float(velocity)
         self.neo = neo
@@ -0,0 +1,159 @@
+"""Scan the close approaches for the matches of a query on several cores.
+
+A query that no index or columnar engine can narrow down calls its predicate
+on every `CloseApproach`, one at a time. `scan` instead splits the close
+approaches into chunks of consecutive positions, and evaluates the predicate
+on each chunk in a pool of workers. The positions of the matches are
+generated chunk by chunk in internal order, so the stream of matches is the
+same as that of a serial scan.
+
+Only a few chunks beyond the one being consumed are in flight at a time, so
+a consumer that stops early (say, once a `limit` is reached) doesn't wait for
+- or pay for - the rest of the scan. The first chunk is scanned in the calling
+thread, before the pool is started, so that a consumer that stops within it
+doesn't pay for starting the pool either.
+
+The workers are processes, forked from the current process so that they
+share its close approaches and predicate (which needn't be picklable) without
+copying them. Where `fork` isn't available, or on a free-threaded build of
+Python, where threads run in parallel, the workers are threads instead. A
+process that is already running other threads (such as the `serve` command's
+server) is never forked, since a lock held by another thread at the time of
+the fork would stay locked forever in the child.
+
+Starting a worker and collecting its results takes longer than scanning a few
+tens of thousands of close approaches, so `worker_count` only asks for as many
+workers as the scan keeps busy - and for none, meaning a serial scan, when
+there are too few close approaches, a single CPU, or only threads that the GIL
+would run one at a time.
+"""
+import array
+import collections
+import concurrent.futures
+import functools
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+
+
+# The default number of close approaches in each chunk.
+CHUNK_SIZE = 1 << 15
+
+# The number of chunks per worker to keep in flight.
+PREFETCH = 2
+
+# The smallest number of close approaches worth scanning on one more worker.
+# Forking a worker takes about as long as scanning 40,000 close approaches.
+MIN_SCAN_SIZE = 1 << 17
+
+# The close approaches and predicate of a forked worker process.
+_approaches = _predicate = None
+
+
+def _free_threaded():
+    """Return whether threads run Python code in parallel in this build."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _can_fork():
+    """Return whether worker processes can be safely forked from this one."""
+    return ('fork' in multiprocessing.get_all_start_methods()
+            and threading.active_count() == 1)
+
+
+def usable_cpus():
+    """Return the number of CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def worker_count(jobs, size):
+    """Decide how many workers to scan some close approaches with.
+
+    :param jobs: The number of workers asked for, or None.
+    :param size: The number of close approaches to scan.
+    :return: The number of workers worth starting, at most `jobs`; 1 means
+    that the scan should be serial.
+    """
+    if jobs is None or jobs <= 1 or not (_free_threaded() or _can_fork()):
+        return 1
+    return max(1, min(jobs, usable_cpus(), size // MIN_SCAN_SIZE))
+
+
+def _init_worker(approaches, predicate):
+    """Keep the close approaches and predicate of a forked worker process."""
+    global _approaches, _predicate
+    _approaches, _predicate = approaches, predicate
+
+
+def _scan_chunk(start, stop):
+    """Scan a chunk of the close approaches of a forked worker process."""
+    return _scan(_approaches, _predicate, start, stop)
+
+
+def _scan(approaches, predicate, start, stop):
+    """Find the positions of the matches among a chunk of close approaches.
+
+    :return: An array of the matching positions, in ascending order.
+    """
+    return array.array('i', (i for i in range(start, stop) if predicate(approaches[i])))
+
+
+def make_pool(jobs, approaches, predicate):
+    """Start a pool of workers to scan some close approaches.
+
+    :param jobs: The number of workers.
+    :param approaches: A sequence of `CloseApproach`es.
+    :param predicate: A function of a `CloseApproach`, true for the matches.
+    :return: A tuple of a `concurrent.futures.Executor` and the function that
+    scans a chunk, given its start and stop positions, on it.
+    """
+    if _free_threaded() or not _can_fork():
+        return (concurrent.futures.ThreadPoolExecutor(jobs),
+                functools.partial(_scan, approaches, predicate))
+    pool = concurrent.futures.ProcessPoolExecutor(
+        jobs, mp_context=multiprocessing.get_context('fork'),
+        initializer=_init_worker, initargs=(approaches, predicate))
+    return pool, _scan_chunk
+
+
+def scan(approaches, predicate, jobs, chunk_size=CHUNK_SIZE):
+    """Generate the positions of the close approaches matching a predicate,
+    scanning chunks of them on a pool of workers.
+
+    The first chunk is scanned in this thread. The pool is only started once
+    the positions of the first chunk have all been consumed, and is shut down
+    once the scan is done or the generator is closed, cancelling the chunks
+    that haven't been scanned yet.
+
+    :param approaches: A sequence of `CloseApproach`es.
+    :param predicate: A function of a `CloseApproach`, true for the matches.
+    :param jobs: The number of workers.
+    :param chunk_size: The number of close approaches in each chunk.
+    :return: A stream of the positions of the matches, in ascending order.
+    """
+    size = len(approaches)
+    yield from _scan(approaches, predicate, 0, min(chunk_size, size))
+    if chunk_size >= size:
+        return
+
+    chunks = iter(range(chunk_size, size, chunk_size))
+    pool, task = make_pool(jobs, approaches, predicate)
+    pending = collections.deque()
+    try:
+        for start in itertools.islice(chunks, jobs * PREFETCH):
+            pending.append(pool.submit(task, start, min(start + chunk_size, size)))
+        while pending:
+            positions = pending.popleft().result()
+            start = next(chunks, None)
+            if start is not None:
+                pending.append(pool.submit(task, start, min(start + chunk_size, size)))
+            yield from positions
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
@@ -0,0 +1,420 @@
+"""Choose how an `NEODatabase` answers a query.
+
+An `NEODatabase` can find the close approaches that match a query along one of
+several access paths: scanning every close approach, bisecting one of its
+sorted indexes (`SortedIndex`) to the range of values allowed by the query,
+testing the criteria on the NEOs first and examining only the close approaches
+of the NEOs that pass, or evaluating a mask over its columnar engine. The
+`plan_query` function estimates the cost of each available path from
+per-column `Histogram`s built when the database is loaded, and returns the
+cheapest as a `QueryPlan`.
+
+A `QueryPlan` also records the estimated number of candidates it examines and
+of rows it produces, and - once executed by `NEODatabase.explain` - the actual
+numbers, so that a slow query can be diagnosed.
+
+For a query that wants only its first few matches in sorted order,
+`prefer_index_walk` decides whether to walk the sorted index of the sort
+attribute instead.
+"""
+import bisect
+import heapq
+import math
+import operator
+
+
+# Relative costs of the steps of executing a query, per close approach.
+ROW_COST = 1.0        # Testing a generated predicate on a `CloseApproach`.
+SORT_COST = 0.05      # Restoring internal order, per comparison.
+VECTOR_COST = 0.02    # Evaluating a vectorized condition over a column.
+WALK_COST = 2.0       # Stepping through a sorted index and testing a predicate.
+
+HISTOGRAM_BUCKETS = 64
+
+# A `SortedIndex` merges its buffer of appended close approaches into the index
+# once the buffer holds more than `PENDING_MIN` and more than 1 in
+# `PENDING_FRACTION` of the indexed close approaches.
+PENDING_MIN = 1024
+PENDING_FRACTION = 16
+
+
+class Histogram:
+    """An equi-depth histogram of the values of one column.
+
+    The histogram keeps `HISTOGRAM_BUCKETS + 1` boundaries, each bucket holding
+    about the same number of values, and estimates the fraction of values
+    within a range by interpolating linearly within the buckets. NaN values
+    (unknown diameters) are counted, but never lie within any range.
+    """
+
+    def __init__(self, sorted_values, total=None, buckets=HISTOGRAM_BUCKETS):
+        """Create a new `Histogram`.
+
+        :param sorted_values: The known (non-NaN) values of the column, in
+        ascending order.
+        :param total: The number of values in the column, including unknown
+        values (by default, the number of known values).
+        :param buckets: The number of buckets.
+        """
+        count = len(sorted_values)
+        self.total = count if total is None else total
+        self.known = count
+        if count:
+            buckets = min(buckets, count)
+            self.boundaries = [sorted_values[(count - 1) * i // buckets]
+                               for i in range(buckets + 1)]
+        else:
+            self.boundaries = []
+
+    @classmethod
+    def from_boundaries(cls, boundaries, known, total):
+        """Recreate a `Histogram` from the boundaries of one built earlier.
+
+        :param boundaries: The boundaries of the histogram's buckets.
+        :param known: The number of known values.
+        :param total: The number of values, including unknown values.
+        :return: A new `Histogram`.
+        """
+        histogram = cls([], total)
+        histogram.known = known
+        histogram.boundaries = list(boundaries)
+        return histogram
+
+    def fraction(self, bounds):
+        """Estimate the fraction of values that lie within some bounds.
+
+        :param bounds: A `filters.Bounds`.
+        :return: A number between 0 and 1.
+        """
+        if not self.total or not self.boundaries:
+            return 0.0
+        lower = 0.0 if bounds.lower is None else self._rank(bounds.lower)
+        upper = 1.0 if bounds.upper is None else self._rank(bounds.upper)
+        return max(upper - lower, 0.0) * self.known / self.total
+
+    def _rank(self, value):
+        """Estimate the fraction of known values that are less than `value`."""
+        boundaries = self.boundaries
+        buckets = len(boundaries) - 1
+        if value <= boundaries[0]:
+            return 0.0
+        if value > boundaries[-1]:
+            return 1.0
+        if buckets == 0:
+            return 0.5
+        i = bisect.bisect_left(boundaries, value) - 1
+        lo, hi = boundaries[i], boundaries[i + 1]
+        within = 0.5 if hi == lo else _ratio(value, lo, hi)
+        return (i + within) / buckets
+
+
+def _ratio(value, lo, hi):
+    """Return where `value` lies between `lo` and `hi`, from 0 to 1."""
+    try:
+        return min(max((value - lo) / (hi - lo), 0.0), 1.0)
+    except TypeError:
+        # Differences of datetimes are timedeltas.
+        return min(max((value - lo).total_seconds() / (hi - lo).total_seconds(), 0.0), 1.0)
+
+
+class SortedIndex:
+    """The positions of some close approaches, sorted by one attribute.
+
+    Ties keep their internal order. `keys` holds the sorted values, aligned
+    with `order`, so that a range of values can be found by bisection.
+
+    Close approaches appended to the index with `extend` are first kept in a
+    small, separately sorted buffer (`pending_keys` and `pending_order`), which
+    is merged into `keys` and `order` once it holds more than 1 in
+    `PENDING_FRACTION` of the indexed close approaches. Since appended close
+    approaches come last in internal order, the matches in the buffer follow
+    those in the index.
+    """
+
+    def __init__(self, approaches, attribute):
+        """Create a new `SortedIndex`.
+
+        :param approaches: A sequence of `CloseApproach`es.
+        :param attribute: The name of the attribute to sort by.
+        """
+        self.attribute = attribute
+        values = [getattr(approach, attribute) for approach in approaches]
+        self.order = sorted(range(len(values)), key=values.__getitem__)
+        self.keys = [values[i] for i in self.order]
+        self.in_internal_order = all(
+            i == position for i, position in enumerate(self.order))
+        self.pending_keys = []
+        self.pending_order = []
+
+    @classmethod
+    def from_order(cls, attribute, order, keys, in_internal_order):
+        """Recreate a `SortedIndex` from the order of one built earlier.
+
+        :param attribute: The name of the attribute the index is sorted by.
+        :param order: A list of the positions of the close approaches, in
+        sorted order.
+        :param keys: A sequence of the sorted values, aligned with `order`.
+        It's only indexed and sliced, so it may compute the values lazily.
+        :param in_internal_order: Whether `order` is in internal order.
+        :return: A new `SortedIndex`.
+        """
+        index = cls((), attribute)
+        index.order = order
+        index.keys = keys
+        index.in_internal_order = in_internal_order
+        return index
+
+    def __len__(self):
+        """Return the number of indexed close approaches."""
+        return len(self.order) + len(self.pending_order)
+
+    def extend(self, approaches, start):
+        """Index close approaches appended after the indexed ones.
+
+        This takes time proportional to the number of close approaches, plus
+        (amortized) the cost of merging the buffer into the index.
+
+        :param approaches: A sequence of `CloseApproach`es.
+        :param start: The position of the first of them.
+        """
+        pending_keys, pending_order = self.pending_keys, self.pending_order
+        for position, approach in enumerate(approaches, start):
+            # Ties keep their internal order, since new positions come last.
+            value = getattr(approach, self.attribute)
+            i = bisect.bisect_right(pending_keys, value)
+            pending_keys.insert(i, value)
+            pending_order.insert(i, position)
+        if len(pending_keys) > max(PENDING_MIN, len(self.keys) // PENDING_FRACTION):
+            self.merge()
+
+    def merge(self):
+        """Merge the buffer of appended close approaches into the index.
+
+        The buffered values are spliced between slices of the index, so this
+        takes time proportional to the size of the index.
+        """
+        if not self.pending_keys:
+            return
+        # The index stays in internal order only if the buffered close
+        # approaches, in internal order, all come after the indexed ones.
+        if (bisect.bisect_right(self.keys, self.pending_keys[0]) != len(self.keys)
+                or any(a > b for a, b in zip(self.pending_order, self.pending_order[1:]))):
+            self.in_internal_order = False
+        keys, order = [], []
+        lo = 0
+        for value, position in zip(self.pending_keys, self.pending_order):
+            hi = bisect.bisect_right(self.keys, value, lo)
+            keys += self.keys[lo:hi]
+            order += self.order[lo:hi]
+            keys.append(value)
+            order.append(position)
+            lo = hi
+        keys += self.keys[lo:]
+        order += self.order[lo:]
+        self.keys, self.order = keys, order
+        self.pending_keys, self.pending_order = [], []
+
+    def range(self, bounds, keys=None):
+        """Bisect the index for the range of values within some bounds.
+
+        :param bounds: A `filters.Bounds` on the indexed attribute.
+        :param keys: The sorted values to bisect, by default `keys`.
+        :return: A tuple of the start and stop positions in `order`.
+        """
+        if keys is None:
+            keys = self.keys
+        lo, hi = 0, len(keys)
+        if bounds.lower is not None:
+            bisect_lower = (bisect.bisect_left if bounds.lower_inclusive
+                            else bisect.bisect_right)
+            lo = bisect_lower(keys, bounds.lower)
+        if bounds.upper is not None:
+            bisect_upper = (bisect.bisect_right if bounds.upper_inclusive
+                            else bisect.bisect_left)
+            hi = bisect_upper(keys, bounds.upper)
+        return lo, max(lo, hi)
+
+    def positions(self, bounds):
+        """Find the positions of the close approaches within some bounds.
+
+        :param bounds: A `filters.Bounds` on the indexed attribute.
+        :return: A list of positions, in internal order.
+        """
+        lo, hi = self.range(bounds)
+        positions = self.order[lo:hi]
+        if not self.in_internal_order:
+            positions.sort()
+        if self.pending_keys:
+            lo, hi = self.range(bounds, self.pending_keys)
+            positions += sorted(self.pending_order[lo:hi])
+        return positions
+
+    def walk(self, bounds, descending=False):
+        """Generate the close approaches within some bounds in sorted order.
+
+        :param bounds: A `filters.Bounds` on the indexed attribute.
+        :param descending: Whether to start from the largest value.
+        :return: A lazy stream of tuples of a value and a position, in
+        ascending (or descending) order of value.
+        """
+        streams = []
+        for keys, order in ((self.keys, self.order), (self.pending_keys, self.pending_order)):
+            lo, hi = self.range(bounds, keys)
+            span = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+            streams.append(zip(map(keys.__getitem__, span), map(order.__getitem__, span)))
+        return heapq.merge(*streams, key=operator.itemgetter(0), reverse=descending)
+
+    def histogram(self):
+        """Build a `Histogram` of the indexed values."""
+        self.merge()
+        return Histogram(self.keys)
+
+
+class QueryPlan:
+    """The access path chosen to answer a query, and its estimated cost.
+
+    `access` is one of 'empty', 'scan', 'index', 'neo' or 'columnar'; for an index,
+    `attribute` names the indexed attribute. After the plan has been executed
+    by `NEODatabase.explain`, `actual_candidates` and `actual_rows` hold the
+    numbers of close approaches examined and produced.
+    """
+
+    def __init__(self, compiled, access, attribute=None,
+                 estimated_candidates=0, estimated_rows=0, cost=0.0):
+        """Create a new `QueryPlan`.
+
+        :param compiled: The `CompiledFilters` of the query.
+        :param access: The kind of access path.
+        :param attribute: The indexed attribute, for an index access path.
+        :param estimated_candidates: The estimated number of close approaches
+        the access path examines.
+        :param estimated_rows: The estimated number of matching close
+        approaches.
+        :param cost: The estimated cost of the access path.
+        """
+        self.compiled = compiled
+        self.access = access
+        self.attribute = attribute
+        self.estimated_candidates = estimated_candidates
+        self.estimated_rows = estimated_rows
+        self.cost = cost
+        self.alternatives = []
+        self.actual_candidates = None
+        self.actual_rows = None
+
+    @property
+    def description(self):
+        """Return a short description of the access path."""
+        if self.access == 'index':
+            bounds = self.compiled.bounds[self.attribute]
+            return f"{self.attribute} index on {bounds!r}"
+        return {
+            'empty': "no access (contradictory criteria)",
+            'scan': "full scan",
+            'neo': "NEO pre-filter",
+            'columnar': "columnar mask",
+        }.get(self.access, self.access)
+
+    def __str__(self):
+        """Return `str(self)`, a human-readable description of the plan."""
+        def count(estimated, actual):
+            text = f"{round(estimated)}"
+            return text if actual is None else f"{text} (actual {actual})"
+
+        lines = [
+            f"Query: {self.compiled!r}",
+            f"Plan: {self.description}",
+            f"  candidates: {count(self.estimated_candidates, self.actual_candidates)}",
+            f"  rows: {count(self.estimated_rows, self.actual_rows)}",
+            f"  cost: {self.cost:.1f}",
+        ]
+        if self.alternatives:
+            lines.append("Alternatives:")
+            lines.extend(f"  {plan.description}: cost {plan.cost:.1f}"
+                         for plan in self.alternatives)
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation."""
+        return (f"QueryPlan(access={self.access!r}, attribute={self.attribute!r}, "
+                f"estimated_rows={round(self.estimated_rows)}, cost={self.cost:.1f})")
+
+
+def plan_query(compiled, total, histograms, indexes, columnar=False, neos=0):
+    """Choose the cheapest access path for a query.
+
+    The selectivity of each condition is estimated from the histograms, and
+    the conditions are assumed to be independent.
+
+    :param compiled: The `CompiledFilters` of the query.
+    :param total: The number of close approaches in the database.
+    :param histograms: A dictionary mapping attributes to `Histogram`s, and
+    'hazardous' to the fraction of close approaches of hazardous NEOs.
+    :param indexes: A dictionary mapping attributes to `SortedIndex`es.
+    :param columnar: Whether the columnar engine is available.
+    :param neos: The number of NEOs with close approaches, if the NEOs can be
+    filtered before their close approaches.
+    :return: The cheapest `QueryPlan`, with the others in its `alternatives`.
+    """
+    if compiled.empty:
+        return QueryPlan(compiled, 'empty')
+
+    fractions = {}
+    for attribute, bounds in compiled.bounds.items():
+        if attribute in histograms:
+            fractions[attribute] = histograms[attribute].fraction(bounds)
+    if compiled.hazardous is not None and 'hazardous' in histograms:
+        hazardous = histograms['hazardous']
+        fractions['hazardous'] = hazardous if compiled.hazardous else 1 - hazardous
+    rows = total * math.prod(fractions.values())
+    conditions = len(fractions) + len(compiled.residual)
+
+    plans = [QueryPlan(compiled, 'scan', None, total, rows, total * ROW_COST)]
+    for attribute, index in indexes.items():
+        if attribute not in compiled.bounds:
+            continue
+        candidates = total * fractions.get(attribute, 1.0)
+        cost = candidates * ROW_COST + math.log2(max(total, 2)) * 2
+        if not index.in_internal_order:
+            cost += candidates * math.log2(max(candidates, 2)) * SORT_COST
+        plans.append(QueryPlan(compiled, 'index', attribute, candidates, rows, cost))
+    if neos and compiled.on_neos:
+        candidates = total * math.prod(fractions.get(attribute, 1.0)
+                                       for attribute in ('hazardous', 'diameter'))
+        cost = (neos + candidates) * ROW_COST
+        cost += candidates * math.log2(max(candidates, 2)) * SORT_COST
+        plans.append(QueryPlan(compiled, 'neo', None, candidates, rows, cost))
+    if columnar:
+        cost = total * conditions * VECTOR_COST + rows * ROW_COST
+        plans.append(QueryPlan(compiled, 'columnar', None, rows, rows, cost))
+
+    best = min(plans, key=lambda plan: plan.cost)
+    best.alternatives = [plan for plan in plans if plan is not best]
+    return best
+
+
+def prefer_index_walk(plan, total, histograms, attribute, top):
+    """Decide how to find the first `top` matches of a query in sorted order.
+
+    The matches can be found by walking the sorted index of the sort attribute
+    in order, testing the other criteria on each close approach until `top`
+    have passed; or by executing `plan` and keeping the best `top` matches on
+    a heap. The walk is cheaper when the matches are common enough among the
+    close approaches within the bounds on the sort attribute.
+
+    :param plan: The `QueryPlan` of the query.
+    :param total: The total number of close approaches.
+    :param histograms: The histograms of the database.
+    :param attribute: The (indexed) attribute to sort by.
+    :param top: The number of matches wanted.
+    :return: Whether walking the index is estimated to be cheaper.
+    """
+    bounds = plan.compiled.bounds.get(attribute)
+    within = total * (histograms[attribute].fraction(bounds) if bounds else 1.0)
+    if plan.estimated_rows > 0:
+        visits = min(within, top * within / plan.estimated_rows)
+    else:
+        visits = within
+    walk_cost = visits * WALK_COST
+    heap_cost = plan.cost + plan.estimated_rows * math.log2(top + 1) * SORT_COST
+    return walk_cost < heap_cost
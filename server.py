@@ -0,0 +1,345 @@
+"""Answer `inspect`, `query` and `aggregate` commands from many clients with one
+database.
+
+Building an `NEODatabase` is the slowest part of every command. The `serve`
+subcommand of the main module loads the database once and then answers
+commands sent by clients - other invocations of the main module with
+`--server` - over a local Unix socket or a TCP socket.
+
+A client sends one line of JSON holding the command-line arguments of the
+command and its working directory. The server runs the command on one of a
+pool of worker threads, with that thread's standard output and error captured,
+and sends the output back as a stream of frames. Each frame is a one-byte
+channel (`STDOUT`, `STDERR` or, finally, `EXIT`) and a four-byte big-endian
+length, followed by that many bytes of payload. The payload of the `EXIT`
+frame is the exit status of the command, in ASCII.
+
+Output is sent as it's produced, in chunks of up to `CHUNK_SIZE` bytes, so
+that large results stream to the client instead of accumulating in the server.
+"""
+import concurrent.futures
+import contextlib
+import errno
+import io
+import ipaddress
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+
+
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 1 << 16
+MAX_REQUEST_SIZE = 1 << 20
+
+FRAME_HEADER = struct.Struct('>cI')
+STDOUT, STDERR, EXIT = b'o', b'e', b'x'
+
+
+def parse_address(address):
+    """Interpret the address of a server.
+
+    An address of the form `HOST:PORT` (or `:PORT`, for localhost) is a TCP
+    address; anything else is the path to a Unix socket.
+
+    :param address: The address, as a string or Path-like object.
+    :return: A tuple of the address family and the address to bind or connect.
+    """
+    address = os.fspath(address)
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return socket.AF_INET, (host or 'localhost', int(port))
+    return socket.AF_UNIX, address
+
+
+class _FrameWriter(io.RawIOBase):
+    """A binary stream that sends everything written to it as frames."""
+
+    def __init__(self, sock, channel):
+        super().__init__()
+        self.sock = sock
+        self.channel = channel
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            send_frame(self.sock, self.channel, data)
+        return len(data)
+
+
+def send_frame(sock, channel, payload):
+    """Send one frame of output to a client.
+
+    :param sock: A connected socket.
+    :param channel: `STDOUT`, `STDERR` or `EXIT`.
+    :param payload: The bytes of the frame.
+    """
+    sock.sendall(FRAME_HEADER.pack(channel, len(payload)) + payload)
+
+
+def _frame_stream(sock, channel):
+    """Open a buffered text stream over the frames of one channel."""
+    return io.TextIOWrapper(io.BufferedWriter(_FrameWriter(sock, channel), CHUNK_SIZE),
+                            encoding='utf-8', newline='\n')
+
+
+class _ThreadLocalStream:
+    """Stand in for `sys.stdout` or `sys.stderr`, writing to a stream chosen by
+    the current thread.
+
+    Threads that haven't chosen a stream write to the original one.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    @property
+    def current(self):
+        """Return the stream of the current thread."""
+        return getattr(self._local, 'stream', None) or self._default
+
+    @contextlib.contextmanager
+    def redirect(self, stream):
+        """Send the current thread's output to `stream` within the context."""
+        self._local.stream = stream
+        try:
+            yield stream
+        finally:
+            self._local.stream = None
+
+    def write(self, text):
+        return self.current.write(text)
+
+    def flush(self):
+        return self.current.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+
+_STD_STREAMS_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _capture_std_streams(stdout, stderr):
+    """Send the current thread's standard output and error to other streams.
+
+    `sys.stdout` and `sys.stderr` are replaced by `_ThreadLocalStream`s, unless
+    they already are, so other threads are unaffected.
+
+    :param stdout: A text stream for the standard output.
+    :param stderr: A text stream for the standard error.
+    """
+    with _STD_STREAMS_LOCK:
+        if not isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = _ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadLocalStream):
+            sys.stderr = _ThreadLocalStream(sys.stderr)
+        proxies = sys.stdout, sys.stderr
+    with proxies[0].redirect(stdout), proxies[1].redirect(stderr):
+        yield
+
+
+def _restore_std_streams():
+    """Undo the replacement of `sys.stdout` and `sys.stderr`."""
+    with _STD_STREAMS_LOCK:
+        if isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = sys.stdout._default
+        if isinstance(sys.stderr, _ThreadLocalStream):
+            sys.stderr = sys.stderr._default
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    """Run the command sent by one client."""
+
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_SIZE)
+        try:
+            request = json.loads(line)
+            argv = [str(arg) for arg in request['argv']]
+            cwd = request.get('cwd')
+        except (ValueError, KeyError, TypeError):
+            send_frame(self.connection, STDERR, b"Malformed request.\n")
+            send_frame(self.connection, EXIT, b'2')
+            return
+
+        # Only a client on the same host, connected over a Unix socket (whose
+        # file permissions control who may connect), can have its output
+        # files written for it.
+        if self.server.address_family != socket.AF_UNIX:
+            cwd = None
+
+        stdout = _frame_stream(self.connection, STDOUT)
+        stderr = _frame_stream(self.connection, STDERR)
+        with _capture_std_streams(stdout, stderr):
+            try:
+                status = self.server.command(argv, cwd)
+            except SystemExit as err:
+                # Raised by argparse, for `--help` or invalid arguments.
+                status = err.code if isinstance(err.code, int) else 1
+            except Exception as err:
+                print(f"{type(err).__name__}: {err}", file=sys.stderr)
+                status = 1
+            stdout.flush()
+            stderr.flush()
+        send_frame(self.connection, EXIT, str(status or 0).encode('ascii'))
+
+
+class _ThreadPoolMixIn:
+    """Handle each connection on a worker thread from a fixed-size pool."""
+
+    workers = DEFAULT_WORKERS
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def serve_forever(self, poll_interval=0.5):
+        """Handle requests until `shutdown`."""
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            self.workers, thread_name_prefix='neo-server')
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self._pool.shutdown(wait=True)
+            _restore_std_streams()
+
+
+def _remove_stale_socket(path):
+    """Remove the socket file left behind by a server that didn't exit cleanly.
+
+    Nothing is removed unless the path is a socket on which no server is
+    listening.
+
+    :param path: The path of the socket.
+    :raises FileExistsError: If the path exists, but isn't a socket.
+    :raises OSError: If a server is listening on the socket.
+    """
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode):
+        raise FileExistsError(errno.EEXIST, "Not a socket, so not replacing it", os.fspath(path))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(os.fspath(path))
+        except ConnectionRefusedError:
+            pass
+        else:
+            raise OSError(errno.EADDRINUSE, "A server is already listening on this socket",
+                          os.fspath(path))
+    os.unlink(path)
+
+
+def _is_loopback(host):
+    """Return whether every address of a host name is a loopback address."""
+    addresses = {info[4][0] for info in socket.getaddrinfo(host, None, socket.AF_INET)}
+    return all(ipaddress.ip_address(address).is_loopback for address in addresses)
+
+
+class UnixCommandServer(_ThreadPoolMixIn, socketserver.UnixStreamServer):
+    """A server answering commands over a Unix socket."""
+    bound = False
+
+    def server_bind(self):
+        path = pathlib.Path(self.server_address)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _remove_stale_socket(path)
+        super().server_bind()
+        self.bound = True
+
+    def server_close(self):
+        super().server_close()
+        # Only remove the socket file if it's this server's.
+        if self.bound:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.server_address)
+
+
+class TCPCommandServer(_ThreadPoolMixIn, socketserver.TCPServer):
+    """A server answering commands over TCP, on a loopback address."""
+    allow_reuse_address = True
+
+
+def make_server(command, address, workers=DEFAULT_WORKERS):
+    """Create a server that runs the commands sent by clients.
+
+    Call `serve_forever` on the server to start answering commands, and
+    `server_close` to release its socket.
+
+    A TCP server only listens on a loopback address, and the working
+    directory of its clients is never passed to `command`.
+
+    :param command: A function of the command-line arguments of a command and
+    the client's working directory (or None, for a TCP client), that runs the
+    command and returns its exit status. It is called concurrently from
+    several threads.
+    :param address: The address to listen on (see `parse_address`).
+    :param workers: The number of commands to run concurrently.
+    :return: A `UnixCommandServer` or `TCPCommandServer`.
+    :raises ValueError: If a TCP address isn't a loopback address.
+    :raises OSError: If the address can't be listened on - for example, if a
+    Unix socket path is some other file, or another server's socket.
+    """
+    family, address = parse_address(address)
+    if family == socket.AF_INET and not _is_loopback(address[0]):
+        raise ValueError(f"{address[0]} isn't a loopback address; a TCP server only listens on "
+                         "one, such as localhost.")
+    cls = UnixCommandServer if family == socket.AF_UNIX else TCPCommandServer
+    server = cls(address, _CommandHandler)
+    server.command = command
+    server.workers = workers
+    return server
+
+
+def request(address, argv, cwd=None, stdout=None, stderr=None):
+    """Send a command to a server and relay its output.
+
+    :param address: The address of the server (see `parse_address`).
+    :param argv: The command-line arguments of the command.
+    :param cwd: The working directory against which the server resolves
+    relative output paths. Defaults to the current working directory.
+    :param stdout: A binary stream to which to write the command's output.
+    Defaults to the standard output.
+    :param stderr: A binary stream to which to write the command's errors.
+    Defaults to the standard error.
+    :return: The exit status of the command.
+    :raises ConnectionError: If the server closes the connection early.
+    """
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr.buffer
+    family, address = parse_address(address)
+    payload = json.dumps({'argv': list(argv), 'cwd': cwd or os.getcwd()})
+
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        sock.sendall(payload.encode('utf-8') + b'\n')
+        frames = sock.makefile('rb')
+        while True:
+            header = frames.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                raise ConnectionError("The server closed the connection early.")
+            channel, length = FRAME_HEADER.unpack(header)
+            data = frames.read(length)
+            if channel == EXIT:
+                stdout.flush()
+                stderr.flush()
+                return int(data)
+            (stdout if channel == STDOUT else stderr).write(data)
@@ -0,0 +1,676 @@
+"""Cache the data extracted from the NEO and close approach files on disk.
+
+Parsing `neos.csv` and `cad.json` dominates the startup time of every command.
+The `load_cached` function instead loads the NEOs and close approaches from a
+binary snapshot written by an earlier run, as long as the data files haven't
+changed since, and otherwise parses the data files and writes a new snapshot.
+
+A snapshot is keyed by the resolved path, size, modification time and content
+hash of both source files. If the path, size and modification time all match,
+the snapshot is fresh. If only the modification time differs, the content hash
+decides, and if it matches, the new modification time is saved in the
+snapshot's header so the file isn't hashed again. Anything else marks the
+snapshot as stale, and it is rebuilt.
+
+The snapshot is columnar, not a pickle of the object graph. It starts with an
+8-byte magic string, then a little-endian 4-byte length and a JSON header that
+holds the source keys and a table of sections. Each section is a flat array
+(with an `array` module typecode) or a newline-joined UTF-8 string blob,
+starting on an 8-byte boundary:
+
+    neo_designation     designations of the NEOs, newline-joined
+    neo_name            names of the NEOs (empty if unnamed), newline-joined
+    neo_diameter        'd' - diameters in kilometers (NaN if unknown)
+    neo_hazardous       'b' - whether each NEO is potentially hazardous
+    approach_time       'q' - minutes since the epoch of each close approach
+    approach_distance   'd' - nominal approach distances in au
+    approach_velocity   'd' - relative approach velocities in km/s
+    approach_neo        'i' - position of the approaching NEO, or -1
+    orphan_designation  designations of approaches whose NEO is unknown,
+                        newline-joined, in order of those approaches
+    orphan_position     'i' - positions of the approaches whose NEO is unknown
+    neo_approaches      'i' - positions of the close approaches of each NEO,
+                        one NEO after another
+    neo_approach_count  'i' - number of close approaches of each NEO
+    index_<attribute>   'i' - positions of the close approaches in order of
+                        time, distance or velocity, as in a `SortedIndex`
+    histogram_<column>  'q' (time, in minutes) or 'd' - boundaries of the
+                        `Histogram` of time, distance, velocity or diameter
+
+The last sections hold what an `NEODatabase` otherwise builds from its close
+approaches when it starts - its links, sorted indexes and histograms. The
+`load_database` function passes them to the database, along with the NEOs and
+a `LazyApproaches` sequence, which only builds a `CloseApproach` when a query
+(or the `.approaches` of an NEO) first needs it. A query narrowed down by an
+index then examines only the close approaches within its range.
+"""
+import array
+import collections.abc
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+import threading
+
+from database import NEODatabase, Prebuilt, build_histograms
+from helpers import datetime_to_minutes, minutes_to_datetime
+from extract import load_neos, load_approaches, load_parallel
+from models import NearEarthObject, CloseApproach
+from planner import Histogram, SortedIndex
+
+
+MAGIC = b'NEOSNAP1'
+VERSION = 1
+ALIGNMENT = 8
+_HEADER_LENGTH = struct.Struct('<I')
+_HASH_CHUNK_SIZE = 1 << 20
+
+# The indexed attributes, with the section holding their values and the
+# function decoding a value.
+INDEXED = {
+    'time': ('approach_time', minutes_to_datetime),
+    'distance': ('approach_distance', None),
+    'velocity': ('approach_velocity', None),
+}
+# The columns with histograms, with the typecode of their boundaries.
+HISTOGRAMS = {'time': 'q', 'distance': 'd', 'velocity': 'd', 'diameter': 'd'}
+
+_ERRORS = (OSError, ValueError, KeyError, IndexError, struct.error)
+
+
+class StaleSnapshotError(Exception):
+    """A snapshot doesn't match the current data files."""
+
+
+def file_digest(path):
+    """Compute the content hash of a file.
+
+    :param path: A path to a file.
+    :return: The hexadecimal BLAKE2b digest of the file's contents.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_key(path, digest=True):
+    """Describe the identity and version of a data file.
+
+    :param path: A path to a data file.
+    :param digest: Whether to also hash the contents of the file.
+    :return: A dictionary of the file's resolved path, size, modification
+    time in nanoseconds and (optionally) content hash.
+    """
+    path = pathlib.Path(path).resolve()
+    stat = path.stat()
+    key = {'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if digest:
+        key['hash'] = file_digest(path)
+    return key
+
+
+def is_fresh(saved_key, path):
+    """Check whether a data file still matches the key saved in a snapshot.
+
+    If the file was only touched - its modification time changed, but not its
+    contents - `saved_key` is updated with the new modification time.
+
+    :param saved_key: A key produced by `source_key` when the snapshot was
+    written.
+    :param path: A path to the data file.
+    :return: Whether the data file is unchanged.
+    """
+    current = source_key(path, digest=False)
+    if current['path'] != saved_key['path'] or current['size'] != saved_key['size']:
+        return False
+    if current['mtime_ns'] == saved_key['mtime_ns']:
+        return True
+    # The file was touched - only a change of contents makes it stale.
+    if file_digest(path) != saved_key['hash']:
+        return False
+    saved_key['mtime_ns'] = current['mtime_ns']
+    return True
+
+
+def check_sources(path, header, base, sources):
+    """Check whether the data files of a snapshot (or other sectioned file)
+    are unchanged.
+
+    The new modification times of data files that were only touched are
+    written to the file's header, so that they aren't hashed again by the next
+    check.
+
+    :param path: A path to the sectioned file.
+    :param header: The header of the file, as returned by `read_header`.
+    :param base: The offset of the first section, as returned by `read_header`.
+    :param sources: An iterable of tuples of a key saved in `header` and the
+    path to its data file.
+    :return: Whether every data file is unchanged.
+    """
+    touched = False
+    for saved_key, source in sources:
+        mtime_ns = saved_key['mtime_ns']
+        if not is_fresh(saved_key, source):
+            return False
+        touched = touched or saved_key['mtime_ns'] != mtime_ns
+    if touched:
+        try:
+            rewrite_header(path, header, base)
+        except OSError:
+            # A read-only cache is still fresh; it just keeps being hashed.
+            pass
+    return True
+
+
+def snapshot_path(cache_dir, neo_csv_path, cad_json_path):
+    """Choose where to save the snapshot of a pair of data files.
+
+    :param cache_dir: The directory holding snapshots.
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :return: The path to the snapshot of those data files.
+    """
+    sources = '\n'.join(str(pathlib.Path(p).resolve())
+                        for p in (neo_csv_path, cad_json_path))
+    name = hashlib.blake2b(sources.encode('utf-8'), digest_size=8).hexdigest()
+    return pathlib.Path(cache_dir) / f'neo-{name}.snap'
+
+
+def write_snapshot(path, sources, neos, approaches):
+    """Write NEOs and (unlinked) close approaches to a snapshot file, along
+    with the links, sorted indexes and histograms an `NEODatabase` of them
+    would build.
+
+    The file is written to a temporary name next to `path` and atomically
+    renamed, so readers never observe a partial snapshot.
+
+    :param path: Where to write the snapshot.
+    :param sources: A dictionary of `source_key`s of the data files the
+    collections were extracted from, under `neofile` and `cadfile`.
+    :param neos: A sequence of `NearEarthObject`s.
+    :param approaches: A sequence of `CloseApproach`es.
+    """
+    positions = {neo.designation: i for i, neo in enumerate(neos)}
+    approach_neo = array.array('i', (positions.get(a._designation, -1)
+                                     for a in approaches))
+    orphans = [a._designation for a, i in zip(approaches, approach_neo)
+               if i < 0]
+    neo_positions = [[] for _ in neos]
+    orphan_position = array.array('i')
+    for i, neo in enumerate(approach_neo):
+        if neo >= 0:
+            neo_positions[neo].append(i)
+        else:
+            orphan_position.append(i)
+    indexes = {attribute: SortedIndex(approaches, attribute) for attribute in INDEXED}
+    histograms = build_histograms(indexes, (neos[i] for i in approach_neo if i >= 0),
+                                  len(approaches))
+
+    sections = {
+        'neo_designation': _join(neo.designation for neo in neos),
+        'neo_name': _join(neo.name or '' for neo in neos),
+        'neo_diameter': array.array('d', (neo.diameter for neo in neos)),
+        'neo_hazardous': array.array('b', (neo.hazardous for neo in neos)),
+        'approach_time': array.array('q', (datetime_to_minutes(a.time)
+                                           for a in approaches)),
+        'approach_distance': array.array('d', (a.distance for a in approaches)),
+        'approach_velocity': array.array('d', (a.velocity for a in approaches)),
+        'approach_neo': approach_neo,
+        'orphan_designation': _join(orphans),
+        'orphan_position': orphan_position,
+        'neo_approaches': array.array('i', itertools.chain.from_iterable(neo_positions)),
+        'neo_approach_count': array.array('i', map(len, neo_positions)),
+    }
+    for attribute, index in indexes.items():
+        sections[f'index_{attribute}'] = array.array('i', index.order)
+    for column, typecode in HISTOGRAMS.items():
+        boundaries = histograms[column].boundaries
+        if column == 'time':
+            boundaries = map(datetime_to_minutes, boundaries)
+        sections[f'histogram_{column}'] = array.array(typecode, boundaries)
+    write_sections(path, {
+        'version': VERSION,
+        'sources': sources,
+        'neos': len(neos),
+        'approaches': len(approaches),
+        'indexes': {attribute: index.in_internal_order for attribute, index in indexes.items()},
+        'histograms': {column: {'known': histograms[column].known,
+                                'total': histograms[column].total}
+                       for column in HISTOGRAMS},
+        'hazardous': histograms['hazardous'],
+    }, sections)
+
+
+def read_snapshot(path, neo_csv_path, cad_json_path):
+    """Read the NEOs and (unlinked) close approaches from a snapshot file.
+
+    :param path: A path to a snapshot file.
+    :param neo_csv_path: A path to the CSV file the NEOs were extracted from.
+    :param cad_json_path: A path to the JSON file the close approaches were
+    extracted from.
+    :return: A tuple of a list of `NearEarthObject`s and a list of
+    `CloseApproach`es, ready to be linked by an `NEODatabase`.
+    :raises StaleSnapshotError: If the snapshot is unreadable or doesn't match
+    the current data files.
+    """
+    header, sections = _read_fresh(path, neo_csv_path, cad_json_path)
+    neos = _neos(header, sections)
+
+    orphans = iter(sections['orphan_designation'].split('\n'))
+    approaches = [
+        CloseApproach(
+            neos[neo].designation if neo >= 0 else next(orphans),
+            minutes_to_datetime(minutes), distance, velocity)
+        for minutes, distance, velocity, neo in zip(
+            sections['approach_time'], sections['approach_distance'],
+            sections['approach_velocity'], sections['approach_neo'])
+    ]
+    return neos, approaches
+
+
+def read_prebuilt(path, neo_csv_path, cad_json_path):
+    """Read the NEOs, close approaches and prebuilt structures of an
+    `NEODatabase` from a snapshot file.
+
+    Only the NEOs are built. The close approaches are a `LazyApproaches`,
+    which builds each of them, already linked, when it's first needed.
+
+    :param path: A path to a snapshot file.
+    :param neo_csv_path: A path to the CSV file the NEOs were extracted from.
+    :param cad_json_path: A path to the JSON file the close approaches were
+    extracted from.
+    :return: A tuple of a list of `NearEarthObject`s, a `LazyApproaches` and a
+    `database.Prebuilt`, to be passed to an `NEODatabase`.
+    :raises StaleSnapshotError: If the snapshot is unreadable or doesn't match
+    the current data files.
+    """
+    header, sections = _read_fresh(path, neo_csv_path, cad_json_path)
+    neos = _neos(header, sections)
+    total = header['approaches']
+    links = sections['approach_neo']
+    orphan_position = sections['orphan_position']
+    orphan_designation = _split(sections['orphan_designation'], len(orphan_position))
+    if len(links) != total or sum(sections['neo_approach_count']) + len(orphan_position) != total:
+        raise ValueError("Corrupt links in snapshot.")
+    approaches = LazyApproaches(neos, sections['approach_time'], sections['approach_distance'],
+                                sections['approach_velocity'], links,
+                                dict(zip(orphan_position, orphan_designation)))
+
+    flat = sections['neo_approaches']
+    bounds = itertools.accumulate(sections['neo_approach_count'], initial=0)
+    neo_positions = [flat[start:stop].tolist() for start, stop in _pairs(bounds)]
+    orphans = {}
+    for i, designation in zip(orphan_position, orphan_designation):
+        orphans.setdefault(designation, []).append(i)
+
+    indexes = {}
+    for attribute, (column, decode) in INDEXED.items():
+        order = sections[f'index_{attribute}'].tolist()
+        if len(order) != total:
+            raise ValueError("Corrupt index in snapshot.")
+        indexes[attribute] = SortedIndex.from_order(
+            attribute, order, _SortedKeys(sections[column], order, decode),
+            header['indexes'][attribute])
+    histograms = {'hazardous': header['hazardous']}
+    for column in HISTOGRAMS:
+        boundaries = sections[f'histogram_{column}']
+        if column == 'time':
+            boundaries = map(minutes_to_datetime, boundaries)
+        counts = header['histograms'][column]
+        histograms[column] = Histogram.from_boundaries(boundaries, counts['known'],
+                                                       counts['total'])
+    return neos, approaches, Prebuilt(neo_positions, orphans, indexes, histograms)
+
+
+def _read_fresh(path, neo_csv_path, cad_json_path):
+    """Read the header and decoded sections of a snapshot, if it's fresh."""
+    with open(path, 'rb') as file:
+        header, base = read_header(file)
+        sources = header['sources']
+        if not check_sources(path, header, base, ((sources['neofile'], neo_csv_path),
+                                                  (sources['cadfile'], cad_json_path))):
+            raise StaleSnapshotError(f"{path} is out of date.")
+        return header, _decode_sections(header, file.read())
+
+
+def _neos(header, sections):
+    """Build the `NearEarthObject`s of a snapshot from its sections."""
+    designations = _split(sections['neo_designation'], header['neos'])
+    names = _split(sections['neo_name'], header['neos'])
+    return [
+        NearEarthObject(designation, name or None, diameter, hazardous)
+        for designation, name, diameter, hazardous in zip(
+            designations, names,
+            sections['neo_diameter'], sections['neo_hazardous'])
+    ]
+
+
+def _pairs(values):
+    """Generate the pairs of consecutive values of an iterable."""
+    values = iter(values)
+    previous = next(values, None)
+    for value in values:
+        yield previous, value
+        previous = value
+
+
+class LazyApproaches(collections.abc.Sequence):
+    """The close approaches of a snapshot, each built when it's first needed.
+
+    A `CloseApproach` is built from the columns of the snapshot, and linked to
+    its NEO, the first time its position is indexed (or iterated over); later
+    accesses return the same object. Close approaches added with `extend`
+    are kept as they are. Several threads may use the sequence at once.
+    """
+
+    def __init__(self, neos, times, distances, velocities, links, orphans):
+        """Create a new `LazyApproaches`.
+
+        :param neos: The list of `NearEarthObject`s that `links` refers to.
+        :param times: The times of the close approaches, in minutes since the
+        epoch.
+        :param distances: The distances of the close approaches.
+        :param velocities: The velocities of the close approaches.
+        :param links: The position in `neos` of each close approach's NEO, or
+        -1 if it's unknown.
+        :param orphans: A dictionary of the designations of the close
+        approaches of unknown NEOs, by position.
+        """
+        self._neos = neos
+        self._times = times
+        self._distances = distances
+        self._velocities = velocities
+        self._links = links
+        self._orphans = orphans
+        self._items = [None] * len(links)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of close approaches."""
+        return len(self._items)
+
+    def __getitem__(self, i):
+        """Return the close approach at a position (or a list of those in a slice)."""
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._items)))]
+        approach = self._items[i]
+        if approach is None:
+            with self._lock:
+                approach = self._items[i]
+                if approach is None:
+                    approach = self._items[i] = self._build(i)
+        return approach
+
+    def __iter__(self):
+        """Generate the close approaches in order, building them as needed."""
+        for i, approach in enumerate(self._items):
+            yield self[i] if approach is None else approach
+
+    def extend(self, approaches):
+        """Append close approaches (already built) to the sequence."""
+        self._items.extend(approaches)
+
+    def _build(self, i):
+        """Build the close approach at a position of the snapshot's columns."""
+        neo = self._links[i]
+        if neo < 0:
+            neo, designation = None, self._orphans[i % len(self._links)]
+        else:
+            neo = self._neos[neo]
+            designation = neo.designation
+        return CloseApproach(designation, minutes_to_datetime(self._times[i]),
+                             self._distances[i], self._velocities[i], neo)
+
+
+class _SortedKeys(collections.abc.Sequence):
+    """The values of a column in the order of a sorted index, each decoded when
+    it's indexed."""
+
+    def __init__(self, values, order, decode=None):
+        """Create a new `_SortedKeys`.
+
+        :param values: The values of the column, in internal order.
+        :param order: The positions of the values, in sorted order.
+        :param decode: A function decoding a value, or None.
+        """
+        self._values = values
+        self._order = order
+        self._decode = decode
+
+    def __len__(self):
+        """Return the number of values."""
+        return len(self._order)
+
+    def __getitem__(self, i):
+        """Return the value at a position (or a list of those in a slice)."""
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._order)))]
+        value = self._values[self._order[i]]
+        return value if self._decode is None else self._decode(value)
+
+
+def load_cached(neo_csv_path='data/neos.csv', cad_json_path='data/cad.json',
+                cache_dir='.cache', jobs=1):
+    """Load NEOs and close approaches, from a snapshot if one is fresh.
+
+    If there is no fresh snapshot of the data files in `cache_dir`, extract the
+    data with `load_neos` and `load_approaches` (or, with several `jobs`, with
+    `load_parallel`) and save a new snapshot. A failure to save the snapshot is
+    reported on stderr but is not fatal.
+
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param cache_dir: The directory holding snapshots.
+    :param jobs: The number of processes with which to parse the data files.
+    :return: A tuple of a collection of `NearEarthObject`s and a collection of
+    `CloseApproach`es, ready to be linked by an `NEODatabase`.
+    """
+    path = snapshot_path(cache_dir, neo_csv_path, cad_json_path)
+    try:
+        return read_snapshot(path, neo_csv_path, cad_json_path)
+    except _ERRORS + (StaleSnapshotError,):
+        pass
+    return _rebuild(path, neo_csv_path, cad_json_path, jobs)
+
+
+def load_database(neo_csv_path='data/neos.csv', cad_json_path='data/cad.json',
+                  cache_dir='.cache', jobs=1, **options):
+    """Build an `NEODatabase` of the data files, from a snapshot if one is fresh.
+
+    From a fresh snapshot, the database is given the links, indexes and
+    histograms saved in it, and builds its close approaches only as they're
+    needed (see `read_prebuilt`). Otherwise, the data files are parsed and a
+    new snapshot is saved, as by `load_cached`.
+
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param cache_dir: The directory holding snapshots.
+    :param jobs: The number of processes with which to parse the data files.
+    :param options: Keyword arguments of the `NEODatabase`.
+    :return: A new `NEODatabase`.
+    """
+    path = snapshot_path(cache_dir, neo_csv_path, cad_json_path)
+    try:
+        neos, approaches, prebuilt = read_prebuilt(path, neo_csv_path, cad_json_path)
+    except _ERRORS + (StaleSnapshotError,):
+        neos, approaches = _rebuild(path, neo_csv_path, cad_json_path, jobs)
+        return NEODatabase(neos, approaches, **options)
+    return NEODatabase(neos, approaches, prebuilt=prebuilt, **options)
+
+
+def _rebuild(path, neo_csv_path, cad_json_path, jobs):
+    """Parse the data files, and save a new snapshot of them at `path`.
+
+    :return: A tuple of a list of `NearEarthObject`s and a list of
+    `CloseApproach`es.
+    """
+    # Key the sources before parsing, so that a file changed while it's being
+    # read makes the new snapshot stale rather than silently wrong.
+    sources = {'neofile': source_key(neo_csv_path),
+               'cadfile': source_key(cad_json_path)}
+    if jobs == 1:
+        neos, approaches = load_neos(neo_csv_path), load_approaches(cad_json_path)
+    else:
+        neos, approaches = load_parallel(neo_csv_path, cad_json_path, jobs)
+    try:
+        write_snapshot(path, sources, neos, approaches)
+    except OSError as err:
+        print(f"Unable to save a snapshot of the data files: {err}",
+              file=sys.stderr)
+    return neos, approaches
+
+
+def _join(strings):
+    """Encode strings as one newline-joined UTF-8 blob."""
+    return '\n'.join(strings).encode('utf-8')
+
+
+def _split(blob, count):
+    """Split `count` strings from a decoded newline-joined blob."""
+    strings = blob.split('\n') if count else []
+    if len(strings) != count:
+        raise ValueError("Corrupt string section in snapshot.")
+    return strings
+
+
+def _padding(offset):
+    """Return the number of bytes from `offset` to the next aligned offset."""
+    return -offset % ALIGNMENT
+
+
+def write_sections(path, header, sections):
+    """Write a header and named sections of bytes or arrays to a file.
+
+    This is the format of snapshots, and of other files kept in the cache
+    directory (see `lookup.py`). The file is replaced atomically.
+
+    :param path: Where to write the file.
+    :param header: A JSON-serializable dictionary of metadata, which must hold
+    the `version`.
+    :param sections: A dictionary of the named sections, each a bytes string
+    or an `array.array`.
+    """
+    table = {}
+    offset = 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array.array) else None
+        length = len(data) * (data.itemsize if typecode else 1)
+        table[name] = {'offset': offset, 'length': length, 'typecode': typecode}
+        offset += length + _padding(length)
+    header = dict(header, byteorder=sys.byteorder, sections=table)
+
+    encoded = json.dumps(header).encode('utf-8')
+    start = len(MAGIC) + _HEADER_LENGTH.size + len(encoded)
+    encoded += b' ' * _padding(start)
+
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(MAGIC)
+            file.write(_HEADER_LENGTH.pack(len(encoded)))
+            file.write(encoded)
+            for data in sections.values():
+                data = data.tobytes() if isinstance(data, array.array) else data
+                file.write(data)
+                file.write(b'\0' * _padding(len(data)))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_header(file):
+    """Read the header of a snapshot (or other sectioned file) from a binary
+    file.
+
+    :param file: A binary file, positioned at its start.
+    :return: A tuple of the header dictionary and the offset of the first
+    section.
+    :raises ValueError: If the file isn't a snapshot of a supported version.
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a snapshot file.")
+    (length,) = _HEADER_LENGTH.unpack(file.read(_HEADER_LENGTH.size))
+    header = json.loads(file.read(length).decode('utf-8'))
+    if header.get('version') != VERSION:
+        raise ValueError("Unsupported snapshot version.")
+    return header, len(MAGIC) + _HEADER_LENGTH.size + length
+
+
+def rewrite_header(path, header, base):
+    """Overwrite the header of a sectioned file in place.
+
+    The sections stay where they are, so the new header must fit in the space
+    of the old one (which is padded with spaces to the first section).
+
+    :param path: A path to the sectioned file.
+    :param header: The new header, with the same sections as the old one.
+    :param base: The offset of the first section, as returned by `read_header`.
+    :return: Whether the header fit, and was written.
+    """
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    encoded = json.dumps(header).encode('utf-8')
+    if len(encoded) > base - start:
+        return False
+    with open(path, 'r+b') as file:
+        file.seek(start)
+        file.write(encoded + b' ' * (base - start - len(encoded)))
+    return True
+
+
+def read_section(file, header, base, name, start=0, stop=None):
+    """Read part of one section of a sectioned file, without reading the rest.
+
+    :param file: A binary file.
+    :param header: The header of the file, as returned by `read_header`.
+    :param base: The offset of the first section, as returned by `read_header`.
+    :param name: The name of the section.
+    :param start: The index of the first item (or byte, for a string blob) to
+    read.
+    :param stop: The index past the last item to read, or None for the end of
+    the section.
+    :return: A decoded string, or an `array.array` of the items.
+    """
+    entry = header['sections'][name]
+    typecode = entry['typecode']
+    itemsize = array.array(typecode).itemsize if typecode else 1
+    count = entry['length'] // itemsize
+    stop = count if stop is None else min(stop, count)
+    start = min(start, stop)
+    file.seek(base + entry['offset'] + start * itemsize)
+    raw = file.read((stop - start) * itemsize)
+    if len(raw) != (stop - start) * itemsize:
+        raise ValueError("Truncated section in snapshot.")
+    if typecode is None:
+        return raw.decode('utf-8')
+    values = array.array(typecode)
+    values.frombytes(raw)
+    if header['byteorder'] != sys.byteorder:
+        values.byteswap()
+    return values
+
+
+def _decode_sections(header, data):
+    """Decode the sections of a snapshot from the bytes after its header."""
+    sections = {}
+    for name, entry in header['sections'].items():
+        offset = entry['offset']
+        raw = data[offset:offset + entry['length']]
+        if entry['typecode'] is None:
+            sections[name] = raw.decode('utf-8')
+        else:
+            values = array.array(entry['typecode'])
+            values.frombytes(raw)
+            if header['byteorder'] != sys.byteorder:
+                values.byteswap()
+            sections[name] = values
+    return sections
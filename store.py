@@ -0,0 +1,366 @@
+"""Share the filterable columns of the data set between processes, on disk.
+
+Each process that builds an `NEODatabase` holds its own copy of every NEO and
+close approach. A column store instead keeps the attributes that the filters
+in `filters.py` examine in a file in the cache directory, in the sectioned
+format of snapshots (see `snapshot.py`), and a `ColumnStore` maps that file
+into memory. The columns are NumPy arrays over the mapped pages, so opening a
+store parses and copies nothing, and every process on the host shares the
+same pages through the operating system's page cache.
+
+Filters are evaluated directly against the mapped columns, as by the columnar
+engine (see `columns.py`), and only the matching close approaches are turned
+into `CloseApproach`es. The sections of a store are:
+
+    approach_time       'q' - minutes since the epoch of each close approach
+    approach_distance   'd' - nominal approach distances in au
+    approach_velocity   'd' - relative approach velocities in km/s
+    approach_diameter   'd' - diameter of the approaching NEO (NaN if unknown)
+    approach_hazardous  'b' - whether the approaching NEO is hazardous
+    approach_linked     'b' - whether the approaching NEO is known
+    approach_neo        'i' - position of the approaching NEO, or, for the
+                        k-th close approach of an unknown NEO, -1 - k
+    neo_designation     designations of the NEOs, concatenated
+    neo_designation_at  'q' - offset of each designation, and the total length
+    neo_name            names of the NEOs (empty if unnamed), concatenated
+    neo_name_at         'q' - offset of each name, and the total length
+    neo_diameter        'd' - diameters in kilometers (NaN if unknown)
+    neo_hazardous       'b' - whether each NEO is potentially hazardous
+    orphan_designation  designations of approaches whose NEO is unknown,
+                        concatenated, in order of those approaches
+    orphan_designation_at  'q' - offset of each of those designations
+
+Like `ColumnarApproaches`, a `ColumnStore` requires NumPy. Writing a store
+doesn't.
+"""
+import array
+import hashlib
+import itertools
+import mmap
+import pathlib
+import struct
+import sys
+
+from aggregate import COUNT, GROUPS, aggregate, aggregate_columns, parse_metric
+from columns import COLUMNS, ColumnarApproaches, np
+from database import SORT_ATTRIBUTES
+from filters import ATTRIBUTES, compile_filters
+from helpers import datetime_to_minutes, minutes_to_datetime
+from models import NearEarthObject, CloseApproach
+from snapshot import (VERSION, check_sources, load_cached, read_header, source_key,
+                      write_sections)
+
+
+def store_path(cache_dir, neo_csv_path, cad_json_path):
+    """Choose where to save the column store of a pair of data files.
+
+    :param cache_dir: The directory holding snapshots and stores.
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :return: The path to the column store of those data files.
+    """
+    sources = '\n'.join(str(pathlib.Path(p).resolve())
+                        for p in (neo_csv_path, cad_json_path))
+    name = hashlib.blake2b(sources.encode('utf-8'), digest_size=8).hexdigest()
+    return pathlib.Path(cache_dir) / f'neo-{name}.cols'
+
+
+def write_store(path, sources, neos, approaches):
+    """Write the columns of NEOs and (unlinked) close approaches to a store.
+
+    Close approaches are matched to NEOs by designation, as an `NEODatabase`
+    links them. The file is replaced atomically, so processes that have the
+    old store mapped keep reading it undisturbed.
+
+    :param path: Where to write the store.
+    :param sources: A dictionary of `source_key`s of the data files the
+    collections were extracted from, under `neofile` and `cadfile`.
+    :param neos: A sequence of `NearEarthObject`s.
+    :param approaches: A sequence of `CloseApproach`es.
+    """
+    positions = {neo.designation: i for i, neo in enumerate(neos)}
+    approach_neo = array.array('i')
+    orphans = []
+    for approach in approaches:
+        i = positions.get(approach._designation)
+        if i is None:
+            i = -1 - len(orphans)
+            orphans.append(approach._designation)
+        approach_neo.append(i)
+    diameters = [neo.diameter for neo in neos]
+    hazardous = [neo.hazardous for neo in neos]
+
+    designations, designation_at = _concatenate(neo.designation for neo in neos)
+    names, name_at = _concatenate(neo.name or '' for neo in neos)
+    orphan_designations, orphan_at = _concatenate(orphans)
+    write_sections(path, {
+        'version': VERSION,
+        'store': 'columns',
+        'sources': sources,
+        'neos': len(neos),
+        'approaches': len(approaches),
+    }, {
+        'approach_time': array.array('q', (datetime_to_minutes(a.time) for a in approaches)),
+        'approach_distance': array.array('d', (a.distance for a in approaches)),
+        'approach_velocity': array.array('d', (a.velocity for a in approaches)),
+        'approach_diameter': array.array('d', (diameters[i] if i >= 0 else float('nan')
+                                               for i in approach_neo)),
+        'approach_hazardous': array.array('b', (i >= 0 and hazardous[i] for i in approach_neo)),
+        'approach_linked': array.array('b', (i >= 0 for i in approach_neo)),
+        'approach_neo': approach_neo,
+        'neo_designation': designations,
+        'neo_designation_at': designation_at,
+        'neo_name': names,
+        'neo_name_at': name_at,
+        'neo_diameter': array.array('d', diameters),
+        'neo_hazardous': array.array('b', hazardous),
+        'orphan_designation': orphan_designations,
+        'orphan_designation_at': orphan_at,
+    })
+
+
+def _concatenate(strings):
+    """Encode strings as one UTF-8 blob and an array of their offsets in it."""
+    blobs = [string.encode('utf-8') for string in strings]
+    offsets = array.array('q', [0])
+    offsets.extend(itertools.accumulate(len(blob) for blob in blobs))
+    return b''.join(blobs), offsets
+
+
+class MappedColumns(ColumnarApproaches):
+    """The columns of a `ColumnarApproaches`, read from a mapped store.
+
+    The columns are read-only views of the store's pages, so close approaches
+    can't be appended and NEOs can't be changed.
+    """
+
+    def __init__(self, arrays, size):
+        """Create a new `MappedColumns` from arrays of the columns.
+
+        :param arrays: A dictionary mapping the names of `columns.COLUMNS` to
+        arrays of their values.
+        :param size: The number of close approaches.
+        """
+        self._arrays = arrays
+        self._size = size
+
+    def append(self, approaches):
+        raise TypeError("The columns of a column store are read-only.")
+
+    def set_neo(self, positions, neo):
+        raise TypeError("The columns of a column store are read-only.")
+
+
+class ColumnStore:
+    """A read-only, memory-mapped store of the filterable columns of NEOs and
+    their close approaches.
+
+    A `ColumnStore` answers `query` and `aggregate` like an `NEODatabase`.
+    The `CloseApproach`es it generates are created as they're needed, each
+    linked to its `NearEarthObject` - but the `approaches` of the NEOs are
+    left empty.
+    """
+
+    def __init__(self, path):
+        """Map a column store file into memory.
+
+        :param path: A path to a column store.
+        :raises ValueError: If the file isn't a column store.
+        """
+        if np is None:
+            raise ImportError("The column store requires NumPy.")
+        with open(path, 'rb') as file:
+            self.header, base = read_header(file)
+            self._base = base
+            if self.header.get('store') != 'columns':
+                raise ValueError(f"{path} is not a column store.")
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        swap = self.header['byteorder'] != sys.byteorder
+        self._sections = {}
+        for name, entry in self.header['sections'].items():
+            if entry['typecode'] is None:
+                start = base + entry['offset']
+                self._sections[name] = memoryview(self._mapped)[start:start + entry['length']]
+                continue
+            dtype = np.dtype(entry['typecode'])
+            if swap:
+                dtype = dtype.newbyteorder()
+            self._sections[name] = np.frombuffer(
+                self._mapped, dtype=dtype, count=entry['length'] // dtype.itemsize,
+                offset=base + entry['offset'])
+
+        size = self.header['approaches']
+        arrays = {name: self._sections[f'approach_{name}'] for name, _ in COLUMNS}
+        for name, dtype in COLUMNS:
+            if dtype == 'bool':
+                arrays[name] = arrays[name].view(np.bool_)
+        self.columns = MappedColumns(arrays, size)
+        self._neos = {}
+
+    def __len__(self):
+        """Return the number of close approaches in the store."""
+        return self.header['approaches']
+
+    def sources(self):
+        """Return the `source_key`s of the data files the store was written from."""
+        return self.header['sources']
+
+    def _string(self, name, i):
+        """Decode the `i`th string of a concatenated string section."""
+        offsets = self._sections[f'{name}_at']
+        return self._sections[name][offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def get_neo(self, i):
+        """Return the NEO at a position of the store, creating it once.
+
+        :param i: The position of the NEO.
+        :return: A `NearEarthObject`.
+        """
+        neo = self._neos.get(i)
+        if neo is None:
+            neo = self._neos[i] = NearEarthObject(
+                self._string('neo_designation', i),
+                self._string('neo_name', i) or None,
+                float(self._sections['neo_diameter'][i]),
+                bool(self._sections['neo_hazardous'][i]))
+        return neo
+
+    def approach(self, i):
+        """Create the close approach at a position of the store.
+
+        :param i: The position of the close approach.
+        :return: A `CloseApproach`, linked to its NEO if it's known.
+        """
+        columns = self.columns
+        position = int(self._sections['approach_neo'][i])
+        neo = self.get_neo(position) if position >= 0 else None
+        return CloseApproach(
+            neo.designation if neo is not None
+            else self._string('orphan_designation', -1 - position),
+            minutes_to_datetime(int(columns.time[i])),
+            float(columns.distance[i]), float(columns.velocity[i]), neo)
+
+    def positions(self, filters=(), sort_by=None, descending=False):
+        """Find the positions of the close approaches matching the fused
+        criteria of some filters.
+
+        :param filters: A collection of filters, or a `CompiledFilters`.
+        :param sort_by: One of `SORT_ATTRIBUTES` to sort the positions by, or
+        None to keep them in internal order.
+        :param descending: Whether to sort in descending order.
+        :return: An array of positions.
+        """
+        compiled = compile_filters(filters)
+        positions = self.columns.positions(compiled)
+        if sort_by is not None:
+            values = getattr(self.columns, sort_by)[positions]
+            # A stable sort keeps ties in internal order, and NaNs come last
+            # either way.
+            order = np.argsort(-values if descending else values, kind='stable')
+            positions = positions[order]
+        return positions
+
+    def query(self, filters=(), sort_by=None, descending=False, top=None, jobs=None):
+        """Query the store for the close approaches that match a collection of
+        filters, as `NEODatabase.query` does.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param sort_by: One of `SORT_ATTRIBUTES`, or None.
+        :param descending: Whether to sort in descending order.
+        :param top: The maximum number of sorted matches to generate, or None.
+        :param jobs: Ignored - the mapped columns are already scanned in one
+        vectorized pass.
+        :return: A stream of matching `CloseApproach` objects.
+        :raises ValueError: If `sort_by` isn't a sortable attribute, or `top`
+        is given without `sort_by`.
+        """
+        if sort_by is not None and sort_by not in SORT_ATTRIBUTES:
+            raise ValueError(f"Close approaches can't be sorted by {sort_by!r}.")
+        if top is not None and sort_by is None:
+            raise ValueError("Only sorted queries can ask for the top matches.")
+        compiled = compile_filters(filters)
+        positions = self.positions(compiled, sort_by, descending)
+        matches = map(self.approach, positions.tolist())
+        predicate = compiled.predicate(exclude=ATTRIBUTES)
+        if predicate is not None:
+            matches = filter(predicate, matches)
+        if top is not None:
+            matches = itertools.islice(matches, max(top, 0))
+        return matches
+
+    def explain(self, filters=()):
+        """Run a query, and describe how it was executed on the store.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :return: A human-readable description of the query, with its actual
+        row counts.
+        """
+        compiled = compile_filters(filters)
+        candidates = len(self.columns.positions(compiled))
+        rows = candidates
+        predicate = compiled.predicate(exclude=ATTRIBUTES)
+        if predicate is not None:
+            rows = sum(1 for _ in self.query(compiled))
+        return '\n'.join([
+            f"Query: {compiled!r}",
+            "Plan: columnar scan of the mapped column store"
+            + (" with residual filters" if predicate is not None else ""),
+            f"  candidates: {candidates} (of {len(self)})",
+            f"  rows: {rows}",
+        ])
+
+    def aggregate(self, filters=(), group_by=None, metrics=(COUNT,)):
+        """Count and summarize the close approaches that match a collection of
+        filters, as `NEODatabase.aggregate` does.
+
+        :param filters: A collection of filters capturing user-specified
+        criteria.
+        :param group_by: One of `aggregate.GROUPS`, or None.
+        :param metrics: A collection of `aggregate.Metric`s, or of strings
+        such as 'count' or 'mean:velocity'.
+        :return: An `aggregate.Table` with one row per group.
+        :raises ValueError: If a group or metric isn't valid.
+        """
+        if group_by is not None and group_by not in GROUPS:
+            raise ValueError(f"Close approaches can't be grouped by {group_by!r}.")
+        metrics = [parse_metric(metric) if isinstance(metric, str) else metric
+                   for metric in metrics]
+        compiled = compile_filters(filters)
+        if group_by != 'neo' and not compiled.residual:
+            return aggregate_columns(self.columns, self.columns.mask(compiled),
+                                     group_by, metrics)
+        return aggregate(self.query(compiled), group_by, metrics)
+
+
+def open_store(neo_csv_path='data/neos.csv', cad_json_path='data/cad.json',
+               cache_dir='.cache', jobs=1):
+    """Map the column store of a pair of data files, writing it first if it's
+    missing or stale.
+
+    The data is loaded for a new store with `snapshot.load_cached`.
+
+    :param neo_csv_path: A path to a CSV file containing NEO data.
+    :param cad_json_path: A path to a JSON file containing close approach data.
+    :param cache_dir: The directory holding snapshots and stores.
+    :param jobs: The number of processes with which to parse the data files.
+    :return: A `ColumnStore`.
+    :raises OSError: If a new store can't be written.
+    """
+    path = store_path(cache_dir, neo_csv_path, cad_json_path)
+    try:
+        store = ColumnStore(path)
+        sources = store.sources()
+        if check_sources(path, store.header, store._base,
+                         ((sources['neofile'], neo_csv_path), (sources['cadfile'], cad_json_path))):
+            return store
+    except (OSError, ValueError, KeyError, struct.error):
+        pass
+
+    sources = {'neofile': source_key(neo_csv_path),
+               'cadfile': source_key(cad_json_path)}
+    neos, approaches = load_cached(neo_csv_path, cad_json_path, cache_dir, jobs)
+    write_store(path, sources, neos, approaches)
+    return ColumnStore(path)
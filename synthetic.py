@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""Generate synthetic data files of NEOs and close approaches, of any size.
+
+The files are written in the schema of the real ones - `neos.csv`, with all 75
+columns of the JPL Small-Body Database in its order, and `cad.json`, in the
+shape returned by the JPL Close Approach Data API - so every reader in this
+project treats them as it would the real data.
+
+The data is drawn from a `random.Random` seeded with `seed`, so the same size
+and seed always give byte-for-byte the same files. The distributions resemble
+those of the real data sets:
+
+- About one NEO in 17 approaches, most of them known only by a provisional
+  designation, the rest numbered; only a few numbered NEOs have a name.
+- A few comets, whose names (`LINEAR`, `SOHO`, ...) are shared by many of them
+  and whose hazard is unknown, and a few asteroids sharing a name, so lookups
+  by name see the same duplicates as in the real data.
+- A diameter known for one NEO in 20, and about 9% of the NEOs hazardous.
+- A skewed number of close approaches per NEO, and about 1% of the close
+  approaches by objects missing from `neos.csv`.
+- Close approaches in time order from 1900 to 2200, at distances up to 0.5 au.
+
+The files are written a row at a time, so the memory used depends on the
+number of NEOs, but not on the number of close approaches.
+
+This script can be invoked from the command line::
+
+    $ python3 synthetic.py --approaches 1000000 --out-dir /tmp/neo-1m
+
+`generate` skips the files of a size and seed that already exist in the
+directory, so a benchmark can call it before every run.
+"""
+import argparse
+import csv
+import datetime
+import math
+import pathlib
+import random
+import string
+
+
+# The columns of `neos.csv`, in order.
+NEO_FIELDS = (
+    'id', 'spkid', 'full_name', 'pdes', 'name', 'prefix', 'neo', 'pha', 'H', 'G', 'M1', 'M2',
+    'K1', 'K2', 'PC', 'diameter', 'extent', 'albedo', 'rot_per', 'GM', 'BV', 'UB', 'IR',
+    'spec_B', 'spec_T', 'H_sigma', 'diameter_sigma', 'orbit_id', 'epoch', 'epoch_mjd',
+    'epoch_cal', 'equinox', 'e', 'a', 'q', 'i', 'om', 'w', 'ma', 'ad', 'n', 'tp', 'tp_cal',
+    'per', 'per_y', 'moid', 'moid_ld', 'moid_jup', 't_jup', 'sigma_e', 'sigma_a', 'sigma_q',
+    'sigma_i', 'sigma_om', 'sigma_w', 'sigma_ma', 'sigma_ad', 'sigma_n', 'sigma_tp',
+    'sigma_per', 'class', 'producer', 'data_arc', 'first_obs', 'last_obs', 'n_obs_used',
+    'n_del_obs_used', 'n_dop_obs_used', 'condition_code', 'rms', 'two_body', 'A1', 'A2',
+    'A3', 'DT',
+)
+
+# The fields of each row of `cad.json`, in order.
+CAD_FIELDS = ('des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max', 'v_rel', 'v_inf',
+              't_sigma_f', 'h')
+
+CAD_SIGNATURE = {'source': 'NASA/JPL SBDB Close Approach Data API', 'version': '1.1'}
+
+# The average number of close approaches of each NEO.
+APPROACHES_PER_NEO = 17
+
+# The fractions of NEOs that are comets, numbered, and named (if numbered).
+COMET_FRACTION = 0.002
+NUMBERED_FRACTION = 0.35
+NAMED_FRACTION = 0.08
+
+# The fraction of named asteroids that share the name of an earlier one.
+DUPLICATE_NAME_FRACTION = 0.02
+
+# The fractions of NEOs with a known diameter, and of those that are hazardous.
+DIAMETER_FRACTION = 0.05
+HAZARDOUS_FRACTION = 0.09
+
+# The fraction of close approaches by objects that aren't in `neos.csv`.
+ORPHAN_FRACTION = 0.01
+
+# The names shared by many comets, after the surveys that discovered them.
+COMET_NAMES = ('LINEAR', 'NEAT', 'SOHO', 'LONEOS', 'Catalina', 'Spacewatch', 'Lemmon',
+               'PANSTARRS', 'ATLAS', 'WISE')
+
+# The first and last minute of the close approaches, since 1900-01-01.
+START = datetime.datetime(1900, 1, 1)
+END_MINUTES = int((datetime.datetime(2200, 12, 31, 23, 59) - START).total_seconds()) // 60
+
+# The Julian date of `START`.
+START_JD = 2415020.5
+
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# The letters of the half-months and of the orders within them, in provisional
+# designations (neither uses `I`, and half-months don't use `Z`).
+HALF_MONTHS = 'ABCDEFGHJKLMNOPQRSTUVWXY'
+ORDERS = 'ABCDEFGHJKLMNOPQRSTUVWXYZ'
+
+SYLLABLES = ('ka', 'ro', 'to', 'mi', 'ne', 'sa', 'ri', 'lo', 've', 'da', 'an', 'tes', 'gan',
+             'mer', 'phe', 'on', 'is', 'ur', 'bel', 'cy', 'dor', 'el', 'hy', 'ja', 'lu')
+
+# Earth's escape velocity at its surface (km/s), and its radius (au).
+V_ESCAPE = 11.186
+R_EARTH = 4.2635e-5
+
+
+def _sbdb(value, digits=16):
+    """Format a number as the Small-Body Database does, without a leading zero."""
+    text = f'{value:.{digits}g}'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def _packed(year, half_month, order, cycle):
+    """Pack a provisional designation, as in the `id` of `neos.csv`."""
+    century = 'IJK'[year // 100 - 18]
+    if cycle < 100:
+        cycle = f'{cycle:02d}'
+    else:
+        letters = string.ascii_uppercase + string.ascii_lowercase
+        cycle = letters[cycle // 10 - 10] + str(cycle % 10)
+    return f'{century}{year % 100:02d}{half_month}{cycle}{order}'
+
+
+class _Designations:
+    """Draw unique provisional designations, such as `2015 FT118`."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.seen = set()
+
+    def draw(self, first_year=1950, last_year=2020):
+        """Return a new provisional designation, and its packed form."""
+        rng = self.rng
+        while True:
+            year = rng.randint(first_year, last_year)
+            half_month = rng.choice(HALF_MONTHS)
+            order = rng.choice(ORDERS)
+            cycle = min(int(rng.expovariate(1 / 20)), 619)
+            designation = f'{year} {half_month}{order}{cycle or ""}'
+            if designation not in self.seen:
+                self.seen.add(designation)
+                return designation, _packed(year, half_month, order, cycle)
+
+
+def _name(rng):
+    """Make up a name for an asteroid."""
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+class _NEO:
+    """What `_approach_rows` needs to know about a generated NEO."""
+    __slots__ = ('designation', 'orbit_id', 'h')
+
+    def __init__(self, designation, orbit_id, h):
+        self.designation = designation
+        self.orbit_id = orbit_id
+        self.h = h
+
+
+def _neo_rows(rng, count):
+    """Generate the rows of `neos.csv`, and the NEOs they describe.
+
+    :return: A stream of tuples of a row (as a dictionary) and its `_NEO`.
+    """
+    designations = _Designations(rng)
+    comets = max(1, round(count * COMET_FRACTION)) if count > 1 else 0
+    numbered = round((count - comets) * NUMBERED_FRACTION)
+    number = 432
+    names, seen = [], set()
+    for k in range(count):
+        row = dict.fromkeys(NEO_FIELDS, '')
+        provisional, packed = designations.draw()
+        comet = k >= count - comets
+        if comet:
+            number = k - (count - comets) + 1
+            pdes, name = f'{number}P', rng.choice(COMET_NAMES)
+            row.update(id=f'c{number:05d}_0', spkid=str(1000000 + k), prefix='P',
+                       full_name=f'{pdes:>6}/{name}', pdes=pdes, name=name,
+                       M1=_sbdb(rng.uniform(10, 20), 3), K1=_sbdb(rng.uniform(2, 15), 3),
+                       **{'class': rng.choice(('JFc', 'JFc', 'HTC', 'ETc'))})
+            h = None
+        else:
+            if k < numbered:
+                number += rng.randint(1, 2 * max(1, 500000 // max(numbered, 1)))
+                pdes = str(number)
+                name = ''
+                if rng.random() < NAMED_FRACTION:
+                    if names and rng.random() < DUPLICATE_NAME_FRACTION:
+                        name = rng.choice(names)
+                    else:
+                        name = _name(rng)
+                        while name in seen:
+                            name = _name(rng)
+                        names.append(name)
+                        seen.add(name)
+                label = f'{pdes:>6} {name}' if name else f'{pdes:>6}'
+                row.update(id=f'a{number:07d}', spkid=str(2000000 + number),
+                           full_name=f'{label} ({provisional})', pdes=pdes, name=name)
+            else:
+                pdes = provisional
+                row.update(id=f'b{packed}', spkid=str(3000000 + k),
+                           full_name=f'       ({provisional})', pdes=pdes)
+            h = round(rng.gauss(22.5, 2.2), 1)
+            row.update(H=str(h), pha='Y' if rng.random() < HAZARDOUS_FRACTION else 'N',
+                       **{'class': rng.choice(('APO', 'APO', 'APO', 'AMO', 'AMO', 'ATE'))})
+            if rng.random() < DIAMETER_FRACTION:
+                albedo = rng.uniform(0.03, 0.5)
+                diameter = 1329 / math.sqrt(albedo) * 10 ** (-h / 5)
+                row.update(diameter=_sbdb(diameter, 4), albedo=_sbdb(albedo, 3))
+            h = str(h)
+
+        orbit_id = str(rng.randint(1, 500))
+        e = rng.uniform(0.05, 0.95)
+        a = rng.uniform(0.6, 3.5) if not comet else rng.uniform(2.5, 20)
+        q = a * (1 - e)
+        first = rng.randint(1950, 2019)
+        row.update(neo='Y', orbit_id=f'JPL {orbit_id}', epoch='2459000.5', epoch_mjd='59000',
+                   epoch_cal='20200531.0000000', equinox='J2000', e=_sbdb(e), a=_sbdb(a),
+                   q=_sbdb(q), i=_sbdb(rng.expovariate(1 / 12)),
+                   om=_sbdb(rng.uniform(0, 360)), w=_sbdb(rng.uniform(0, 360)),
+                   ma=_sbdb(rng.uniform(0, 360)), ad=_sbdb(a * (1 + e)),
+                   n=_sbdb(0.9856076686 / a ** 1.5), per=_sbdb(365.25 * a ** 1.5),
+                   per_y=_sbdb(a ** 1.5), moid=_sbdb(rng.uniform(0, 0.5), 6),
+                   producer=rng.choice(('Otto Matic', 'Davide Farnocchia', 'Alan Chamberlin')),
+                   first_obs=f'{first}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                   last_obs=f'2020-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}',
+                   n_obs_used=str(rng.randint(5, 3000)), condition_code=str(rng.randint(0, 9)),
+                   rms=_sbdb(rng.uniform(0.1, 0.9), 5))
+        yield row, _NEO(pdes, orbit_id, h)
+
+
+def _t_sigma(rng):
+    """Draw the 3-sigma uncertainty of the time of a close approach."""
+    if rng.random() < 0.5:
+        return '< 00:01'
+    minutes = int(rng.expovariate(1 / 30)) + 1
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    return f'{days}_{hours:02d}:{minutes:02d}' if days else f'{hours:02d}:{minutes:02d}'
+
+
+def _approach_rows(rng, neos, count):
+    """Generate the rows of `cad.json`, in time order.
+
+    :return: A stream of rows, each as a JSON array.
+    """
+    cum_weights, total = [], 0.0
+    for _ in neos:
+        total += rng.paretovariate(1.5)
+        cum_weights.append(total)
+    # Only the NEOs have designations from before 2021.
+    designations = _Designations(rng)
+    orphans = [_NEO(designations.draw(2021, 2030)[0], str(rng.randint(1, 50)), None)
+               for _ in range(max(1, len(neos) // 20))]
+
+    minutes, step = 0.0, END_MINUTES / (count + 1)
+    for _ in range(count):
+        minutes = min(minutes + rng.expovariate(1 / step), END_MINUTES)
+        if not neos or rng.random() < ORPHAN_FRACTION:
+            neo = rng.choice(orphans)
+        else:
+            neo = rng.choices(neos, cum_weights=cum_weights)[0]
+
+        time = START + datetime.timedelta(minutes=int(minutes))
+        cd = (f'{time.year}-{MONTHS[time.month - 1]}-{time.day:02d} '
+              f'{time.hour:02d}:{time.minute:02d}')
+        dist = 0.5 * math.sqrt(rng.random()) or 0.5
+        spread = dist * 10 ** rng.uniform(-8, -2)
+        v_rel = max(rng.lognormvariate(2.3, 0.5), 0.5)
+        v_inf = math.sqrt(max(v_rel ** 2 - V_ESCAPE ** 2 * R_EARTH / max(dist, R_EARTH), 0.01))
+        h = 'null' if neo.h is None else f'"{neo.h}"'
+        yield (f'["{neo.designation}","{neo.orbit_id}","{START_JD + minutes / 1440:.9f}",'
+               f'"{cd}","{dist!r}","{dist - spread!r}","{dist + spread!r}",'
+               f'"{v_rel!r}","{v_inf!r}","{_t_sigma(rng)}",{h}]')
+
+
+def data_paths(out_dir, approaches, neos, seed=0):
+    """Return the paths of the data files of a size and seed in a directory.
+
+    :return: A tuple of the paths of `neos.csv` and `cad.json`.
+    """
+    out_dir = pathlib.Path(out_dir)
+    return (out_dir / f'neos-{approaches}-{neos}-{seed}.csv',
+            out_dir / f'cad-{approaches}-{neos}-{seed}.json')
+
+
+def generate(out_dir, approaches, seed=0, neos=None, overwrite=False):
+    """Write synthetic `neos.csv` and `cad.json` files to a directory.
+
+    :param out_dir: The directory in which to write the files.
+    :param approaches: The number of close approaches.
+    :param seed: The seed of the random data.
+    :param neos: The number of NEOs, by default one per `APPROACHES_PER_NEO`
+    close approaches.
+    :param overwrite: Whether to write files that already exist.
+    :return: A tuple of the paths of the NEO file and the close approach file.
+    """
+    if neos is None:
+        neos = max(1, approaches // APPROACHES_PER_NEO)
+    neo_path, cad_path = data_paths(out_dir, approaches, neos, seed)
+    if not overwrite and neo_path.exists() and cad_path.exists():
+        return neo_path, cad_path
+    neo_path.parent.mkdir(parents=True, exist_ok=True)
+
+    rng = random.Random(seed)
+    generated = []
+    with open(neo_path.with_suffix('.tmp'), 'w', newline='') as file:
+        writer = csv.DictWriter(file, NEO_FIELDS)
+        writer.writeheader()
+        for row, neo in _neo_rows(rng, neos):
+            writer.writerow(row)
+            generated.append(neo)
+
+    with open(cad_path.with_suffix('.tmp'), 'w') as file:
+        file.write(f'{{"signature":{{"source":"{CAD_SIGNATURE["source"]}",'
+                   f'"version":"{CAD_SIGNATURE["version"]}"}},"count":"{approaches}",'
+                   '"fields":[' + ','.join(f'"{field}"' for field in CAD_FIELDS) + '],"data":[')
+        for k, row in enumerate(_approach_rows(rng, generated, approaches)):
+            if k:
+                file.write(',')
+            file.write(row)
+        file.write(']}\n')
+
+    # Only give the files their names once complete, so they can be reused.
+    neo_path.with_suffix('.tmp').replace(neo_path)
+    cad_path.with_suffix('.tmp').replace(cad_path)
+    return neo_path, cad_path
+
+
+def main():
+    """Generate the data files of the sizes given at the command line."""
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic NEO and close approach data files.")
+    parser.add_argument('--approaches', type=int, default=10000,
+                        help="The number of close approaches (default 10000).")
+    parser.add_argument('--neos', type=int,
+                        help=f"The number of NEOs (default one per {APPROACHES_PER_NEO} "
+                             "close approaches).")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the random data.")
+    parser.add_argument('--out-dir', type=pathlib.Path, default=pathlib.Path('.'),
+                        help="The directory in which to write the files.")
+    args = parser.parse_args()
+    for path in generate(args.out_dir, args.approaches, args.seed, args.neos, overwrite=True):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Check that the close approaches matching a query can be counted and
+summarized without generating them.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_aggregate
+"""
+import contextlib
+import datetime
+import io
+import json
+import math
+import pathlib
+import statistics
+import unittest
+
+from aggregate import Metric, aggregate, parse_metric
+from columns import np
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import NEOShell, make_parser, aggregate as aggregate_command
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+CRITERIA = (
+    {},
+    {'hazardous': True},
+    {'start_date': datetime.date(2020, 3, 1), 'end_date': datetime.date(2020, 5, 31)},
+    {'distance_max': 0.01},
+    {'distance_max': -1},
+)
+METRICS = ('count', 'min:distance', 'max:velocity', 'mean:velocity',
+           'mean:diameter', 'sum:diameter', 'max:diameter')
+
+
+def expected_table(approaches, group_by):
+    keys = {
+        None: lambda a: None,
+        'year': lambda a: a.time.year,
+        'month': lambda a: a.time.strftime('%Y-%m'),
+        'neo': lambda a: a._designation,
+    }
+    groups = {}
+    for approach in approaches:
+        groups.setdefault(keys[group_by](approach), []).append(approach)
+    if group_by is None:
+        groups.setdefault(None, [])
+
+    rows = []
+    for group in sorted(groups):
+        members = groups[group]
+        diameters = [a.neo.diameter for a in members
+                     if a.neo and not math.isnan(a.neo.diameter)]
+        row = [] if group_by is None else [group]
+        row += [len(members),
+                min((a.distance for a in members), default=None),
+                max((a.velocity for a in members), default=None),
+                statistics.fmean(a.velocity for a in members) if members else None,
+                statistics.fmean(diameters) if diameters else None,
+                math.fsum(diameters),
+                max(diameters, default=None)]
+        rows.append(row)
+    return rows
+
+
+class TestAggregate(unittest.TestCase):
+    columnar = False
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.columnar and np is None:
+            raise unittest.SkipTest("NumPy is not installed.")
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(neos[:-100], approaches, columnar=cls.columnar)
+
+    def assertRowsAlmostEqual(self, rows, expected):
+        self.assertEqual(len(rows), len(expected))
+        for row, expected_row in zip(rows, expected):
+            self.assertEqual(len(row), len(expected_row))
+            for value, expected_value in zip(row, expected_row):
+                if isinstance(expected_value, float):
+                    self.assertAlmostEqual(value, expected_value)
+                else:
+                    self.assertEqual(value, expected_value)
+
+    def test_aggregate(self):
+        for criteria in CRITERIA:
+            filters = create_filters(**criteria)
+            matches = list(self.db.query(filters))
+            for group_by in (None, 'year', 'month', 'neo'):
+                with self.subTest(criteria=criteria, group_by=group_by):
+                    table = self.db.aggregate(filters, group_by, METRICS)
+                    self.assertRowsAlmostEqual(table.rows, expected_table(matches, group_by))
+
+    def test_columns(self):
+        table = self.db.aggregate(group_by='neo', metrics=['count', 'mean:velocity'])
+        self.assertEqual(table.columns, ['designation', 'count', 'mean_velocity'])
+
+    def test_invalid_group(self):
+        with self.assertRaises(ValueError):
+            self.db.aggregate(group_by='day')
+
+
+class TestAggregateColumnar(TestAggregate):
+    columnar = True
+
+
+class TestParseMetric(unittest.TestCase):
+    def test_parse_metric(self):
+        self.assertEqual(parse_metric('count'), Metric('count', None))
+        self.assertEqual(parse_metric('Mean:Velocity'), Metric('mean', 'velocity'))
+        self.assertEqual(parse_metric('max:diameter').name, 'max_diameter')
+        for text in ('count:distance', 'median:distance', 'min', 'min:name'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_metric(text)
+
+    def test_aggregate_stream(self):
+        table = aggregate(iter(()), metrics=[parse_metric('count'), parse_metric('sum:distance')])
+        self.assertEqual(table.rows, [(0, 0.0)])
+
+
+class TestAggregateCommand(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _, _ = make_parser()
+
+    def run_command(self, *argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            aggregate_command(self.db, self.parser.parse_args(['aggregate', *argv]))
+        return stdout.getvalue()
+
+    def test_table(self):
+        lines = self.run_command('--group-by', 'month', '-m', 'count').splitlines()
+        self.assertEqual(lines[0].split(), ['month', 'count'])
+        self.assertEqual(len(lines), 13)
+        self.assertEqual(sum(int(line.split()[1]) for line in lines[1:]),
+                         len(list(self.db.query())))
+
+    def test_json(self):
+        rows = json.loads(self.run_command('--hazardous', '-m', 'count', '-m', 'min:distance',
+                                           '--format', 'json'))
+        self.assertEqual(list(rows[0]), ['count', 'min_distance'])
+
+    def test_csv(self):
+        lines = self.run_command('--group-by', 'year', '--format', 'csv').splitlines()
+        self.assertEqual(lines, ['year,count', f'2020,{len(list(self.db.query()))}'])
+
+    def test_interactive(self):
+        parser, inspect_parser, query_parser = make_parser()
+        shell = NEOShell(self.db, inspect_parser, query_parser, parser=parser)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            shell.onecmd('aggregate --group-by year --format csv')
+            shell.onecmd('a --group-by year --format csv')
+        self.assertEqual(stdout.getvalue(), self.run_command('--group-by', 'year',
+                                                             '--format', 'csv') * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Check that synthetic data sets look like the real ones, and can be benchmarked.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_benchmarks
+"""
+import collections
+import contextlib
+import csv
+import io
+import json
+import pathlib
+import tempfile
+import unittest
+
+from bench import compare, main, measure_memory, parse_size, run_benchmarks
+from database import NEODatabase
+from extract import load_neos, load_approaches, load_parallel
+from synthetic import data_paths, generate
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+SIZE = 3000
+
+
+class TestSynthetic(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = pathlib.Path(cls.tmp.name)
+        cls.neo_path, cls.cad_path = generate(cls.data_dir, SIZE, seed=7, neos=1000)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_schema(self):
+        with open(TEST_NEO_FILE) as real, open(self.neo_path) as synthetic:
+            self.assertEqual(next(csv.reader(synthetic)), next(csv.reader(real)))
+        with open(TEST_CAD_FILE) as real, open(self.cad_path) as synthetic:
+            real, synthetic = json.load(real), json.load(synthetic)
+        self.assertEqual(synthetic['fields'], real['fields'])
+        self.assertEqual(synthetic['signature'], real['signature'])
+        self.assertEqual(int(synthetic['count']), SIZE)
+        self.assertTrue(all(len(row) == len(real['fields']) for row in synthetic['data']))
+
+    def test_deterministic(self):
+        with tempfile.TemporaryDirectory() as other:
+            paths = generate(other, SIZE, seed=7, neos=1000)
+            for ours, theirs in zip((self.neo_path, self.cad_path), paths):
+                self.assertEqual(ours.read_bytes(), theirs.read_bytes())
+            paths = generate(other, SIZE, seed=8, neos=1000)
+            self.assertNotEqual(paths[1].read_bytes(), self.cad_path.read_bytes())
+
+    def test_existing_files_are_reused(self):
+        mtime = self.cad_path.stat().st_mtime_ns
+        self.assertEqual(generate(self.data_dir, SIZE, seed=7, neos=1000),
+                         (self.neo_path, self.cad_path))
+        self.assertEqual(self.cad_path.stat().st_mtime_ns, mtime)
+        self.assertEqual(data_paths(self.data_dir, SIZE, 1000, 7), (self.neo_path, self.cad_path))
+
+    def test_loads(self):
+        neos, approaches = load_neos(self.neo_path), load_approaches(self.cad_path)
+        self.assertEqual(len(neos), 1000)
+        self.assertEqual(len(approaches), SIZE)
+        self.assertEqual(len({neo.designation for neo in neos}), len(neos))
+        times = [approach.time for approach in approaches]
+        self.assertEqual(times, sorted(times))
+
+        parallel = load_parallel(self.neo_path, self.cad_path, jobs=2)
+        self.assertEqual([neo.designation for neo in parallel[0]],
+                         [neo.designation for neo in neos])
+        self.assertEqual([a.time for a in parallel[1]], times)
+
+        database = NEODatabase(neos, approaches)
+        orphans = sum(approach.neo is None for approach in approaches)
+        self.assertTrue(0 < orphans < SIZE * 0.05)
+        self.assertTrue(any(neo.hazardous for neo in neos))
+        self.assertTrue(any(neo.diameter == neo.diameter for neo in neos))
+
+        names = collections.Counter(neo.name for neo in neos if neo.name)
+        duplicate = next(name for name, count in names.items() if count > 1)
+        last = [neo for neo in neos if neo.name == duplicate][-1]
+        self.assertIs(database.get_neo_by_name(duplicate), last)
+
+
+class TestBench(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size('2500'), 2500)
+        self.assertEqual(parse_size('10k'), 10000)
+        self.assertEqual(parse_size('1M'), 1000000)
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            results = run_benchmarks([500], repeat=2, data_dir=data_dir)
+            output = pathlib.Path(data_dir) / 'results.json'
+            with contextlib.redirect_stderr(io.StringIO()):
+                main(['--sizes', '500', '--repeat', '1', '--data-dir', data_dir,
+                      '--output', str(output)])
+            saved = json.loads(output.read_text())
+
+        for document in (results, saved):
+            benchmarks = [result['benchmark'] for result in document['results']]
+            self.assertEqual(benchmarks[:3], ['load_neos', 'load_approaches', 'database'])
+            self.assertIn('query:scan', benchmarks)
+            self.assertEqual(benchmarks[-2:], ['write_to_csv', 'write_to_json'])
+        for result in results['results']:
+            self.assertEqual(len(result['seconds']), 2)
+            self.assertEqual(result['best'], min(result['seconds']))
+        self.assertEqual(results['results'][1]['rows'], 500)
+
+        self.assertEqual(compare(results, results, 0), [])
+        slower = json.loads(json.dumps(results))
+        slower['results'][1]['best'] = results['results'][1]['best'] * 2 + 1
+        self.assertEqual([regression[:2] for regression in compare(slower, results, 0.5)],
+                         [(500, 'load_approaches')])
+        self.assertEqual(compare(slower, results, 0.5, min_seconds=10), [])
+
+    def test_memory(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            results = measure_memory([500], data_dir=data_dir)
+        self.assertEqual(set(results['objects']), {'NearEarthObject', 'CloseApproach'})
+        # The models have no `__dict__`, so each is only a few dozen bytes.
+        self.assertTrue(all(0 < size < 160 for size in results['objects'].values()))
+        [result] = results['results']
+        self.assertEqual((result['size'], result['benchmark'], result['rows']),
+                         (500, 'database', 500))
+        self.assertTrue(0 < result['bytes'] <= result['peak'])
+
+
+if __name__ == '__main__':
+    unittest.main()
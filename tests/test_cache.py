@@ -0,0 +1,174 @@
+"""Check that query results are cached, and evicted least recently used first.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_cache
+"""
+import array
+import contextlib
+import datetime
+import io
+import pathlib
+import sys
+import unittest
+import unittest.mock
+
+from cache import ResultCache
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, compile_filters, limit, AttributeFilter
+from main import make_parser, query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestResultCache(unittest.TestCase):
+    def test_lru_eviction_by_entries(self):
+        cache = ResultCache(max_entries=2)
+        cache.put('a', [1])
+        cache.put('b', [2])
+        self.assertEqual(list(cache.get('a').positions), [1])
+        cache.put('c', [3])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(list(cache.get('c').positions), [3])
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.evictions, info.entries), (2, 1, 1, 2))
+
+    def test_eviction_by_bytes(self):
+        small = array.array('i', range(10))
+        large = array.array('i', range(1000))
+        cache = ResultCache(max_entries=None,
+                            max_bytes=sys.getsizeof(small) + sys.getsizeof(large))
+        cache.put('small', small)
+        cache.put('large', large)
+        self.assertEqual(len(cache), 2)
+        cache.put('larger', array.array('i', range(1001)))
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.get('larger'))
+        self.assertLessEqual(cache.info().bytes, cache.max_bytes)
+
+    def test_oversized_results_are_not_kept(self):
+        cache = ResultCache(max_bytes=100)
+        cache.put('large', range(1000))
+        self.assertEqual(len(cache), 0)
+
+    def test_clear(self):
+        cache = ResultCache()
+        cache.put('a', [1])
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.info().bytes, 0)
+
+    def test_incomplete_results(self):
+        cache = ResultCache()
+        cache.put('a', [1, 2], complete=False)
+        self.assertEqual(cache.get('a'), (array.array('i', [1, 2]), False))
+        cache.put('a', [1], complete=False)
+        self.assertEqual(list(cache.get('a').positions), [1, 2])
+        cache.put('a', [1, 2, 3], complete=False)
+        cache.put('a', [1, 2, 3, 4])
+        cache.put('a', [1, 2, 3, 4, 5], complete=False)
+        self.assertEqual(cache.get('a'), (array.array('i', [1, 2, 3, 4]), True))
+        self.assertEqual(cache.info().bytes, sys.getsizeof(cache.get('a').positions))
+
+
+class TestCompiledFiltersKey(unittest.TestCase):
+    def test_equivalent_filters_have_equal_keys(self):
+        a = create_filters(start_date=datetime.date(2020, 1, 1), distance_max=0.1, hazardous=True)
+        b = list(reversed(a)) + create_filters(distance_max=0.2)
+        self.assertEqual(compile_filters(a).key(), compile_filters(b).key())
+        self.assertNotEqual(compile_filters(a).key(),
+                            compile_filters(create_filters(distance_max=0.1)).key())
+
+    def test_residual_filters_have_no_key(self):
+        class NameFilter(AttributeFilter):
+            @classmethod
+            def get(cls, approach):
+                return approach.neo.name
+        self.assertIsNone(compile_filters([NameFilter(str.__eq__, 'Eros')]).key())
+
+
+class TestQueryCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def setUp(self):
+        self.db = NEODatabase(self.neos, self.approaches, cache_entries=4)
+
+    def test_repeated_query_hits_cache(self):
+        filters = create_filters(velocity_min=10, hazardous=False)
+        expected = list(self.db.query(filters))
+        self.assertEqual(self.db.cache_info().misses, 1)
+        self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertEqual(self.db.cache_info().hits, 1)
+
+    def test_limit_prefix_of_cached_query(self):
+        expected = list(self.db.query(create_filters(distance_max=0.1)))
+        received = list(limit(self.db.query(create_filters(distance_max=0.1)), 5))
+        self.assertEqual(received, expected[:5])
+        self.assertEqual(self.db.cache_info().hits, 1)
+
+    def test_repeated_limited_query_hits_cache(self):
+        filters = create_filters(velocity_min=20)
+        expected = [approach for approach in self.approaches if approach.velocity >= 20]
+        for _ in range(3):
+            self.assertEqual(list(limit(self.db.query(filters), 5)), expected[:5])
+        info = self.db.cache_info()
+        self.assertEqual((info.hits, info.misses, info.entries), (2, 1, 1))
+
+        # A longer limit carries on past the cached matches, and caches them.
+        self.assertEqual(list(limit(self.db.query(filters), 8)), expected[:8])
+        self.assertEqual(list(self.db.query(filters)), expected)
+        with unittest.mock.patch.object(self.db, '_access', side_effect=AssertionError):
+            self.assertEqual(list(self.db.query(filters)), expected)
+            self.assertEqual(list(limit(self.db.query(filters), 5)), expected[:5])
+        self.assertEqual(self.db.cache_info().entries, 1)
+
+    def test_repeated_query_subcommand_hits_cache(self):
+        parser, _, _ = make_parser()
+        args = parser.parse_args(['query', '--min-velocity', '20'])
+        outputs = []
+        for _ in range(3):
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                query(self.db, args)
+            outputs.append(stdout.getvalue())
+        self.assertEqual(len(outputs[0].splitlines()), 10)
+        self.assertEqual(outputs, outputs[:1] * 3)
+        self.assertEqual(self.db.cache_info().hits, 2)
+
+    def test_limited_query_is_served_from_prefix(self):
+        filters = create_filters(distance_max=0.1)
+        list(limit(self.db.query(filters), 5))
+        with unittest.mock.patch.object(self.db, '_access', side_effect=AssertionError):
+            self.assertEqual(len(list(limit(self.db.query(filters), 5))), 5)
+        self.assertEqual(len(list(self.db.query(filters))),
+                         sum(approach.distance <= 0.1 for approach in self.approaches))
+
+    def test_repeated_top_query_hits_cache(self):
+        filters = create_filters(hazardous=False)
+        expected = list(self.db.query(filters, sort_by='distance', top=5))
+        with unittest.mock.patch.object(self.db, '_access', side_effect=AssertionError):
+            self.assertEqual(list(self.db.query(filters, sort_by='distance', top=5)),
+                             expected)
+            self.assertEqual(list(self.db.query(filters, sort_by='distance', top=3)),
+                             expected[:3])
+        self.assertEqual(list(self.db.query(filters, sort_by='distance', top=7))[:5],
+                         expected)
+        self.assertEqual(list(self.db.query(filters, sort_by='distance', descending=True,
+                                            top=5)),
+                         list(self.db.query(filters, sort_by='distance', descending=True))[:5])
+
+    def test_disabled_cache(self):
+        db = NEODatabase(self.neos, self.approaches, cache_entries=0)
+        list(db.query(create_filters(distance_max=0.1)))
+        self.assertIsNone(db.cache_info())
+
+
+if __name__ == '__main__':
+    unittest.main()
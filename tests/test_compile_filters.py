@@ -0,0 +1,91 @@
+"""Check that `compile_filters` fuses filters without changing their meaning.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_compile_filters
+"""
+import datetime
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, compile_filters, AttributeFilter, DistanceFilter
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class NameFilter(AttributeFilter):
+    """A custom filter, which `compile_filters` can't fuse."""
+    @classmethod
+    def get(cls, approach):
+        return approach.neo.name
+
+
+class TestCompileFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def assertCompiledMatches(self, filters):
+        expected = [approach for approach in self.approaches
+                    if all(f(approach) for f in filters)]
+        compiled = compile_filters(filters)
+        self.assertEqual(expected, [approach for approach in self.approaches if compiled(approach)])
+        self.assertEqual(expected, list(self.db.query(compiled)))
+        return expected
+
+    def test_compiled_filters_match_the_original_filters(self):
+        combinations = (
+            {},
+            {'date': datetime.date(2020, 3, 2)},
+            {'start_date': datetime.date(2020, 3, 1), 'end_date': datetime.date(2020, 3, 31),
+             'distance_min': 0.05, 'velocity_max': 20},
+            {'distance_max': 0.1, 'diameter_min': 0.5, 'hazardous': True},
+            {'start_date': datetime.date(2020, 6, 1), 'hazardous': False, 'diameter_max': 1},
+        )
+        for criteria in combinations:
+            with self.subTest(**criteria):
+                self.assertCompiledMatches(create_filters(**criteria))
+
+    def test_redundant_bounds_are_merged(self):
+        compiled = compile_filters(create_filters(
+            date=datetime.date(2020, 3, 2), start_date=datetime.date(2020, 1, 1),
+            distance_min=0.1, distance_max=0.5))
+        compiled = compile_filters(list(compiled.filters) + [DistanceFilter(operator.ge, 0.2)])
+
+        self.assertFalse(compiled.empty)
+        self.assertEqual(compiled.bounds['time'].key(), (
+            datetime.datetime(2020, 3, 2), True, datetime.datetime(2020, 3, 3), False))
+        self.assertEqual(compiled.bounds['distance'].key(), (0.2, True, 0.5, True))
+        self.assertEqual(compiled.residual, [])
+
+    def test_contradictory_bounds_are_empty(self):
+        contradictions = (
+            {'start_date': datetime.date(2020, 3, 2), 'end_date': datetime.date(2020, 3, 1)},
+            {'date': datetime.date(2020, 3, 2), 'end_date': datetime.date(2020, 3, 1)},
+            {'distance_min': 0.5, 'distance_max': 0.1},
+            {'diameter_min': 2, 'diameter_max': 1},
+        )
+        for criteria in contradictions:
+            with self.subTest(**criteria):
+                compiled = compile_filters(create_filters(**criteria))
+                self.assertTrue(compiled.empty)
+                self.assertEqual(list(self.db.query(compiled)), [])
+
+    def test_unfusable_filters_are_kept_as_residual(self):
+        filters = [DistanceFilter(operator.ne, 0.0), NameFilter(operator.eq, 'Apophis')]
+        filters += create_filters(start_date=datetime.date(2020, 1, 1))
+        compiled = compile_filters(filters)
+        self.assertEqual(compiled.residual, filters[:2])
+        self.assertCompiledMatches(filters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import datetime
 import pathlib
 import math
 import unittest
@@ -17,6 +18,7 @@ import unittest
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
+from filters import create_filters
 
 
 # Paths to the test data files.
@@ -114,6 +116,77 @@ class TestDatabase(unittest.TestCase):
         nonexistent = self.db.get_neo_by_name('not-real-name')
         self.assertIsNone(nonexistent)
 
+    def test_database_construction_from_a_stream_of_neos(self):
+        neos = load_neos(TEST_NEO_FILE)
+        db = NEODatabase((neo for neo in neos), load_approaches(TEST_CAD_FILE))
+        self.assertEqual(db.get_neo_by_designation('1685').name, 'Toro')
+        self.assertEqual(db.get_neo_by_name('Toro').designation, '1685')
+        self.assertTrue(db.get_neo_by_name('Toro').approaches)
+
+    def test_database_construction_from_a_stream_of_approaches(self):
+        approaches = load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(load_neos(TEST_NEO_FILE), (approach for approach in approaches))
+        self.assertTrue(all(approach.neo is not None for approach in approaches))
+        self.assertEqual(len(list(db.query(create_filters(start_date=datetime.date(2020, 1, 1),
+                                                          end_date=datetime.date(2020, 1, 31))))),
+                         sum(approach.time.date() <= datetime.date(2020, 1, 31)
+                             for approach in approaches))
+
+
+class TestAddToDatabase(unittest.TestCase):
+    def setUp(self):
+        self.neos = load_neos(TEST_NEO_FILE)
+        self.approaches = load_approaches(TEST_CAD_FILE)
+        self.db = NEODatabase(self.neos[:-300], self.approaches[:3000])
+        self.expected = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def assertQueriesMatch(self):
+        for criteria in ({},
+                         {'start_date': datetime.date(2020, 11, 1)},
+                         {'distance_max': 0.05, 'velocity_min': 10},
+                         {'hazardous': True},
+                         {'diameter_min': 0.5}):
+            with self.subTest(criteria=criteria):
+                filters = create_filters(**criteria)
+                self.assertEqual(
+                    [(a._designation, a.time) for a in self.db.query(filters)],
+                    [(a._designation, a.time) for a in self.expected.query(filters)])
+
+    def test_add_approaches_then_neos(self):
+        self.db.add_approaches(self.approaches[3000:])
+        self.db.add_neos(self.neos[-300:])
+        self.assertQueriesMatch()
+
+    def test_add_neos_then_approaches(self):
+        self.db.add_neos(self.neos[-300:])
+        for i in range(3000, len(self.approaches), 500):
+            self.db.add_approaches(self.approaches[i:i + 500])
+        self.assertQueriesMatch()
+
+    def test_added_records_are_linked(self):
+        self.db.add_approaches(self.approaches[3000:])
+        self.db.add_neos(self.neos[-300:])
+        for neo in self.neos[-300:]:
+            self.assertIs(self.db.get_neo_by_designation(neo.designation), neo)
+            if neo.name:
+                self.assertIs(self.db.get_neo_by_name(neo.name), neo)
+            for approach in neo.approaches:
+                self.assertIs(approach.neo, neo)
+        for approach in self.approaches:
+            self.assertIsNotNone(approach.neo)
+
+    def test_add_existing_neo(self):
+        with self.assertRaises(ValueError):
+            self.db.add_neos(load_neos(TEST_NEO_FILE)[:1])
+        with self.assertRaises(ValueError):
+            self.db.add_neos([self.neos[-1], self.neos[-1]])
+        self.assertIsNone(self.db.get_neo_by_designation(self.neos[-1].designation))
+
+    def test_add_invalidates_cached_results(self):
+        self.assertEqual(len(list(self.db.query())), 3000)
+        self.db.add_approaches(self.approaches[3000:])
+        self.assertEqual(len(list(self.db.query())), len(self.approaches))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -11,12 +11,16 @@ To run these tests from the project root, run:
 These tests should pass when Task 2 is complete.
 """
 import collections.abc
+import csv
 import datetime
+import json
 import pathlib
 import math
+import shutil
+import tempfile
 import unittest
 
-from extract import load_neos, load_approaches
+from extract import load_neos, load_approaches, iter_cad_rows, load_parallel
 from models import NearEarthObject, CloseApproach
 
 
@@ -78,6 +82,65 @@ class TestLoadNEOs(unittest.TestCase):
         self.assertEqual(neo.hazardous, True)
 
 
+class TestLoadNEOFields(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_NEO_FILE) as file:
+            cls.rows = list(csv.DictReader(file))
+        cls.tmp = pathlib.Path(tempfile.mkdtemp())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def write(self, fieldnames, rows):
+        path = self.tmp / 'neos.csv'
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def test_extra_fields(self):
+        neos = load_neos(TEST_NEO_FILE, extra_fields=('H', 'albedo', 'moid'))
+        self.assertEqual(len(neos), len(self.rows))
+        for neo, row in zip(neos, self.rows):
+            self.assertEqual(neo.extra, {field: row[field] or None
+                                         for field in ('H', 'albedo', 'moid')})
+        self.assertIsNone(load_neos(TEST_NEO_FILE)[0].extra)
+
+    def test_last_column(self):
+        fieldnames = list(self.rows[0])
+        neos = load_neos(TEST_NEO_FILE, extra_fields=fieldnames[-1:])
+        self.assertEqual([neo.extra[fieldnames[-1]] for neo in neos],
+                         [row[fieldnames[-1]] or None for row in self.rows])
+
+    def test_quoted_fields(self):
+        rows = [dict(row) for row in self.rows[:50]]
+        rows[3]['name'] = 'Name, with a comma'
+        rows[7]['full_name'] = 'A "quoted"\nfull name'
+        path = self.write(list(self.rows[0]), rows)
+
+        neos = load_neos(path, extra_fields=('full_name',))
+        self.assertEqual(len(neos), 50)
+        self.assertEqual(neos[3].name, 'Name, with a comma')
+        self.assertEqual(neos[7].extra['full_name'], 'A "quoted"\nfull name')
+        self.assertEqual([neo.designation for neo in neos], [row['pdes'] for row in rows])
+
+    def test_columns_are_located_by_name(self):
+        path = self.write(['pha', 'diameter', 'name', 'pdes'], self.rows)
+        expected = [(neo.designation, neo.name, repr(neo.diameter), neo.hazardous)
+                    for neo in load_neos(TEST_NEO_FILE)]
+        self.assertEqual(expected, [(neo.designation, neo.name, repr(neo.diameter), neo.hazardous)
+                                    for neo in load_neos(path)])
+
+    def test_missing_field_is_an_error(self):
+        with self.assertRaises(ValueError):
+            load_neos(TEST_NEO_FILE, extra_fields=('not-a-field',))
+        with self.assertRaises(ValueError):
+            load_neos(self.write(['pdes', 'name', 'pha'], self.rows))
+
+
 class TestLoadApproaches(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -118,5 +181,68 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsInstance(approach.velocity, float)
 
 
+class TestIterCadRows(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as file:
+            cls.document = json.load(file)
+        cls.tmp = pathlib.Path(tempfile.mkdtemp())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def expected_rows(self, columns):
+        fields = self.document['fields']
+        return [tuple(row[fields.index(column)] for column in columns)
+                for row in self.document['data']]
+
+    def test_rows_match_the_decoded_document(self):
+        columns = ('des', 'cd', 'dist', 'v_rel')
+        self.assertEqual(self.expected_rows(columns), list(iter_cad_rows(TEST_CAD_FILE, columns)))
+
+    def test_rows_are_located_by_field_name(self):
+        # Reorder the fields (and each row to match), and put them first.
+        fields = list(reversed(self.document['fields']))
+        document = {
+            'fields': fields,
+            'signature': self.document['signature'],
+            'data': [list(reversed(row)) for row in self.document['data']],
+            'count': self.document['count'],
+        }
+        path = self.tmp / 'compact.json'
+        with open(path, 'w') as file:
+            json.dump(document, file, separators=(',', ':'))
+
+        columns = ('cd', 'des', 'h')
+        self.assertEqual(self.expected_rows(columns), list(iter_cad_rows(path, columns)))
+
+    def test_missing_field_is_an_error(self):
+        with self.assertRaises(ValueError):
+            list(iter_cad_rows(TEST_CAD_FILE, ('des', 'not-a-field')))
+
+    def test_truncated_document_is_an_error(self):
+        path = self.tmp / 'truncated.json'
+        path.write_text(TEST_CAD_FILE.read_text()[:5000])
+        with self.assertRaises(ValueError):
+            list(iter_cad_rows(path))
+
+
+class TestLoadParallel(unittest.TestCase):
+    def test_parallel_load_matches_serial_load(self):
+        neos = [(neo.designation, neo.name, repr(neo.diameter), neo.hazardous)
+                for neo in load_neos(TEST_NEO_FILE)]
+        approaches = [(a._designation, a.time, a.distance, a.velocity)
+                      for a in load_approaches(TEST_CAD_FILE)]
+
+        # Use small chunks, so that each file is split many times.
+        parallel_neos, parallel_approaches = load_parallel(
+            TEST_NEO_FILE, TEST_CAD_FILE, jobs=2, chunk_size=10000)
+        self.assertEqual(neos, [(neo.designation, neo.name, repr(neo.diameter), neo.hazardous)
+                                for neo in parallel_neos])
+        self.assertEqual(approaches, [(a._designation, a.time, a.distance, a.velocity)
+                                      for a in parallel_approaches])
+
+
 if __name__ == '__main__':
     unittest.main()
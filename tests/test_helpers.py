@@ -0,0 +1,76 @@
+"""Check that calendar dates are parsed exactly as `strptime` would, and that
+datetimes are formatted exactly as `strftime` would.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import unittest
+
+from helpers import cd_to_datetime, cd_to_datetime64, datetime_to_str, np
+
+
+def strptime(calendar_date):
+    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+class TestCdToDatetime(unittest.TestCase):
+    valid = (
+        '2020-Dec-31 12:00',
+        '2020-Feb-29 23:59',
+        '1900-Jan-01 00:00',
+        '9999-Dec-31 23:59',
+        # Layouts outside of the fast path, but still accepted by `strptime`.
+        '2020-dec-31 12:00',
+        '2020-Jan-1 1:05',
+        '2020-Jan-01  0:00',
+    )
+    malformed = (
+        '2020-Feb-30 00:00',
+        '2021-Feb-29 00:00',
+        '2020-Jan-01 24:00',
+        '2020-Jan-01 23:60',
+        '0000-Jan-01 00:00',
+        '2020-Jan-01T00:00',
+        '2020-Jan-01 00:00 ',
+        '2020-Jan-+1 00:00',
+        '2020-Jan-0١ 00:00',
+        '',
+    )
+
+    def test_valid_calendar_dates_match_strptime(self):
+        for calendar_date in self.valid:
+            with self.subTest(calendar_date=calendar_date):
+                self.assertEqual(strptime(calendar_date), cd_to_datetime(calendar_date))
+
+    def test_malformed_calendar_dates_are_rejected(self):
+        for calendar_date in self.malformed:
+            with self.subTest(calendar_date=calendar_date):
+                with self.assertRaises(ValueError):
+                    cd_to_datetime(calendar_date)
+
+    @unittest.skipIf(np is None, "Converting to datetime64 requires NumPy.")
+    def test_batch_conversion_to_datetime64(self):
+        converted = cd_to_datetime64(self.valid)
+        self.assertEqual(converted.dtype, np.dtype('datetime64[m]'))
+        self.assertEqual([strptime(calendar_date) for calendar_date in self.valid],
+                         converted.astype(datetime.datetime).tolist())
+
+    @unittest.skipIf(np is None, "Converting to datetime64 requires NumPy.")
+    def test_batch_conversion_rejects_malformed_calendar_dates(self):
+        with self.assertRaises(ValueError):
+            cd_to_datetime64(['2020-Dec-31 12:00', '2020-Feb-30 00:00'])
+
+
+class TestDatetimeToStr(unittest.TestCase):
+    def test_matches_strftime(self):
+        for dt in (datetime.datetime(2020, 1, 2, 3, 4),
+                   datetime.datetime(1900, 12, 31, 23, 59),
+                   datetime.datetime(2200, 6, 15, 12, 0, 59)):
+            with self.subTest(dt=dt):
+                self.assertEqual(datetime_to_str(dt), dt.strftime("%Y-%m-%d %H:%M"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""Check that a single NEO and its close approaches can be found without
+loading the whole data set.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_lookup
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import find_neo, load_neos, load_approaches
+from lookup import ApproachIndex, find_approaches, index_path
+from main import make_parser, inspect, load_inspect_database
+from snapshot import file_digest
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def describe(neo):
+    return None if neo is None else (neo.designation, neo.name, repr(neo.diameter), neo.hazardous)
+
+
+def describe_approaches(approaches):
+    return [(a._designation, a.time, a.distance, a.velocity) for a in approaches]
+
+
+class TestFindNEO(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.tmp = pathlib.Path(tempfile.mkdtemp())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def test_by_designation(self):
+        for neo in self.neos[::97]:
+            with self.subTest(designation=neo.designation):
+                self.assertEqual(describe(find_neo(TEST_NEO_FILE, pdes=neo.designation)),
+                                 describe(neo))
+
+    def test_by_name(self):
+        for neo in [neo for neo in self.neos if neo.name][::7]:
+            with self.subTest(name=neo.name):
+                self.assertEqual(describe(find_neo(TEST_NEO_FILE, name=neo.name)), describe(neo))
+
+    def test_no_match(self):
+        self.assertIsNone(find_neo(TEST_NEO_FILE, pdes='not a designation'))
+        # A designation that only occurs within other fields.
+        self.assertIsNone(find_neo(TEST_NEO_FILE, pdes='168'))
+        self.assertIsNone(find_neo(TEST_NEO_FILE, name='Tor'))
+        self.assertIsNone(find_neo(TEST_NEO_FILE, name=''))
+
+    def test_last_duplicate_wins(self):
+        with open(TEST_NEO_FILE) as file:
+            rows = list(csv.DictReader(file))
+        rows[10]['name'] = rows[20]['name'] = 'Twin'
+        rows[20]['diameter'] = '1.5'
+        path = self.tmp / 'duplicates.csv'
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        database = NEODatabase(load_neos(path), [])
+        self.assertEqual(describe(find_neo(path, name='Twin')),
+                         describe(database.get_neo_by_name('Twin')))
+
+    def test_quoted_field_spanning_lines(self):
+        with open(TEST_NEO_FILE) as file:
+            rows = list(csv.DictReader(file))
+        rows[5]['full_name'] = '1685 Toro\n(again)'
+        path = self.tmp / 'multiline.csv'
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        database = NEODatabase(load_neos(path), [])
+        self.assertEqual(describe(find_neo(path, pdes='1685')),
+                         describe(database.get_neo_by_designation('1685')))
+
+
+class TestApproachIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.designations = sorted({a._designation for a in cls.approaches})
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = pathlib.Path(tmp.name)
+
+    def expected(self, designation):
+        return describe_approaches(a for a in self.approaches if a._designation == designation)
+
+    def test_spans(self):
+        index = ApproachIndex.build(TEST_CAD_FILE)
+        self.assertEqual(index.designations, self.designations)
+        self.assertEqual(index.spans('not a designation'), [])
+
+    def test_find_approaches(self):
+        for designation in self.designations[::53] + ['1685', 'not a designation']:
+            for cache_dir in (None, self.cache_dir):
+                with self.subTest(designation=designation, cache_dir=cache_dir):
+                    self.assertEqual(describe_approaches(
+                        find_approaches(TEST_CAD_FILE, designation, cache_dir)),
+                        self.expected(designation))
+
+    def test_index_is_saved_and_reused(self):
+        find_approaches(TEST_CAD_FILE, '1685', self.cache_dir)
+        self.assertTrue(index_path(self.cache_dir, TEST_CAD_FILE).exists())
+        with unittest.mock.patch.object(ApproachIndex, 'build') as build:
+            approaches = find_approaches(TEST_CAD_FILE, '1685', self.cache_dir)
+        build.assert_not_called()
+        self.assertEqual(describe_approaches(approaches), self.expected('1685'))
+
+    def test_touched_file_is_hashed_only_once(self):
+        path = self.cache_dir / 'cad.json'
+        shutil.copy(TEST_CAD_FILE, path)
+        find_approaches(path, '1685', self.cache_dir)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with unittest.mock.patch('snapshot.file_digest', wraps=file_digest) as digest, \
+                unittest.mock.patch.object(ApproachIndex, 'build') as build:
+            for _ in range(2):
+                self.assertEqual(describe_approaches(find_approaches(path, '1685', self.cache_dir)),
+                                 self.expected('1685'))
+        build.assert_not_called()
+        self.assertEqual(digest.call_count, 1)
+
+    def test_index_is_rebuilt_when_stale(self):
+        with open(TEST_CAD_FILE) as file:
+            document = json.load(file)
+        path = self.cache_dir / 'cad.json'
+        with open(path, 'w') as file:
+            json.dump(document, file)
+        self.assertEqual(len(find_approaches(path, '1685', self.cache_dir)),
+                         len(self.expected('1685')))
+
+        document['data'] = [row for row in document['data'] if row[0] != '1685'][:100]
+        with open(path, 'w') as file:
+            json.dump(document, file)
+        self.assertEqual(find_approaches(path, '1685', self.cache_dir), [])
+        self.assertEqual(len(find_approaches(path, document['data'][5][0], self.cache_dir)),
+                         sum(row[0] == document['data'][5][0] for row in document['data']))
+
+
+class TestInspect(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _, _ = make_parser()
+
+    def run_inspect(self, database, args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_matches_full_database(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for argv in (['--pdes', '1685'], ['--name', 'Toro', '--verbose'],
+                         ['--pdes', '2019 SC8', '-v'], ['--name', 'Nonesuch', '-v']):
+                for cache in (['--cache-dir', cache_dir], ['--no-cache']):
+                    with self.subTest(argv=argv, cache=cache):
+                        args = self.parser.parse_args(
+                            ['--neofile', str(TEST_NEO_FILE), '--cadfile', str(TEST_CAD_FILE)]
+                            + cache + ['inspect'] + argv)
+                        self.assertEqual(self.run_inspect(load_inspect_database(args), args),
+                                         self.run_inspect(self.db, args))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Check that the NEO and close approach models keep no per-instance `__dict__`,
+and still present and serialize themselves as before.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_models
+"""
+import datetime
+import math
+import unittest
+
+from models import NearEarthObject, CloseApproach
+
+
+class TestModels(unittest.TestCase):
+    def setUp(self):
+        self.toro = NearEarthObject('1685', name='Toro', diameter='3.4', hazardous=False)
+        self.approach = CloseApproach('1685', '2020-Jul-27 13:22', '0.331160353967125',
+                                      '21.2227102746348', neo=self.toro)
+        self.toro.approaches.append(self.approach)
+        self.unnamed = NearEarthObject('2019 SC8')
+        self.orphan = CloseApproach('2019 SC8', datetime.datetime(2020, 1, 1, 12, 30), 0.05, 8)
+
+    def test_instances_have_no_dict(self):
+        for obj in (self.toro, self.unnamed, self.approach, self.orphan):
+            with self.subTest(obj=type(obj).__name__):
+                self.assertFalse(hasattr(obj, '__dict__'))
+                with self.assertRaises(AttributeError):
+                    obj.unknown_attribute = None
+
+    def test_neo_attributes(self):
+        self.assertEqual(self.toro.fullname, '1685 (Toro)')
+        self.assertEqual(self.unnamed.fullname, '2019 SC8')
+        self.assertIsNone(self.unnamed.name)
+        self.assertTrue(math.isnan(self.unnamed.diameter))
+        self.assertFalse(self.unnamed.hazardous)
+        self.assertEqual(self.unnamed.approaches, [])
+        self.assertIsNone(self.unnamed.extra)
+        self.assertEqual(str(self.toro),
+                         "NEO 1685 (Toro) has a diameter of 3.400 km and is not potentially "
+                         "hazardous.")
+        self.assertEqual(repr(self.toro), "NearEarthObject(designation='1685', name='Toro', "
+                                          "diameter=3.400, hazardous=False)")
+
+    def test_time_str(self):
+        self.assertEqual(self.approach.time, datetime.datetime(2020, 7, 27, 13, 22))
+        self.assertEqual(self.approach.time_str,
+                         "Object '1685 (Toro)' had a close approach at 2020-07-27 13:22")
+        self.assertEqual(self.orphan.time_str,
+                         "Object '2019 SC8' had a close approach at 2020-01-01 12:30")
+        self.assertEqual(str(self.approach),
+                         "Object '1685 (Toro)' had a close approach at 2020-07-27 13:22, "
+                         "approaching Earth at a distance of 0.33 au and a velocity of "
+                         "21.22 km/s.")
+
+    def test_serialize(self):
+        self.assertEqual(self.approach.serialize(), {
+            'datetime_utc': '2020-07-27 13:22',
+            'distance_au': 0.331160353967125,
+            'velocity_km_s': 21.2227102746348,
+            'neo': {'designation': '1685', 'name': 'Toro', 'diameter_km': 3.4,
+                    'potentially_hazardous': False},
+        })
+        self.assertEqual(self.approach.serialize(to_csv=True), {
+            'datetime_utc': '2020-07-27 13:22',
+            'distance_au': 0.331160353967125,
+            'velocity_km_s': 21.2227102746348,
+            'designation': '1685',
+            'name': 'Toro',
+            'diameter_km': 3.4,
+            'potentially_hazardous': 'False',
+        })
+        self.assertEqual(self.orphan.serialize(to_csv=True), {
+            'datetime_utc': '2020-01-01 12:30',
+            'distance_au': 0.05,
+            'velocity_km_s': 8.0,
+            'designation': '',
+            'name': '',
+            'diameter_km': 'nan',
+            'potentially_hazardous': 'False',
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""Check that full-scan queries can be split among several workers.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_parallel
+"""
+import concurrent.futures
+import contextlib
+import functools
+import io
+import itertools
+import pathlib
+import threading
+import unittest
+import unittest.mock
+
+import parallel
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+from main import make_parser, query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def is_named(approach):
+    return approach.neo is not None and approach.neo.name is not None
+
+
+class TestScan(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.approaches = cls.db._approaches
+        cls.expected = [i for i, a in enumerate(cls.approaches) if is_named(a)]
+
+    def test_scan_in_processes(self):
+        for chunk_size in (1, 333, 4700, 10000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(parallel.scan(self.approaches, is_named, 2, chunk_size)),
+                                 self.expected)
+
+    def test_scan_in_threads(self):
+        with unittest.mock.patch('parallel._free_threaded', return_value=True):
+            self.assertEqual(list(parallel.scan(self.approaches, is_named, 3, 100)),
+                             self.expected)
+
+    def test_unpicklable_predicate(self):
+        names = {'Toro', 'Eros'}
+        predicate = lambda a: a.neo is not None and a.neo.name in names  # noqa: E731
+        self.assertEqual(list(parallel.scan(self.approaches, predicate, 2, 500)),
+                         [i for i, a in enumerate(self.approaches) if predicate(a)])
+
+    def test_early_stop_within_first_chunk(self):
+        with unittest.mock.patch('parallel.make_pool') as make_pool:
+            positions = list(itertools.islice(parallel.scan(self.approaches, is_named, 2, 1000),
+                                              5))
+        make_pool.assert_not_called()
+        self.assertEqual(positions, self.expected[:5])
+
+    def test_early_stop_cancels_chunks(self):
+        with unittest.mock.patch('parallel._free_threaded', return_value=True):
+            stream = parallel.scan(self.approaches, is_named, 1, 10)
+            positions = list(itertools.islice(stream, 20))
+            stream.close()
+        self.assertEqual(positions, self.expected[:20])
+
+
+class TestWorkerCount(unittest.TestCase):
+    def setUp(self):
+        patcher = unittest.mock.patch('parallel.usable_cpus', return_value=8)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enough_work_for_each_worker(self):
+        size = parallel.MIN_SCAN_SIZE
+        patcher = unittest.mock.patch('parallel._can_fork', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertEqual(parallel.worker_count(None, 100 * size), 1)
+        self.assertEqual(parallel.worker_count(1, 100 * size), 1)
+        self.assertEqual(parallel.worker_count(4, size - 1), 1)
+        self.assertEqual(parallel.worker_count(4, 3 * size), 3)
+        self.assertEqual(parallel.worker_count(4, 100 * size), 4)
+        self.assertEqual(parallel.worker_count(16, 100 * size), 8)
+
+    def test_no_fork_with_other_threads(self):
+        size = 100 * parallel.MIN_SCAN_SIZE
+        done = threading.Event()
+        thread = threading.Thread(target=done.wait)
+        thread.start()
+        try:
+            with unittest.mock.patch('parallel._free_threaded', return_value=False), \
+                    unittest.mock.patch('multiprocessing.get_all_start_methods',
+                                        return_value=['fork', 'spawn']):
+                self.assertEqual(parallel.worker_count(4, size), 1)
+                pool, _ = parallel.make_pool(2, [], is_named)
+                pool.shutdown()
+                self.assertIsInstance(pool, concurrent.futures.ThreadPoolExecutor)
+            with unittest.mock.patch('parallel._free_threaded', return_value=True):
+                self.assertEqual(parallel.worker_count(4, size), 4)
+        finally:
+            done.set()
+            thread.join()
+
+
+class TestParallelQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                             cache_entries=0)
+        # Split even this small data set among several workers.
+        scan = functools.partial(parallel.scan, chunk_size=400)
+        for patcher in (unittest.mock.patch('database.scan', scan),
+                        unittest.mock.patch('database.worker_count', lambda jobs, size: jobs or 1)):
+            patcher.start()
+            cls.addClassCleanup(patcher.stop)
+
+    def test_matches_serial_query(self):
+        for filters in (create_filters(hazardous=False, distance_min=0.1),
+                        [is_named], create_filters(velocity_max=5)):
+            with self.subTest(filters=filters):
+                self.assertEqual(list(self.db.query(filters, jobs=2)),
+                                 list(self.db.query(filters)))
+                self.assertEqual(list(self.db.query(filters, sort_by='velocity', jobs=2)),
+                                 list(self.db.query(filters, sort_by='velocity')))
+
+    def test_scans_in_parallel(self):
+        filters = create_filters(hazardous=False, distance_min=0.1)
+        with unittest.mock.patch('database.scan', wraps=parallel.scan) as scan:
+            list(self.db.query(filters, jobs=2))
+        self.assertEqual(scan.call_args.args[2], 2)
+
+    def test_limit(self):
+        self.assertEqual(list(limit(self.db.query([is_named], jobs=2), 1000)),
+                         list(limit(self.db.query([is_named]), 1000)))
+
+    def test_query_subcommand(self):
+        parser, _, _ = make_parser()
+        outputs = []
+        for jobs in ([], ['--jobs', '2'], ['--jobs', '0']):
+            stdout = io.StringIO()
+            args = parser.parse_args(['query', '--not-hazardous', '--min-distance', '0.1',
+                                      '--outfile', '-', '--format', 'csv'] + jobs)
+            with contextlib.redirect_stdout(stdout):
+                query(self.db, args)
+            outputs.append(stdout.getvalue())
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[2], outputs[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""Check that the query planner chooses sensible access paths.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_planner
+"""
+import datetime
+import pathlib
+import unittest
+
+from columns import np
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, Bounds, NEO_ATTRIBUTES
+from models import NearEarthObject, CloseApproach
+from planner import Histogram, SortedIndex
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def make_bounds(lower=None, upper=None):
+    bounds = Bounds()
+    if lower is not None:
+        bounds.restrict_lower(lower)
+    if upper is not None:
+        bounds.restrict_upper(upper)
+    return bounds
+
+
+class TestHistogram(unittest.TestCase):
+    def test_uniform_fraction(self):
+        histogram = Histogram(list(range(1000)))
+        self.assertAlmostEqual(histogram.fraction(make_bounds(250, 750)), 0.5, places=2)
+        self.assertEqual(histogram.fraction(make_bounds()), 1.0)
+        self.assertEqual(histogram.fraction(make_bounds(2000)), 0.0)
+
+    def test_unknown_values_never_match(self):
+        histogram = Histogram(list(range(100)), total=400)
+        self.assertAlmostEqual(histogram.fraction(make_bounds()), 0.25)
+
+    def test_datetime_fraction(self):
+        start = datetime.datetime(2020, 1, 1)
+        values = [start + datetime.timedelta(days=i) for i in range(100)]
+        fraction = Histogram(values).fraction(make_bounds(values[10], values[20]))
+        self.assertAlmostEqual(fraction, 0.1, delta=0.02)
+
+    def test_empty(self):
+        self.assertEqual(Histogram([]).fraction(make_bounds()), 0.0)
+
+
+class TestSortedIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def test_extend_matches_new_index(self):
+        bounds = (make_bounds(), make_bounds(0.1, 0.2), make_bounds(upper=0.01))
+        expected = SortedIndex(self.approaches, 'distance')
+        index = SortedIndex(self.approaches[:1000], 'distance')
+        for start in range(1000, len(self.approaches), 300):
+            index.extend(self.approaches[start:start + 300], start)
+            self.assertEqual(len(index), min(start + 300, len(self.approaches)))
+        self.assertTrue(index.pending_keys)
+        for b in bounds:
+            self.assertEqual(index.positions(b), expected.positions(b))
+        index.merge()
+        self.assertEqual(index.keys, expected.keys)
+        self.assertEqual(index.order, expected.order)
+        self.assertFalse(index.pending_keys)
+
+
+class TestPlanner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def test_no_criteria_scans(self):
+        plan = self.db.plan(create_filters())
+        self.assertEqual(plan.access, 'scan')
+
+    def test_narrow_date_uses_time_index(self):
+        plan = self.db.plan(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertEqual(plan.access, 'index')
+        self.assertEqual(plan.attribute, 'time')
+        self.assertLess(plan.estimated_candidates, len(self.approaches) / 10)
+
+    def test_narrow_distance_uses_distance_index(self):
+        plan = self.db.plan(create_filters(distance_max=0.001))
+        self.assertEqual(plan.access, 'index')
+        self.assertEqual(plan.attribute, 'distance')
+
+    def test_contradictory_criteria_are_empty(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1),
+                                 end_date=datetime.date(2020, 1, 1))
+        plan = self.db.plan(filters)
+        self.assertEqual(plan.access, 'empty')
+        self.assertEqual(list(self.db.query(filters)), [])
+
+    def test_explain_counts_actual_rows(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1),
+                                 end_date=datetime.date(2020, 3, 31),
+                                 hazardous=True)
+        plan = self.db.explain(filters)
+        self.assertEqual(plan.actual_rows, len(list(self.db.query(filters))))
+        self.assertGreaterEqual(plan.actual_candidates, plan.actual_rows)
+        self.assertIn('time index', str(plan))
+
+    def test_neo_criteria_prefilter_neos(self):
+        filters = create_filters(diameter_min=1, hazardous=True)
+        plan = self.db.explain(filters)
+        self.assertEqual(plan.access, 'neo')
+        expected = [approach for approach in self.approaches
+                    if approach.neo is not None and approach.neo.hazardous
+                    and approach.neo.diameter >= 1]
+        self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertEqual(plan.actual_rows, len(expected))
+
+    @unittest.skipIf(np is None, "NumPy is not installed.")
+    def test_broad_criteria_use_columnar_engine(self):
+        db = NEODatabase(self.neos, self.approaches, columnar=True)
+        filters = create_filters(velocity_min=10, hazardous=True)
+        plan = db.explain(filters)
+        self.assertEqual(plan.access, 'columnar')
+        self.assertEqual(plan.actual_rows, len(list(self.db.query(filters))))
+
+
+class TestOrphanedApproaches(unittest.TestCase):
+    def setUp(self):
+        self.neo = NearEarthObject('433', 'Eros', 16.84, False)
+        self.linked = CloseApproach('433', '2020-Jan-01 00:00', 0.1, 5.0)
+        self.orphan = CloseApproach('99999', '2020-Jan-02 00:00', 0.2, 6.0)
+        self.filters = [
+            create_filters(hazardous=False),
+            create_filters(hazardous=True),
+            create_filters(diameter_min=1),
+            create_filters(diameter_max=100, distance_max=1),
+        ]
+
+    def assertOrphanNeverMatches(self, db):
+        for filters in self.filters:
+            with self.subTest(filters=filters):
+                self.assertNotIn(self.orphan, list(db.query(filters)))
+        self.assertEqual(list(db.query(self.filters[0])), [self.linked])
+
+    def test_filters_on_orphans(self):
+        for filters in self.filters:
+            for f in filters:
+                if f.attribute in NEO_ATTRIBUTES:
+                    self.assertFalse(f(self.orphan))
+
+    def test_query_skips_orphans(self):
+        db = NEODatabase([self.neo], [self.linked, self.orphan])
+        self.assertOrphanNeverMatches(db)
+        self.assertEqual(list(db.query()), [self.linked, self.orphan])
+
+    @unittest.skipIf(np is None, "NumPy is not installed.")
+    def test_columnar_query_skips_orphans(self):
+        db = NEODatabase([self.neo], [self.linked, self.orphan], columnar=True)
+        self.assertOrphanNeverMatches(db)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,8 +14,10 @@ These tests should pass when Tasks 3a and 3b are complete.
 """
 import datetime
 import pathlib
+import random
 import unittest
 
+from columns import np
 from database import NEODatabase
 from extract import load_neos, load_approaches
 from filters import create_filters
@@ -529,5 +531,68 @@ class TestQuery(unittest.TestCase):
         self.assertEqual(expected, received, msg="Computed results do not match expected results.")
 
 
+@unittest.skipIf(np is None, "The columnar engine requires NumPy.")
+class TestQueryColumnar(TestQuery):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches, columnar=True)
+
+    def test_columnar_query_preserves_internal_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1),
+                                 distance_max=0.1, hazardous=False)
+        expected = [approach for approach in self.approaches
+                    if all(f(approach) for f in filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(expected, list(self.db.query(filters)))
+
+
+class TestQueryDateIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        # Shuffle the internal order so that it disagrees with the time index.
+        random.Random(2020).shuffle(cls.approaches)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def test_date_range_query_preserves_internal_order(self):
+        start_date = datetime.date(2020, 3, 1)
+        end_date = datetime.date(2020, 3, 31)
+
+        expected = [
+            approach for approach in self.approaches
+            if start_date <= approach.time.date() <= end_date
+        ]
+        self.assertGreater(len(expected), 0)
+
+        filters = create_filters(start_date=start_date, end_date=end_date)
+        received = list(self.db.query(filters))
+        self.assertEqual(expected, received)
+
+    def test_date_query_with_other_filters(self):
+        date = datetime.date(2020, 3, 2)
+        distance_max = 0.4
+
+        expected = [
+            approach for approach in self.approaches
+            if approach.time.date() == date
+            and approach.distance <= distance_max
+        ]
+        self.assertGreater(len(expected), 0)
+
+        filters = create_filters(date=date, distance_max=distance_max)
+        received = list(self.db.query(filters))
+        self.assertEqual(expected, received)
+
+    def test_date_query_outside_of_data_set(self):
+        filters = create_filters(date=datetime.date(1900, 1, 1))
+        self.assertEqual(list(self.db.query(filters)), [])
+
+        filters = create_filters(start_date=datetime.date.max)
+        self.assertEqual(list(self.db.query(filters)), [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,258 @@
+"""Check that a server answers `inspect` and `query` commands like the CLI, and
+picks up changes to the data files.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_server
+"""
+import concurrent.futures
+import contextlib
+import functools
+import io
+import json
+import pathlib
+import socket
+import tempfile
+import threading
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from main import make_parser, run_command, query
+from server import parse_address, make_server, request, FRAME_HEADER
+from watch import HotReloader, SharedDatabase
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestParseAddress(unittest.TestCase):
+    def test_parse_address(self):
+        self.assertEqual(parse_address('/tmp/neo.sock'), (socket.AF_UNIX, '/tmp/neo.sock'))
+        self.assertEqual(parse_address('localhost:8765'), (socket.AF_INET, ('localhost', 8765)))
+        self.assertEqual(parse_address(':8765'), (socket.AF_INET, ('localhost', 8765)))
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _, _ = make_parser()
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.address = str(pathlib.Path(cls.tmp.name) / 'neo.sock')
+        cls.server = make_server(functools.partial(run_command, SharedDatabase(cls.db), cls.parser),
+                                 cls.address, workers=4)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join()
+        cls.server.server_close()
+        cls.tmp.cleanup()
+
+    def request(self, *argv):
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+        status = request(self.address, argv, cwd=self.tmp.name, stdout=stdout, stderr=stderr)
+        return status, stdout.getvalue().decode('utf-8'), stderr.getvalue().decode('utf-8')
+
+    def run_locally(self, *argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            query(self.db, self.parser.parse_args(argv))
+        return stdout.getvalue()
+
+    def test_query_matches_local_output(self):
+        argv = ('query', '--start-date', '2020-03-01', '--end-date', '2020-03-31',
+                '--min-distance', '0.4', '--limit', '4')
+        self.assertEqual(self.request(*argv), (0, self.run_locally(*argv), ''))
+
+    def test_query_to_standard_output(self):
+        argv = ('query', '--outfile', '-', '--format', 'csv')
+        status, stdout, _ = self.request(*argv)
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout, self.run_locally(*argv))
+        self.assertGreater(len(stdout), 1 << 16)
+
+    def test_outfile_is_resolved_against_client_directory(self):
+        status, _, _ = self.request('query', '--limit', '3', '--outfile', 'out/results.json')
+        self.assertEqual(status, 0)
+        self.assertTrue((pathlib.Path(self.tmp.name) / 'out' / 'results.json').exists())
+
+    def test_aggregate(self):
+        status, stdout, _ = self.request('aggregate', '--group-by', 'month', '--format', 'csv')
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout.splitlines()[0], 'month,count')
+        self.assertEqual(len(stdout.splitlines()), 13)
+
+    def test_inspect_missing_neo(self):
+        status, stdout, stderr = self.request('inspect', '--pdes', 'not a designation')
+        self.assertEqual((status, stdout), (1, ''))
+        self.assertIn("No matching NEOs", stderr)
+
+    def test_invalid_arguments(self):
+        status, _, stderr = self.request('query', '--date', 'yesterday')
+        self.assertEqual(status, 2)
+        self.assertIn("is not a valid date", stderr)
+
+    def test_only_inspect_and_query(self):
+        status, _, stderr = self.request('interactive')
+        self.assertEqual(status, 2)
+
+    def test_concurrent_clients(self):
+        argvs = [('query', '--date', f'2020-01-{day:02d}', '--limit', '0') for day in range(1, 21)]
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(lambda argv: self.request(*argv), argvs))
+        for argv, response in zip(argvs, responses):
+            self.assertEqual(response, (0, self.run_locally(*argv), ''))
+
+    def test_malformed_request(self):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.address)
+            sock.sendall(b'not json\n')
+            frames = sock.makefile('rb').read()
+        channel, length = FRAME_HEADER.unpack_from(frames)
+        self.assertEqual(channel, b'e')
+        self.assertTrue(frames.endswith(b'x\x00\x00\x00\x012'))
+
+
+class TestServerAddresses(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _, _ = make_parser()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = pathlib.Path(tmp.name)
+
+    def start(self, address):
+        server = make_server(functools.partial(run_command, SharedDatabase(self.db), self.parser),
+                             address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+        self.addCleanup(stop)
+        return server
+
+    def test_other_files_are_not_replaced(self):
+        path = self.tmp / 'neos.csv'
+        path.write_text('id,pdes\n')
+        with self.assertRaises(FileExistsError):
+            self.start(str(path))
+        self.assertEqual(path.read_text(), 'id,pdes\n')
+
+    def test_running_server_is_not_replaced(self):
+        address = str(self.tmp / 'neo.sock')
+        self.start(address)
+        with self.assertRaises(OSError):
+            self.start(address)
+        self.assertEqual(request(address, ['inspect', '--pdes', '1685'], stdout=io.BytesIO()), 0)
+
+    def test_stale_socket_is_replaced(self):
+        address = str(self.tmp / 'neo.sock')
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.bind(address)
+        self.start(address)
+        self.assertEqual(request(address, ['inspect', '--pdes', '1685'], stdout=io.BytesIO()), 0)
+
+    def test_tcp_only_on_loopback(self):
+        with self.assertRaises(ValueError):
+            make_server(None, '0.0.0.0:0')
+
+    def test_tcp_clients_only_get_standard_output(self):
+        server = self.start('127.0.0.1:0')
+        address = '{}:{}'.format(*server.server_address)
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+        status = request(address, ['query', '--limit', '3', '--outfile', 'results.csv'],
+                         cwd=str(self.tmp), stdout=stdout, stderr=stderr)
+        self.assertEqual(status, 2)
+        self.assertIn(b"standard output", stderr.getvalue())
+        self.assertEqual(list(self.tmp.iterdir()), [])
+
+        stdout = io.BytesIO()
+        status = request(address, ['query', '--limit', '3', '--outfile', '-', '--format', 'csv'],
+                         stdout=stdout)
+        self.assertEqual(status, 0)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 4)
+
+
+class TestServerReload(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cadfile = pathlib.Path(tmp.name) / 'cad.json'
+        self.cadfile.write_bytes(TEST_CAD_FILE.read_bytes())
+        self.address = str(pathlib.Path(tmp.name) / 'neo.sock')
+
+        self.db = NEODatabase(*self.load())
+        reloader = HotReloader(self.db, (TEST_NEO_FILE, self.cadfile), self.load, NEODatabase,
+                               in_place=False)
+        self.shared = SharedDatabase(self.db, reloader)
+        parser, _, _ = make_parser()
+        server = make_server(functools.partial(run_command, self.shared, parser), self.address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+        self.addCleanup(stop)
+
+    def load(self):
+        return load_neos(TEST_NEO_FILE), load_approaches(self.cadfile)
+
+    def request(self, *argv):
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+        status = request(self.address, argv, stdout=stdout, stderr=stderr)
+        return status, stdout.getvalue().decode('utf-8'), stderr.getvalue().decode('utf-8')
+
+    def append_approach(self, designation, time):
+        cad = json.loads(self.cadfile.read_text())
+        row = list(cad['data'][0])
+        row[0], row[3] = designation, time
+        cad['data'].append(row)
+        cad['count'] += 1
+        self.cadfile.write_text(json.dumps(cad))
+
+    def test_served_query_picks_up_appended_approach(self):
+        argv = ('query', '--date', '2021-01-01')
+        self.assertEqual(self.request(*argv), (0, '', ''))
+
+        self.append_approach('1685', '2021-Jan-01 12:00')
+        status, stdout, stderr = self.request(*argv)
+        self.assertEqual((status, stderr), (0, ''))
+        self.assertEqual(stdout.splitlines(),
+                         ["Object '1685 (Toro)' had a close approach at 2021-01-01 12:00, "
+                          "approaching Earth at a distance of 0.02 au and a velocity of "
+                          "5.62 km/s."])
+
+        # The old database, which commands might still have been reading, is
+        # left as it was.
+        self.assertIsNot(self.shared.database, self.db)
+        self.assertEqual(len(list(self.db.query())), len(load_approaches(TEST_CAD_FILE)))
+        self.assertEqual(len(list(self.shared.database.query())), len(self.db._approaches) + 1)
+
+    def test_unreadable_data_files_keep_the_current_database(self):
+        self.cadfile.write_text('{"data": [')
+        status, stdout, stderr = self.request('query', '--limit', '2')
+        self.assertEqual(status, 0)
+        self.assertEqual(len(stdout.splitlines()), 2)
+        self.assertIn("Unable to reload the data files", stderr)
+        self.assertIs(self.shared.database, self.db)
+
+
+if __name__ == '__main__':
+    unittest.main()
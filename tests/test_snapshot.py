@@ -0,0 +1,199 @@
+"""Check that snapshots of the data files round-trip and go stale correctly.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import datetime
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from models import CloseApproach
+from snapshot import (file_digest, load_cached, load_database, read_snapshot, snapshot_path,
+                      LazyApproaches, StaleSnapshotError)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def describe_neo(neo):
+    return (neo.designation, neo.name, repr(neo.diameter), neo.hazardous)
+
+
+def describe_approach(approach):
+    return (approach._designation, approach.time, approach.distance, approach.velocity)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.neofile = self.tmp / 'neos.csv'
+        self.cadfile = self.tmp / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, self.neofile)
+        shutil.copy(TEST_CAD_FILE, self.cadfile)
+        self.cache = self.tmp / 'cache'
+        self.path = snapshot_path(self.cache, self.neofile, self.cadfile)
+
+    def test_snapshot_round_trips_the_extracted_data(self):
+        neos, approaches = load_cached(self.neofile, self.cadfile, self.cache)
+        self.assertTrue(self.path.exists())
+
+        cached_neos, cached_approaches = read_snapshot(self.path, self.neofile, self.cadfile)
+        self.assertEqual([describe_neo(neo) for neo in load_neos(self.neofile)],
+                         [describe_neo(neo) for neo in cached_neos])
+        self.assertEqual([describe_approach(a) for a in load_approaches(self.cadfile)],
+                         [describe_approach(a) for a in cached_approaches])
+        for approach in cached_approaches:
+            self.assertIsNone(approach.neo)
+        for neo in cached_neos:
+            self.assertEqual(neo.approaches, [])
+
+    def test_snapshot_goes_stale_when_a_data_file_changes(self):
+        load_cached(self.neofile, self.cadfile, self.cache)
+        with open(self.neofile, 'a') as file:
+            file.write('\n')
+
+        with self.assertRaises(StaleSnapshotError):
+            read_snapshot(self.path, self.neofile, self.cadfile)
+
+        # Loading again rebuilds the snapshot.
+        load_cached(self.neofile, self.cadfile, self.cache)
+        read_snapshot(self.path, self.neofile, self.cadfile)
+
+    def test_snapshot_survives_a_touched_but_unchanged_data_file(self):
+        load_cached(self.neofile, self.cadfile, self.cache)
+        stat = self.cadfile.stat()
+        os.utime(self.cadfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        neos, approaches = read_snapshot(self.path, self.neofile, self.cadfile)
+        self.assertGreater(len(approaches), 0)
+
+    def test_touched_data_file_is_hashed_only_once(self):
+        load_cached(self.neofile, self.cadfile, self.cache)
+        stat = self.cadfile.stat()
+        os.utime(self.cadfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        with unittest.mock.patch('snapshot.file_digest', wraps=file_digest) as digest:
+            read_snapshot(self.path, self.neofile, self.cadfile)
+            self.assertEqual(digest.call_count, 1)
+            neos, approaches = read_snapshot(self.path, self.neofile, self.cadfile)
+            self.assertEqual(digest.call_count, 1)
+        self.assertEqual([describe_approach(a) for a in approaches],
+                         [describe_approach(a) for a in load_approaches(self.cadfile)])
+
+        # A change of contents is still noticed.
+        with open(self.cadfile, 'r+') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(file.tell() - 2)
+            file.write(' ')
+        with self.assertRaises(StaleSnapshotError):
+            read_snapshot(self.path, self.neofile, self.cadfile)
+
+    def test_corrupt_snapshot_is_rebuilt(self):
+        self.cache.mkdir()
+        self.path.write_bytes(b'not a snapshot')
+
+        neos, approaches = load_cached(self.neofile, self.cadfile, self.cache)
+        self.assertGreater(len(approaches), 0)
+        read_snapshot(self.path, self.neofile, self.cadfile)
+
+
+class TestPrebuiltDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.cache = pathlib.Path(cls.tmp.name)
+        cls.parsed = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        load_database(TEST_NEO_FILE, TEST_CAD_FILE, cls.cache)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.db = load_database(TEST_NEO_FILE, TEST_CAD_FILE, self.cache)
+
+    def built(self):
+        return sum(approach is not None for approach in self.db._approaches._items)
+
+    def test_structures_match_a_parsed_database(self):
+        self.assertIsInstance(self.db._approaches, LazyApproaches)
+        self.assertEqual(self.built(), 0)
+        for attribute, index in self.parsed._indexes.items():
+            self.assertEqual(self.db._indexes[attribute].order, index.order)
+            self.assertEqual(list(self.db._indexes[attribute].keys), index.keys)
+        for column, histogram in self.parsed._histograms.items():
+            if column == 'hazardous':
+                self.assertEqual(self.db._histograms[column], histogram)
+            else:
+                self.assertEqual(vars(self.db._histograms[column]), vars(histogram))
+        self.assertEqual(self.db._orphans, self.parsed._orphans)
+        self.assertEqual({designation: positions for designation, (_, positions)
+                          in self.db._neo_positions.items()},
+                         {designation: positions for designation, (_, positions)
+                          in self.parsed._neo_positions.items()})
+
+    def test_queries_match_a_parsed_database(self):
+        criteria = ({}, {'date': datetime.date(2020, 1, 1)}, {'distance_max': 0.05},
+                    {'velocity_min': 20, 'hazardous': True}, {'diameter_min': 1})
+        for kwargs in criteria:
+            filters = create_filters(**kwargs)
+            with self.subTest(**kwargs):
+                self.assertEqual(self.db.plan(filters).access, self.parsed.plan(filters).access)
+                self.assertEqual([str(a) for a in self.db.query(filters)],
+                                 [str(a) for a in self.parsed.query(filters)])
+                for sort_by in ('time', 'velocity', 'diameter'):
+                    self.assertEqual(
+                        [str(a) for a in self.db.query(filters, sort_by=sort_by, top=5)],
+                        [str(a) for a in self.parsed.query(filters, sort_by=sort_by, top=5)])
+
+    def test_query_builds_only_the_close_approaches_it_examines(self):
+        filters = create_filters(date=datetime.date(2020, 1, 1))
+        matches = list(self.db.query(filters))
+        self.assertEqual(self.db.plan(filters).access, 'index')
+        self.assertEqual(self.built(), len(matches))
+        for approach in matches:
+            self.assertIs(approach, self.db._approaches[self.db._approaches._items.index(approach)])
+            self.assertIn(approach.neo, self.db._neos)
+            self.assertIs(approach._designation, approach.neo.designation)
+
+    def test_neo_approaches_are_filled_when_fetched(self):
+        parsed = self.parsed.get_neo_by_name('Eros') or next(
+            neo for neo in self.parsed._neos if neo.name and neo.approaches)
+        neo = self.db._designation_dict[parsed.designation]
+        self.assertEqual(neo.approaches, [])
+        self.assertIs(self.db.get_neo_by_name(parsed.name), neo)
+        self.assertEqual([str(a) for a in neo.approaches], [str(a) for a in parsed.approaches])
+        self.assertIs(self.db.get_neo_by_designation(parsed.designation), neo)
+        self.assertEqual(len(neo.approaches), len(parsed.approaches))
+
+    def test_added_approaches_are_linked(self):
+        neo = next(neo for neo in self.parsed._neos if neo.approaches)
+        added = CloseApproach(neo.designation, '2021-Jan-01 00:00', 0.01, 5)
+        self.db.add_approaches([added])
+        self.assertIs(self.db._approaches[-1], added)
+        self.assertEqual(len(self.db.get_neo_by_designation(neo.designation).approaches),
+                         len(neo.approaches) + 1)
+        self.assertIn(added, self.db.query(create_filters(date=datetime.date(2021, 1, 1))))
+        self.assertEqual(len(list(self.db.query())), len(self.parsed._approaches) + 1)
+
+    def test_stale_snapshot_builds_a_parsed_database(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = load_database(TEST_NEO_FILE, TEST_CAD_FILE, tmp)
+            self.assertIsInstance(db._approaches, list)
+            self.assertIsInstance(load_database(TEST_NEO_FILE, TEST_CAD_FILE, tmp)._approaches,
+                                  LazyApproaches)
+
+
+if __name__ == '__main__':
+    unittest.main()
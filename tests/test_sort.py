@@ -0,0 +1,117 @@
+"""Check that queries can return their matches sorted, or just the top few.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sort
+"""
+import contextlib
+import datetime
+import io
+import math
+import pathlib
+import unittest
+import unittest.mock
+
+from database import NEODatabase, SORT_ATTRIBUTES
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import make_parser, query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+CRITERIA = (
+    {},
+    {'hazardous': True},
+    {'start_date': datetime.date(2020, 3, 1), 'end_date': datetime.date(2020, 3, 31)},
+    {'distance_max': 0.1, 'velocity_min': 10},
+    {'diameter_min': 0.2, 'hazardous': False},
+)
+
+
+def sort_key(attribute, descending):
+    def key(approach):
+        if attribute != 'diameter':
+            return getattr(approach, attribute)
+        diameter = approach.neo.diameter if approach.neo else math.nan
+        if math.isnan(diameter):
+            return -math.inf if descending else math.inf
+        return diameter
+    return key
+
+
+class TestSortedQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(neos[:-100], approaches[:-500])
+        cls.db.add_approaches(approaches[-500:])
+
+    def assertSortedMatches(self):
+        for criteria in CRITERIA:
+            filters = create_filters(**criteria)
+            matches = list(self.db.query(filters))
+            for attribute in SORT_ATTRIBUTES:
+                for descending in (False, True):
+                    expected = sorted(matches, key=sort_key(attribute, descending),
+                                      reverse=descending)
+                    for top in (None, 1, 10, 10000):
+                        with self.subTest(criteria=criteria, sort_by=attribute,
+                                          descending=descending, top=top):
+                            results = self.db.query(filters, sort_by=attribute,
+                                                    descending=descending, top=top)
+                            self.assertEqual(list(results), expected[:top])
+
+    def test_sorted_matches(self):
+        self.assertSortedMatches()
+
+    def test_sorted_matches_by_walking_indexes(self):
+        with unittest.mock.patch('database.prefer_index_walk', return_value=True):
+            self.assertSortedMatches()
+
+    def test_unknown_diameters_come_last(self):
+        for descending in (False, True):
+            results = list(self.db.query(sort_by='diameter', descending=descending))
+            known = [not math.isnan(a.neo.diameter) if a.neo else False for a in results]
+            self.assertEqual(known, sorted(known, reverse=True))
+
+    def test_top_requires_sort_by(self):
+        with self.assertRaises(ValueError):
+            self.db.query(top=5)
+        with self.assertRaises(ValueError):
+            self.db.query(sort_by='name')
+
+    def test_query_subcommand(self):
+        parser, _, _ = make_parser()
+        stdout = io.StringIO()
+        args = parser.parse_args(['query', '--sort-by', 'velocity', '--desc', '--top', '3'])
+        with contextlib.redirect_stdout(stdout):
+            query(self.db, args)
+        expected = list(self.db.query(sort_by='velocity', descending=True, top=3))
+        self.assertEqual(stdout.getvalue().splitlines(), [str(a) for a in expected])
+
+    def test_top_and_limit_are_exclusive(self):
+        parser, _, _ = make_parser()
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parser.parse_args(['query', '--sort-by', 'velocity', '--top', '3',
+                                   '--limit', '5'])
+
+    def test_top_must_be_positive(self):
+        parser, _, _ = make_parser()
+        for top in ('0', '-3', 'three'):
+            with self.subTest(top=top):
+                stderr = io.StringIO()
+                with contextlib.redirect_stderr(stderr):
+                    with self.assertRaises(SystemExit):
+                        parser.parse_args(['query', '--sort-by', 'velocity', '--top', top])
+                self.assertIn("argument --top", stderr.getvalue())
+        args = parser.parse_args(['query', '--sort-by', 'velocity', '--top', '1'])
+        self.assertEqual(args.top, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
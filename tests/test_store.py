@@ -0,0 +1,135 @@
+"""Check that a memory-mapped column store answers queries like a database.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_store
+"""
+import contextlib
+import datetime
+import io
+import os
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from columns import np
+from database import NEODatabase, SORT_ATTRIBUTES
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import make_parser, query
+from store import ColumnStore, open_store, store_path, write_store
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+CRITERIA = (
+    {},
+    {'hazardous': True},
+    {'start_date': datetime.date(2020, 3, 1), 'end_date': datetime.date(2020, 3, 31)},
+    {'distance_max': 0.1, 'velocity_min': 10},
+    {'diameter_min': 0.2, 'hazardous': False},
+    {'date': datetime.date(2020, 1, 1), 'start_date': datetime.date(2020, 2, 1)},
+)
+
+
+def describe(approaches):
+    return [(a._designation, a.time, a.distance, a.velocity,
+             a.neo and (a.neo.designation, a.neo.name, repr(a.neo.diameter), a.neo.hazardous))
+            for a in approaches]
+
+
+@unittest.skipIf(np is None, "NumPy is not installed.")
+class TestColumnStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.cache_dir = pathlib.Path(cls.tmp.name)
+        # Leave some close approaches without a known NEO.
+        neos = load_neos(TEST_NEO_FILE)[:-100]
+        cls.store = open_store(TEST_NEO_FILE, TEST_CAD_FILE, cls.cache_dir)
+        path = cls.cache_dir / 'orphans.cols'
+        write_store(path, {}, neos, load_approaches(TEST_CAD_FILE))
+        cls.orphans = ColumnStore(path)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.orphans_db = NEODatabase(neos, load_approaches(TEST_CAD_FILE))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_query(self):
+        for criteria in CRITERIA:
+            filters = create_filters(**criteria)
+            with self.subTest(criteria=criteria):
+                self.assertEqual(describe(self.store.query(filters)),
+                                 describe(self.db.query(filters)))
+                self.assertEqual(describe(self.orphans.query(filters)),
+                                 describe(self.orphans_db.query(filters)))
+
+    def test_sorted_query(self):
+        for criteria in CRITERIA:
+            filters = create_filters(**criteria)
+            for attribute in SORT_ATTRIBUTES:
+                for descending in (False, True):
+                    for top in (None, 5):
+                        with self.subTest(criteria=criteria, sort_by=attribute,
+                                          descending=descending, top=top):
+                            self.assertEqual(
+                                describe(self.orphans.query(filters, attribute, descending, top)),
+                                describe(self.orphans_db.query(filters, attribute, descending,
+                                                               top)))
+
+    def test_residual_filters(self):
+        filters = [lambda approach: approach.neo is not None and approach.neo.name == 'Toro']
+        self.assertEqual(describe(self.store.query(filters)), describe(self.db.query(filters)))
+        self.assertIn("residual", self.store.explain(filters))
+
+    def test_aggregate(self):
+        filters = create_filters(hazardous=True)
+        for group_by in (None, 'year', 'month', 'neo'):
+            with self.subTest(group_by=group_by):
+                metrics = ('count', 'mean:velocity', 'max:diameter')
+                self.assertEqual(self.orphans.aggregate(filters, group_by, metrics),
+                                 self.orphans_db.aggregate(filters, group_by, metrics))
+
+    def test_columns_are_mapped(self):
+        for column in (self.store.columns.time, self.store.columns.hazardous):
+            self.assertFalse(column.flags.owndata)
+            self.assertFalse(column.flags.writeable)
+        with self.assertRaises(TypeError):
+            self.store.columns.append([])
+
+    def test_store_is_reused_until_stale(self):
+        with unittest.mock.patch('store.load_cached') as load_cached:
+            open_store(TEST_NEO_FILE, TEST_CAD_FILE, self.cache_dir)
+        load_cached.assert_not_called()
+
+        cad = self.cache_dir / 'cad.json'
+        cad.write_text(TEST_CAD_FILE.read_text())
+        self.assertEqual(len(open_store(TEST_NEO_FILE, cad, self.cache_dir)), len(self.store))
+        cad.write_text('{"fields": ["des", "cd", "dist", "v_rel"], "data": []}')
+        info = os.stat(cad)
+        os.utime(cad, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(len(open_store(TEST_NEO_FILE, cad, self.cache_dir)), 0)
+        self.assertTrue(store_path(self.cache_dir, TEST_NEO_FILE, cad).exists())
+
+    def test_query_subcommand(self):
+        parser, _, _ = make_parser()
+        for argv in (['query', '--hazardous', '--limit', '5'],
+                     ['query', '--sort-by', 'distance', '--top', '3']):
+            with self.subTest(argv=argv):
+                args = parser.parse_args(argv)
+                outputs = []
+                for database in (self.store, self.db):
+                    stdout = io.StringIO()
+                    with contextlib.redirect_stdout(stdout):
+                        query(database, args)
+                    outputs.append(stdout.getvalue())
+                self.assertEqual(*outputs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""Check that a database can be brought up to date with changed data files.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_watch
+"""
+import datetime
+import os
+import pathlib
+import tempfile
+import unittest
+
+from columns import np
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from watch import DataFileWatcher, HotReloader
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+QUERIES = (
+    {},
+    {'start_date': '2020-12-01'},
+    {'distance_max': 0.05},
+    {'velocity_min': 20, 'distance_min': 0.2},
+    {'hazardous': True},
+    {'diameter_min': 0.5, 'start_date': '2020-06-01'},
+    {'hazardous': False, 'diameter_max': 0.1},
+)
+
+
+def load():
+    """Load fresh, unlinked copies of the test data, with one NEO changed."""
+    neos = load_neos(TEST_NEO_FILE)
+    toro = next(neo for neo in neos if neo.designation == '1685')
+    toro.name = 'Toro II'
+    toro.hazardous = True
+    toro.diameter = 20.0
+    return neos, load_approaches(TEST_CAD_FILE)
+
+
+def make_filters(criteria):
+    if 'start_date' in criteria:
+        criteria = dict(criteria, start_date=datetime.date.fromisoformat(criteria['start_date']))
+    return create_filters(**criteria)
+
+
+class TestUpdate(unittest.TestCase):
+    columnar = False
+
+    def setUp(self):
+        if self.columnar and np is None:
+            self.skipTest("NumPy is not installed.")
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        self.db = NEODatabase(neos[:-300], approaches[:3000], columnar=self.columnar)
+        self.expected = NEODatabase(*load(), columnar=self.columnar)
+
+    def assertQueriesMatch(self):
+        for criteria in QUERIES:
+            with self.subTest(criteria=criteria):
+                filters = make_filters(criteria)
+                self.assertEqual(
+                    [(a._designation, a.time) for a in self.db.query(filters)],
+                    [(a._designation, a.time) for a in self.expected.query(filters)])
+
+    def test_update_applies_changes(self):
+        for criteria in QUERIES:
+            list(self.db.query(make_filters(criteria)))
+        self.assertTrue(self.db.update(*load()))
+        self.assertQueriesMatch()
+
+        toro = self.db.get_neo_by_designation('1685')
+        self.assertTrue(toro.hazardous)
+        self.assertIs(self.db.get_neo_by_name('Toro II'), toro)
+        self.assertIsNone(self.db.get_neo_by_name('Toro'))
+        self.assertEqual(len(toro.approaches),
+                         len(self.expected.get_neo_by_designation('1685').approaches))
+
+    def test_new_neos_are_linked(self):
+        self.assertTrue(self.db.update(*load()))
+        for neo in self.expected._neos[-300:]:
+            with self.subTest(designation=neo.designation):
+                added = self.db.get_neo_by_designation(neo.designation)
+                self.assertIsNotNone(added)
+                self.assertEqual(len(added.approaches), len(neo.approaches))
+                for approach in added.approaches:
+                    self.assertIs(approach.neo, added)
+                if neo.name:
+                    self.assertIs(self.db.get_neo_by_name(neo.name), added)
+
+    def test_unchanged_files(self):
+        self.db = NEODatabase(*load(), columnar=self.columnar)
+        self.assertTrue(self.db.update(*load()))
+        self.assertQueriesMatch()
+
+    def test_removed_approaches_need_rebuild(self):
+        neos, approaches = load()
+        self.assertFalse(self.db.update(neos, approaches[:2000]))
+        self.assertFalse(self.db.update(neos, approaches[1:]))
+        self.assertEqual(len(list(self.db.query())), 3000)
+
+    def test_removed_neos_need_rebuild(self):
+        neos, approaches = load()
+        self.assertFalse(self.expected.update(neos[1:], approaches))
+
+
+class TestUpdateColumnar(TestUpdate):
+    columnar = True
+
+
+class TestDataFileWatcher(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = pathlib.Path(tmp.name) / 'cad.json'
+        self.path.write_text('[]')
+
+    def touch(self):
+        info = os.stat(self.path)
+        os.utime(self.path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+
+    def test_changed(self):
+        watcher = DataFileWatcher([self.path])
+        self.assertFalse(watcher.changed())
+        self.touch()
+        self.assertTrue(watcher.changed())
+
+    def test_missing_file(self):
+        watcher = DataFileWatcher([self.path])
+        self.path.unlink()
+        self.assertTrue(watcher.changed())
+
+    def test_reloader(self):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(neos, approaches[:100])
+        results = [load(), (load()[0], []), OSError("still being written")]
+
+        def reload():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        reloader = HotReloader(db, [self.path], reload, NEODatabase)
+        self.assertIsNone(reloader.reload())
+
+        self.touch()
+        self.assertEqual(reloader.reload(), 'updated')
+        self.assertIs(reloader.database, db)
+        self.assertIsNone(reloader.reload())
+
+        self.touch()
+        self.assertEqual(reloader.reload(), 'rebuilt')
+        self.assertIsNot(reloader.database, db)
+        self.assertEqual(list(reloader.database.query()), [])
+
+        self.touch()
+        with self.assertRaises(OSError):
+            reloader.reload()
+        self.assertTrue(reloader.watcher.changed())
+
+
+if __name__ == '__main__':
+    unittest.main()
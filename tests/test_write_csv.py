@@ -0,0 +1,68 @@
+"""Check that `write_to_csv` writes exactly what `csv.DictWriter` would.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_write_csv
+"""
+import csv
+import io
+import pathlib
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from models import NearEarthObject, CloseApproach
+from write import write_to_csv
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+FIELDNAMES = (
+    'datetime_utc', 'distance_au', 'velocity_km_s',
+    'designation', 'name', 'diameter_km', 'potentially_hazardous'
+)
+
+
+class UncloseableStringIO(io.StringIO):
+    def close(self):
+        pass
+
+
+class TestWriteToCSVBatched(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(neos, approaches)
+
+        quoted = NearEarthObject('X', 'Comma, "Quote"', 0.0, True)
+        unusual = CloseApproach('X', '2020-Jan-01 00:00', 0.5, 1.5)
+        unusual.neo = quoted
+        quoted.approaches.append(unusual)
+        orphan = CloseApproach('99999', '2020-Jan-02 03:04', 0.2, 6.0)
+        cls.results = approaches + [unusual, orphan]
+
+    def test_matches_dict_writer(self):
+        expected = io.StringIO(newline='')
+        writer = csv.DictWriter(expected, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for approach in self.results:
+            writer.writerow(approach.serialize(to_csv=True))
+
+        buf = UncloseableStringIO(newline='')
+        with unittest.mock.patch('write.open', return_value=buf):
+            write_to_csv(self.results, None)
+        self.assertEqual(buf.getvalue(), expected.getvalue())
+
+    def test_no_results(self):
+        buf = UncloseableStringIO(newline='')
+        with unittest.mock.patch('write.open', return_value=buf):
+            write_to_csv([], None)
+        self.assertEqual(buf.getvalue(), ','.join(FIELDNAMES) + '\r\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Check that results can be written as NDJSON, Arrow and Parquet, and that every
+format describes a close approach without an NEO alike.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_write_formats
+"""
+import csv
+import io
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from models import CloseApproach
+from write import (pa, write_to_csv, write_to_json, write_to_ndjson, write_to_arrow,
+                   write_to_parquet, _arrow_schema, _record_batches)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class UncloseableStringIO(io.StringIO):
+    def close(self):
+        pass
+
+
+class UncloseableBytesIO(io.BytesIO):
+    def close(self):
+        pass
+
+
+class TestWriteFormats(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(neos, approaches)
+        orphan = CloseApproach('99999', '2020-Jan-02 03:04', 0.2, 6.0)
+        cls.results = approaches[:200] + [orphan]
+
+    def write(self, writer, buf):
+        with unittest.mock.patch('write.open', return_value=buf):
+            writer(self.results, None)
+        return buf.getvalue()
+
+    def test_ndjson(self):
+        value = self.write(write_to_ndjson, UncloseableStringIO())
+        lines = value.split('\n')
+        self.assertEqual(lines.pop(), '')
+        self.assertEqual(lines, [json.dumps(approach.serialize(), separators=(',', ':'))
+                                 for approach in self.results])
+
+    def assertTableMatches(self, table):
+        self.assertEqual(table.num_rows, len(self.results))
+        rows = table.to_pylist()
+        for approach, row in zip(self.results, rows):
+            self.assertEqual(row['datetime_utc'], approach.time)
+            self.assertEqual(row['distance_au'], approach.distance)
+            self.assertEqual(row['velocity_km_s'], approach.velocity)
+        self.assertEqual(rows[0]['designation'], self.results[0].neo.designation)
+        orphan = rows[-1]
+        self.assertEqual(orphan['designation'], '')
+        self.assertIsNone(orphan['name'])
+        self.assertTrue(math.isnan(orphan['diameter_km']))
+        self.assertFalse(orphan['potentially_hazardous'])
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed.")
+    def test_arrow(self):
+        value = self.write(write_to_arrow, UncloseableBytesIO())
+        self.assertTableMatches(pa.ipc.open_file(pa.BufferReader(value)).read_all())
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed.")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+        value = self.write(write_to_parquet, UncloseableBytesIO())
+        self.assertTableMatches(pq.read_table(pa.BufferReader(value)))
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed.")
+    def test_batches(self):
+        batches = list(_record_batches(self.results, _arrow_schema(), size=64))
+        self.assertEqual([batch.num_rows for batch in batches], [64, 64, 64, 9])
+
+    @unittest.skipIf(pa is not None, "pyarrow is installed.")
+    def test_arrow_requires_pyarrow(self):
+        with self.assertRaises(ImportError):
+            write_to_arrow(self.results, None)
+
+
+class TestOrphanedApproach(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = pathlib.Path(tmp.name)
+        self.orphan = CloseApproach('99999', '2020-Jan-02 03:04', 0.2, 6.0)
+
+    def write(self, writer, name):
+        path = self.tmp / name
+        writer([self.orphan], path)
+        return path
+
+    def test_text_formats(self):
+        with open(self.write(write_to_csv, 'results.csv'), newline='') as f:
+            row, = csv.DictReader(f)
+        self.assertEqual((row['designation'], row['name']), ('', ''))
+        neo, = (approach['neo'] for approach in
+                json.loads(self.write(write_to_json, 'results.json').read_text()))
+        self.assertEqual((neo['designation'], neo['name']), ('', ''))
+        neo = json.loads(self.write(write_to_ndjson, 'results.ndjson').read_text())['neo']
+        self.assertEqual((neo['designation'], neo['name']), ('', ''))
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed.")
+    def test_columnar_formats(self):
+        import pyarrow.parquet as pq
+        with pa.memory_map(str(self.write(write_to_arrow, 'results.arrow'))) as source:
+            arrow = pa.ipc.open_file(source).read_all().to_pylist()
+        parquet = pq.read_table(self.write(write_to_parquet, 'results.parquet')).to_pylist()
+        for rows in (arrow, parquet):
+            row, = rows
+            self.assertEqual(row['designation'], '')
+            self.assertIsNone(row['name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Check that `write_to_json` streams the same output as `json.dump`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_write_json
+"""
+import io
+import json
+import pathlib
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from write import write_to_json, _json_array_chunks, _write_buffered
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class RecordingStringIO(io.StringIO):
+    """An in-memory file that records the size of each write, and survives
+    being closed by a context manager."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, s):
+        self.writes.append(len(s))
+        return super().write(s)
+
+    def close(self):
+        pass
+
+
+class TestWriteToJSONStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(neos, cls.approaches)
+
+    def write(self, results, **kwargs):
+        buf = RecordingStringIO()
+        with unittest.mock.patch('write.open', return_value=buf):
+            write_to_json(results, None, **kwargs)
+        return buf
+
+    def test_matches_json_dump(self):
+        results = self.approaches[:100]
+        expected = json.dumps([approach.serialize() for approach in results], indent=2)
+        self.assertEqual(self.write(results).getvalue(), expected)
+
+    def test_empty_results(self):
+        self.assertEqual(self.write([]).getvalue(), json.dumps([], indent=2))
+        self.assertEqual(self.write([], indent=None).getvalue(), '[]')
+
+    def test_compact(self):
+        results = self.approaches[:100]
+        value = self.write(results, indent=None).getvalue()
+        self.assertNotIn('\n', value)
+        expected = json.dumps([approach.serialize() for approach in results],
+                              separators=(',', ':'))
+        self.assertEqual(value, expected)
+
+    def test_writes_in_large_chunks(self):
+        buf = self.write(iter(self.approaches))
+        self.assertLess(len(buf.writes), len(self.approaches) / 100)
+
+    def test_nested_values(self):
+        data = [{'a': [1, {'b': 'x\ny'}], 'c': {}, 'd': []}, {}, float('nan')]
+        for indent in (None, 2, 4):
+            with self.subTest(indent=indent):
+                separators = (',', ':') if indent is None else None
+                self.assertEqual(''.join(_json_array_chunks(data, indent)),
+                                 json.dumps(data, indent=indent, separators=separators))
+
+    def test_write_buffered(self):
+        buf = RecordingStringIO()
+        _write_buffered(buf, ['ab'] * 10, size=5)
+        self.assertEqual(buf.getvalue(), 'ab' * 10)
+        self.assertEqual(buf.writes, [6, 6, 6, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
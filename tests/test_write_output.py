@@ -0,0 +1,109 @@
+"""Check that writers can save to any path, file object, standard output or
+compressed file.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_write_output
+"""
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from write import (open_output, output_suffix, write_to_csv, write_to_json,
+                   zstandard)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestOutputSuffix(unittest.TestCase):
+    def test_output_suffix(self):
+        self.assertEqual(output_suffix('results.csv'), '.csv')
+        self.assertEqual(output_suffix(pathlib.Path('out/results.JSON')), '.json')
+        self.assertEqual(output_suffix('results.csv.gz'), '.csv')
+        self.assertEqual(output_suffix('results.ndjson.zst'), '.ndjson')
+        self.assertEqual(output_suffix('results.gz'), '')
+        self.assertEqual(output_suffix('-'), '')
+
+
+class TestOpenOutput(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)[:50]
+        NEODatabase(neos, cls.approaches)
+
+        buf = io.StringIO(newline='')
+        write_to_csv(cls.approaches, buf)
+        cls.expected = buf.getvalue().encode('utf-8')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = pathlib.Path(tmp.name)
+
+    def test_file_object_is_not_closed(self):
+        buf = io.StringIO()
+        write_to_json(self.approaches, buf)
+        self.assertFalse(buf.closed)
+        self.assertTrue(buf.getvalue().startswith('[\n  {'))
+
+    def test_path_with_directories(self):
+        path = self.tmp / 'nested' / 'results.csv'
+        write_to_csv(self.approaches, path)
+        self.assertEqual(path.read_bytes(), self.expected)
+
+    def test_bare_filename_is_saved_in_output_root(self):
+        with unittest.mock.patch('write.OUTPUT_ROOT', str(self.tmp / 'data_output')):
+            write_to_csv(self.approaches, 'results.csv')
+        self.assertEqual((self.tmp / 'data_output' / 'results.csv').read_bytes(),
+                         self.expected)
+
+    def test_compressed_paths(self):
+        for suffix, decompress in (('.gz', gzip.decompress),
+                                   ('.bz2', bz2.decompress),
+                                   ('.xz', lzma.decompress)):
+            with self.subTest(suffix=suffix):
+                path = self.tmp / f'results.csv{suffix}'
+                write_to_csv(self.approaches, path)
+                self.assertEqual(decompress(path.read_bytes()), self.expected)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed.")
+    def test_zstandard(self):
+        path = self.tmp / 'results.csv.zst'
+        write_to_csv(self.approaches, path)
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(path.read_bytes()))
+        self.assertEqual(reader.read(), self.expected)
+
+    @unittest.skipIf(zstandard is not None, "zstandard is installed.")
+    def test_zstandard_is_required(self):
+        path = self.tmp / 'results.csv.zst'
+        with self.assertRaises(ImportError):
+            write_to_csv(self.approaches, path)
+        self.assertFalse(path.exists())
+
+    def test_standard_output(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            write_to_csv(self.approaches, '-')
+        self.assertEqual(stdout.getvalue().encode('utf-8'), self.expected)
+
+    def test_binary_output(self):
+        path = self.tmp / 'bytes.gz'
+        with open_output(path, 'wb') as file:
+            file.write(b'\x00\x01')
+        self.assertEqual(gzip.decompress(path.read_bytes()), b'\x00\x01')
+
+
+if __name__ == '__main__':
+    unittest.main()
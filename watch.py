@@ -0,0 +1,131 @@
+"""Notice when the data files change, and bring an `NEODatabase` up to date.
+
+A `DataFileWatcher` remembers the size and modification time of some files,
+and reports whether any of them have changed since. A `HotReloader` uses one to
+reload the data files of a long-running `NEODatabase` - for example, the one
+behind an interactive session - whenever they change. The reloaded NEOs and
+close approaches are applied to the database incrementally with
+`NEODatabase.update` when possible, and a new database is built only when the
+changes can't be applied as a delta (say, if close approaches were removed).
+
+A `SharedDatabase` hands out the current database to commands running on
+several threads at once, as in a server. Since those commands may still be
+reading the old database, its `HotReloader` never changes a database in place:
+it builds a new one off to the side, and the new one replaces the old between
+commands.
+"""
+import os
+import sys
+import threading
+
+
+class DataFileWatcher:
+    """Watch some files for changes to their size or modification time."""
+
+    def __init__(self, paths):
+        """Create a new `DataFileWatcher`, remembering the current state of
+        the files.
+
+        :param paths: The paths of the files to watch.
+        """
+        self.paths = tuple(paths)
+        self.stamps = self.stat()
+
+    def stat(self):
+        """Return the current size and modification time of each file (or
+        None, for a missing file)."""
+        stamps = []
+        for path in self.paths:
+            try:
+                info = os.stat(path)
+            except OSError:
+                stamps.append(None)
+            else:
+                stamps.append((info.st_size, info.st_mtime_ns))
+        return tuple(stamps)
+
+    def changed(self):
+        """Return whether any file has changed since its state was remembered."""
+        return self.stat() != self.stamps
+
+
+class HotReloader:
+    """Keep a database up to date with the data files it was loaded from."""
+
+    def __init__(self, database, paths, load, build, in_place=True):
+        """Create a new `HotReloader`.
+
+        :param database: The `NEODatabase` loaded from the data files.
+        :param paths: The paths of the data files.
+        :param load: A function, of no arguments, that loads the data files
+        and returns a tuple of a collection of `NearEarthObject`s and a
+        collection of `CloseApproach`es.
+        :param build: A function of a collection of NEOs and a collection of
+        close approaches that returns a new `NEODatabase`.
+        :param in_place: Whether changes may be applied to the database with
+        `NEODatabase.update`. If False, a new database is always built.
+        """
+        self.database = database
+        self.watcher = DataFileWatcher(paths)
+        self.load = load
+        self.build = build
+        self.in_place = in_place
+
+    def reload(self):
+        """Reload the data files if any of them have changed.
+
+        If loading the data files raises an error (perhaps because one is
+        still being written), the database is left as it was, and the files
+        are reloaded when next asked.
+
+        :return: None if no file changed, 'updated' if the changes were
+        applied to the database, or 'rebuilt' if `.database` was replaced.
+        """
+        stamps = self.watcher.stat()
+        if stamps == self.watcher.stamps:
+            return None
+        neos, approaches = self.load()
+        if self.in_place and self.database.update(neos, approaches):
+            outcome = 'updated'
+        else:
+            self.database = self.build(neos, approaches)
+            outcome = 'rebuilt'
+        self.watcher.stamps = stamps
+        return outcome
+
+
+class SharedDatabase:
+    """Hold the current database of commands that run concurrently."""
+
+    def __init__(self, database, reloader=None):
+        """Create a new `SharedDatabase`.
+
+        :param database: The `NEODatabase` loaded from the data files.
+        :param reloader: A `HotReloader` of the database, with `in_place`
+        False, or None to never reload the data files.
+        """
+        self.database = database
+        self.reloader = reloader
+        self.lock = threading.Lock()
+
+    def current(self):
+        """Return the database with which to run a command, reloading the data
+        files first if they have changed.
+
+        Only one thread reloads the data files; the others wait for it, so
+        that no command is answered from data files known to be out of date.
+        A command already running keeps the database it was given. If the data
+        files can't be loaded, the current database is kept, and they're
+        reloaded before the next command.
+
+        :return: An `NEODatabase`.
+        """
+        if self.reloader is None:
+            return self.database
+        with self.lock:
+            try:
+                self.reloader.reload()
+            except (OSError, ValueError) as err:
+                print(f"Unable to reload the data files: {err}", file=sys.stderr)
+            self.database = self.reloader.database
+            return self.database
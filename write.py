@@ -1,16 +1,153 @@
-"""Write a stream of close approaches to CSV or to JSON.
+"""Write a stream of close approaches to CSV, JSON, NDJSON, Arrow or Parquet.
 
-This module exports two functions: `write_to_csv` and `write_to_json`, each of
-which accept an `results` stream of close approaches and a path to which to
-write the data.
+This module exports the functions `write_to_csv`, `write_to_json`,
+`write_to_ndjson`, `write_to_arrow` and `write_to_parquet`, each of which
+accept an `results` stream of close approaches and a path to which to write
+the data.
 
 These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
-extension determines which of these functions is used.
+extension (see `output_suffix`) determines which of these functions is used.
+
+Each of them writes through `open_output`, so the data can be saved to any
+path, to an already open file object, or to standard output (`-`), and is
+compressed on the fly if the path ends with `.gz`, `.bz2`, `.xz` or `.zst`.
+
+The JSON array is written incrementally, one close approach at a time, and
+flushed to the file in chunks of about `BUFFER_SIZE` characters, so the memory
+used doesn't depend on the number of results. Newline-delimited JSON is encoded
+directly from each close approach, without building its dictionary, and the
+encoding of each NEO is reused across its close approaches.
+
+The Arrow IPC and Parquet writers gather the attributes of up to `BATCH_SIZE`
+close approaches at a time into columns, and write each batch as one record
+batch (or row group). They require `pyarrow`, an optional dependency of this
+project.
 """
+import bz2
+import contextlib
 import csv
+import gzip
+import io
+import itertools
 import json
+import lzma
 import os
+import pathlib
+import sys
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only without zstandard.
+    zstandard = None
+
+from helpers import datetime_to_minutes, datetime_to_str, lazy_import
+
+try:
+    pa = lazy_import('pyarrow')
+except ImportError:  # pragma: no cover - exercised only without pyarrow.
+    pa = None
+
+
+# The number of characters of output to collect before writing them to a file.
+BUFFER_SIZE = 1 << 16
+
+# The number of rows of CSV output to format before writing them to a file.
+CSV_BATCH_SIZE = 4096
+
+# The number of close approaches in each batch of columnar output.
+BATCH_SIZE = 1 << 16
+
+# The directory in which bare output filenames are saved.
+OUTPUT_ROOT = 'data_output'
+
+# Functions wrapping a binary file object in a compressing one, by extension.
+COMPRESSORS = {
+    '.gz': lambda raw: gzip.GzipFile(fileobj=raw, mode='wb'),
+    '.bz2': lambda raw: bz2.BZ2File(raw, 'wb'),
+    '.xz': lambda raw: lzma.LZMAFile(raw, 'wb'),
+    '.zst': lambda raw: _zstd_writer(raw),
+}
+
+_NOTHING = object()
+
+
+def output_suffix(target):
+    """Find the extension that determines the format of an output file.
+
+    A compression extension is skipped: the format of `results.csv.gz` is
+    `.csv`.
+
+    :param target: A Path-like object, a file object or '-'.
+    :return: The lowercase extension, or '' if there is none.
+    """
+    if not isinstance(target, (str, os.PathLike)):
+        target = getattr(target, 'name', '')
+    suffixes = [suffix.lower() for suffix in pathlib.PurePath(str(target)).suffixes]
+    if suffixes and suffixes[-1] in COMPRESSORS:
+        suffixes.pop()
+    return suffixes[-1] if suffixes else ''
+
+
+@contextlib.contextmanager
+def open_output(target, mode='w', newline=None):
+    """Open where the output of a writer should go.
+
+    `target` may be:
+
+    - a file object, which is used as it is, and isn't closed;
+    - '-', for standard output;
+    - a bare filename, such as `results.csv`, which is saved in `OUTPUT_ROOT`
+      as it always has been;
+    - any other path, which is saved there, creating missing directories.
+
+    A path ending with `.gz`, `.bz2`, `.xz` or `.zst` is compressed while it's
+    written. Zstandard compression requires the optional `zstandard` package.
+
+    :param target: Where to write the output.
+    :param mode: 'w' to write text, or 'wb' to write bytes.
+    :param newline: How to translate newlines, as for `open`, in text mode.
+    :yield: A file object open for writing.
+    """
+    binary = 'b' in mode
+    if hasattr(target, 'write'):
+        yield target
+        return
+    target = os.fspath(target) if isinstance(target, os.PathLike) else str(target)
+    if target == '-':
+        if binary:
+            sys.stdout.flush()
+            yield sys.stdout.buffer
+            sys.stdout.buffer.flush()
+        else:
+            yield sys.stdout
+            sys.stdout.flush()
+        return
+
+    path = pathlib.Path(target)
+    if not os.path.dirname(target):
+        path = pathlib.Path(OUTPUT_ROOT) / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    compressor = COMPRESSORS.get(path.suffix.lower())
+    if path.suffix.lower() == '.zst' and zstandard is None:
+        raise ImportError("Writing .zst files requires zstandard.")
+    if compressor is None:
+        with open(path, mode, **({} if binary else {'newline': newline})) as file:
+            yield file
+        return
+    with contextlib.ExitStack() as stack:
+        raw = stack.enter_context(open(path, 'wb'))
+        file = stack.enter_context(compressor(raw))
+        if not binary:
+            file = stack.enter_context(
+                io.TextIOWrapper(file, encoding='utf-8', newline=newline))
+        yield file
+
+
+def _zstd_writer(raw):
+    """Wrap a binary file object in a Zstandard-compressing one."""
+    return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
 
 
 def write_to_csv(results, filename):
@@ -20,26 +157,46 @@ def write_to_csv(results, filename):
     row corresponds to the information in a single close approach from the
     `results` stream and its associated near-Earth object.
 
+    Rows are formatted as tuples, `CSV_BATCH_SIZE` at a time. The columns
+    describing an NEO are formatted once per NEO and shared by all of its
+    close approaches.
+
     :param results: An iterable of `CloseApproach` objects.
-    :param filename: A Path-like object pointing to where the data should be
-    saved.
+    :param filename: Where the data should be saved: a Path-like object
+    (see `open_output`), a file object, or '-' for standard output.
     """
     fieldnames = (
         'datetime_utc', 'distance_au', 'velocity_km_s',
         'designation', 'name', 'diameter_km', 'potentially_hazardous'
     )
-    # Ensure the data_output directory exists
-    os.makedirs('data_output', exist_ok=True)
+    neo_fragments = {None: ('', '', 'nan', 'False')}
 
-    with open(f'data_output/{filename}', 'w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
+    def row(approach):
+        neo = approach.neo
+        fragment = neo_fragments.get(neo)
+        if fragment is None:
+            fragment = neo_fragments[neo] = (
+                neo.designation, neo.name or '',
+                neo.diameter or 'nan', str(neo.hazardous))
+        return (datetime_to_str(approach.time), approach.distance,
+                approach.velocity) + fragment
 
-        for approach in results:
-            writer.writerow(approach.serialize(to_csv=True))
+    with open_output(filename, 'w', newline='') as file:
+        # Each batch is formatted in memory and written to the file at once.
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fieldnames)
+        rows = map(row, results)
+        while True:
+            writer.writerows(itertools.islice(rows, CSV_BATCH_SIZE))
+            if not buffer.tell():
+                break
+            file.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
 
 
-def write_to_json(results, filename):
+def write_to_json(results, filename, indent=2):
     """Write an iterable of `CloseApproach` objects to a JSON file.
 
     The precise output specification is in `README.md`. Roughly, the output is
@@ -47,13 +204,199 @@ def write_to_json(results, filename):
     their values and the 'neo' key mapping to a dictionary of the associated
     NEO's attributes.
 
+    With the default `indent`, the output is identical to that of `json.dump`
+    with `indent=2`. With `indent=None`, the output is compact, without any
+    whitespace between tokens.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: Where the data should be saved: a Path-like object
+    (see `open_output`), a file object, or '-' for standard output.
+    :param indent: The number of spaces by which to indent nested values, or
+    None for compact output.
+    """
+    with open_output(filename, 'w') as file:
+        _write_buffered(file, _json_array_chunks(
+            (approach.serialize() for approach in results), indent))
+
+
+def _json_array_chunks(elements, indent=2):
+    """Encode a JSON array one element at a time.
+
+    :param elements: An iterable of JSON-serializable values.
+    :param indent: The number of spaces by which to indent nested values, or
+    None for compact output.
+    :yield: Consecutive pieces of the encoded array.
+    """
+    if indent is None:
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        opening, separator, closing = '[', ',', ']'
+    else:
+        # Each element is nested one level deep. Newlines within an encoded
+        # element only ever separate its lines, since JSON escapes newlines
+        # within strings.
+        encoder = json.JSONEncoder(indent=indent)
+        margin = '\n' + ' ' * indent
+
+        def encode(element):
+            return encoder.encode(element).replace('\n', margin)
+
+        opening, separator, closing = '[' + margin, ',' + margin, '\n]'
+
+    elements = iter(elements)
+    first = next(elements, _NOTHING)
+    if first is _NOTHING:
+        yield '[]'
+        return
+    yield opening
+    yield encode(first)
+    for element in elements:
+        yield separator
+        yield encode(element)
+    yield closing
+
+
+def _write_buffered(file, chunks, size=BUFFER_SIZE):
+    """Write pieces of text to a file, in chunks of at least `size` characters.
+
+    :param file: A file object open for writing text.
+    :param chunks: An iterable of strings.
+    :param size: The number of characters to collect before each write.
+    """
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            file.write(''.join(buffer))
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        file.write(''.join(buffer))
+
+
+def write_to_ndjson(results, filename):
+    """Write an iterable of `CloseApproach` objects to a newline-delimited JSON
+    file.
+
+    Each line of the output holds one compact JSON object, equal to the
+    element that `write_to_json` would write for the close approach.
+
     :param results: An iterable of `CloseApproach` objects.
-    :param filename: A Path-like object pointing to where the data should be
-    saved.
+    :param filename: Where the data should be saved: a Path-like object
+    (see `open_output`), a file object, or '-' for standard output.
     """
-    # Ensure the data_output directory exists
-    os.makedirs('data_output', exist_ok=True)
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    neo_fragments = {}
+
+    def line(approach):
+        neo = approach.neo
+        fragment = neo_fragments.get(neo)
+        if fragment is None:
+            fragment = neo_fragments[neo] = encode(approach.serialize()['neo'])
+        return (f'{{"datetime_utc":"{datetime_to_str(approach.time)}",'
+                f'"distance_au":{_json_float(approach.distance)},'
+                f'"velocity_km_s":{_json_float(approach.velocity)},'
+                f'"neo":{fragment}}}\n')
+
+    with open_output(filename, 'w') as file:
+        _write_buffered(file, map(line, results))
+
+
+def _json_float(value):
+    """Encode a float as `json.dumps` does."""
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    return float.__repr__(value)
+
 
-    with open(f'data_output/{filename}', 'w') as file:
-        json_data = [approach.serialize() for approach in results]
-        json.dump(json_data, file, indent=2)
+def write_to_arrow(results, filename):
+    """Write an iterable of `CloseApproach` objects to an Arrow IPC file.
+
+    The file holds one table with the columns of `write_to_csv`, typed: the
+    time of approach is a timestamp, unknown names are null, and unknown
+    diameters are NaN.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: Where the data should be saved: a Path-like object
+    (see `open_output`), a file object, or '-' for standard output.
+    :raises ImportError: If pyarrow isn't installed.
+    """
+    schema = _arrow_schema()
+    with open_output(filename, 'wb') as file:
+        with pa.ipc.new_file(file, schema) as writer:
+            for batch in _record_batches(results, schema):
+                writer.write_batch(batch)
+
+
+def write_to_parquet(results, filename):
+    """Write an iterable of `CloseApproach` objects to a Parquet file.
+
+    The file holds the same table as `write_to_arrow` writes, with one row
+    group per batch of close approaches.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: Where the data should be saved: a Path-like object
+    (see `open_output`), a file object, or '-' for standard output.
+    :raises ImportError: If pyarrow isn't installed.
+    """
+    schema = _arrow_schema()
+    # Importing `pyarrow.parquet` imports pyarrow, so it's left until needed.
+    import pyarrow.parquet as pq
+    with open_output(filename, 'wb') as file:
+        with pq.ParquetWriter(file, schema) as writer:
+            for batch in _record_batches(results, schema):
+                writer.write_batch(batch)
+
+
+def _arrow_schema():
+    """Describe the columns of Arrow and Parquet output."""
+    if pa is None:
+        raise ImportError("Writing Arrow and Parquet files requires pyarrow.")
+    return pa.schema([
+        ('datetime_utc', pa.timestamp('s')),
+        ('distance_au', pa.float64()),
+        ('velocity_km_s', pa.float64()),
+        ('designation', pa.string()),
+        ('name', pa.string()),
+        ('diameter_km', pa.float64()),
+        ('potentially_hazardous', pa.bool_()),
+    ])
+
+
+def _record_batches(results, schema, size=BATCH_SIZE):
+    """Gather close approaches into Arrow record batches.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param schema: The schema of the batches, from `_arrow_schema`.
+    :param size: The maximum number of rows in each batch.
+    :yield: `pyarrow.RecordBatch`es of consecutive close approaches.
+    """
+    nan = float('nan')
+    results = iter(results)
+    while True:
+        columns = tuple([] for _ in schema)
+        (times, distances, velocities, designations,
+         names, diameters, hazardous) = columns
+        for approach in itertools.islice(results, size):
+            neo = approach.neo
+            times.append(datetime_to_minutes(approach.time) * 60)
+            distances.append(approach.distance)
+            velocities.append(approach.velocity)
+            if neo is None:
+                designations.append('')
+                names.append(None)
+                diameters.append(nan)
+                hazardous.append(False)
+            else:
+                designations.append(neo.designation)
+                names.append(neo.name)
+                diameters.append(neo.diameter)
+                hazardous.append(neo.hazardous)
+        if not times:
+            return
+        yield pa.record_batch([pa.array(column, type=field.type)
+                               for column, field in zip(columns, schema)],
+                              schema=schema)